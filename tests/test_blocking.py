@@ -0,0 +1,62 @@
+import pytest
+
+import yocket_backoff as ybo
+import yocket_benchmark_fetch as ybf
+import yocket_fixture_server as yfs
+
+
+def run_general(page_source, tmp_path, pages=2):
+    tmp_path.mkdir(exist_ok=True)
+    fixture_server = yfs.start_fixture_server(page_source)
+    try:
+        return ybf.benchmark_general(yfs.get_server_url(fixture_server), pages, 1, 1000.0, str(tmp_path / 'profile_cache.sqlite'))
+    finally:
+        fixture_server.shutdown()
+
+
+def test_listing_page_blocked_after_retries_raises(tmp_path):
+    page_source = yfs.FaultInjectingPageSource(yfs.SyntheticPageSource(pages_per_listing=2), forbidden_rate=1.0)
+    with pytest.raises(ybo.BlockedError):
+        run_general(page_source, tmp_path)
+    # Every request was answered with 403, the listing page was retried before giving up
+    assert page_source.request_count > 1
+
+
+def test_temporary_block_is_retried(tmp_path):
+    records, _, _ = run_general(yfs.SyntheticPageSource(pages_per_listing=2), tmp_path / 'unblocked')
+    page_source = yfs.FaultInjectingPageSource(yfs.SyntheticPageSource(pages_per_listing=2), block_start=0, block_length=2)
+    blocked_records, _, _ = run_general(page_source, tmp_path)
+    assert blocked_records == records > 0
+    assert ybf.last_backoff_summary['blocked_responses'] == 2
+
+
+class ForbiddenEndPageSource(object):
+    """Serve pages of synthetic page source with status 403 after the last listing page, as yocket ends pagination"""
+
+    def __init__(self, pages_per_listing):
+        self.page_source = yfs.SyntheticPageSource(pages_per_listing=pages_per_listing)
+
+    def get_page(self, request_path):
+        status_code, page_html = self.page_source.get_page(request_path)
+        return (403 if page_html == yfs.build_no_results_page() else status_code), page_html
+
+
+def run_university(page_source, tmp_path):
+    tmp_path.mkdir(exist_ok=True)
+    fixture_server = yfs.start_fixture_server(page_source)
+    try:
+        return ybf.benchmark_university(yfs.get_server_url(fixture_server), 1, 1, 1000.0, str(tmp_path / 'profile_cache.sqlite'))
+    finally:
+        fixture_server.shutdown()
+
+
+def test_university_pagination_ends_on_forbidden_no_results_page(tmp_path):
+    records, _, _ = run_university(yfs.SyntheticPageSource(pages_per_listing=2), tmp_path / 'ok')
+    forbidden_end_records, _, _ = run_university(ForbiddenEndPageSource(pages_per_listing=2), tmp_path / 'forbidden_end')
+    assert forbidden_end_records == records > 0
+
+
+def test_university_listing_page_blocked_after_retries_raises(tmp_path):
+    page_source = yfs.FaultInjectingPageSource(yfs.SyntheticPageSource(pages_per_listing=2), forbidden_rate=1.0)
+    with pytest.raises(ybo.BlockedError):
+        run_university(page_source, tmp_path)
@@ -0,0 +1,66 @@
+import yocket_checkpoint as ycp
+
+
+def test_resume_drops_records_written_after_last_checkpoint(tmp_path):
+    checkpoint_directory = str(tmp_path)
+    checkpoint, previous_profile_paths = ycp.start_run(checkpoint_directory, 'CMU_ML_admit', ycp.new_checkpoint(), False)
+    assert previous_profile_paths == set()
+    records = ycp.open_records(checkpoint_directory, 'CMU_ML_admit', checkpoint)
+    records.write_row(['MS CS', 'Uni A', 8.5, '/profile/1'])
+    records.write_row(['MS CS', 'Uni A', 8.1, '/profile/2'])
+    records.flush()
+    checkpoint['records_offset'] = records.tell()
+    checkpoint['last_completed_page'] = 1
+    ycp.save_checkpoint(checkpoint_directory, 'CMU_ML_admit', checkpoint)
+    # Run is interrupted after writing a record of page 2 but before its checkpoint
+    records.write_row(['MS CS', 'Uni A', 7.9, '/profile/3'])
+    records.close()
+
+    resumed_checkpoint, _ = ycp.start_run(checkpoint_directory, 'CMU_ML_admit', ycp.load_checkpoint(checkpoint_directory, 'CMU_ML_admit'),
+                                          False)
+    assert resumed_checkpoint['status'] == ycp.STATUS_IN_PROGRESS
+    assert resumed_checkpoint['last_completed_page'] == 1
+    records = ycp.open_records(checkpoint_directory, 'CMU_ML_admit', resumed_checkpoint)
+    assert records.tell() == resumed_checkpoint['records_offset']
+    records.write_row(['MS CS', 'Uni A', 7.9, '/profile/3'])
+    records.close()
+    assert [record[3] for record in ycp.iterate_records(checkpoint_directory, 'CMU_ML_admit')] == ['/profile/1', '/profile/2', '/profile/3']
+
+
+def test_resume_after_export_starts_again_and_carries_records(tmp_path):
+    checkpoint_directory = str(tmp_path)
+    checkpoint, _ = ycp.start_run(checkpoint_directory, 'CMU_ML_admit', ycp.new_checkpoint(), False)
+    records = ycp.open_records(checkpoint_directory, 'CMU_ML_admit', checkpoint)
+    records.write_row(['MS CS', 'Uni A', 8.5, '/profile/1'])
+    checkpoint['records_offset'] = records.tell()
+    checkpoint['seen_profile_paths'] = ['/profile/1']
+    records.close()
+    ycp.complete_run(checkpoint_directory, 'CMU_ML_admit', checkpoint, 3)
+    ycp.mark_exported(checkpoint_directory, 'CMU_ML_admit')
+
+    checkpoint, previous_profile_paths = ycp.start_run(checkpoint_directory, 'CMU_ML_admit',
+                                                       ycp.load_checkpoint(checkpoint_directory, 'CMU_ML_admit'), True)
+    assert checkpoint['last_completed_page'] == 0 and checkpoint['records_offset'] == 0
+    assert previous_profile_paths == {'/profile/1'}
+    records = ycp.open_records(checkpoint_directory, 'CMU_ML_admit', checkpoint)
+    records.write_row(['MS CS', 'Uni A', 9.0, '/profile/2'])
+    checkpoint['records_offset'] = records.tell()
+    checkpoint['seen_profile_paths'] = ['/profile/2']
+    records.close()
+    ycp.complete_run(checkpoint_directory, 'CMU_ML_admit', checkpoint, 3)
+    assert [record[3] for record in ycp.iterate_records(checkpoint_directory, 'CMU_ML_admit')] == ['/profile/2', '/profile/1']
+
+
+def test_records_are_synced_before_checkpoint_is_saved(tmp_path, monkeypatch):
+    checkpoint_directory = str(tmp_path)
+    checkpoint, _ = ycp.start_run(checkpoint_directory, 'CMU_ML_admit', ycp.new_checkpoint(), False)
+    events = []
+    real_fsync = ycp.yse.os.fsync
+    monkeypatch.setattr(ycp.yse.os, 'fsync', lambda file_descriptor: events.append('fsync') or real_fsync(file_descriptor))
+    # Checkpoint is not written, saving it would fsync as well
+    monkeypatch.setattr(ycp, 'save_checkpoint', lambda *arguments: events.append('save'))
+    records = ycp.open_records(checkpoint_directory, 'CMU_ML_admit', checkpoint)
+    records.write_row(['MS CS', 'Uni A', 8.5, '/profile/1'])
+    records.close()
+    ycp.complete_run(checkpoint_directory, 'CMU_ML_admit', checkpoint, 3)
+    assert events == ['fsync', 'save']
@@ -0,0 +1,44 @@
+import pytest
+
+import yocket_columnar_store as ycs
+import yocket_general_extractor as yge
+import yocket_university_extractor as yue
+
+pytest.importorskip('pyarrow')
+
+UNIVERSITY_ROWS = [['MS CS', 'Uni A ', '8.5', '160', '165', '110', '24', 'BE', 'College', 'Admit', '2', '/profile/1'],
+                   ['MS CS', 'Uni A ', '7.9', '150', '150', '95', '0', 'BE', 'College', 'Reject', '', '/profile/2'],
+                   ['MS DS', 'Uni B ', '9.1', '165', '160', '112', '12', 'BE', 'College', 'Admit', '1', '/profile/3']]
+GENERAL_ROWS = [['MS CS', 'Uni A ', '8.6', '318', '105', '', 'BE', 'College', 'Admit', '/profile/4']]
+
+
+def test_appends_of_runs_are_read_back_by_partition(tmp_path):
+    store_directory = str(tmp_path / 'decisions')
+    # Every sink is a run of its own appending new files to the dataset
+    for header_fields, rows in ((yue.HEADER_FIELDS, UNIVERSITY_ROWS), (yge.HEADER_FIELDS, GENERAL_ROWS)):
+        columnar_sink = ycs.ColumnarSink(store_directory, header_fields)
+        for row in rows:
+            columnar_sink.write_row(row)
+        columnar_sink.close()
+
+    columnar_store = ycs.ColumnarStore(store_directory)
+    assert columnar_store.read().num_rows == 4
+    uni_a_records = sorted(columnar_store.read(university='Uni A').to_pylist(), key=lambda record: record['profile_path'])
+    assert [(record['course'], record['gpa'], record['gre'], record['gre_quant'], record['toefl'], record['workex'], record['status'],
+             record['papers']) for record in uni_a_records] == [('MS CS', 8.5, 325, 160, 110, 24, 'Admit', 2),
+                                                                ('MS CS', 7.9, 300, 150, 95, 0, 'Reject', None),
+                                                                ('MS CS', 8.6, 318, None, 105, None, 'Admit', None)]
+    assert columnar_store.read(['profile_path'], minimum_gpa=8.0, minimum_gre=320).to_pylist() in (
+        [{'profile_path': '/profile/1'}, {'profile_path': '/profile/3'}], [{'profile_path': '/profile/3'}, {'profile_path': '/profile/1'}])
+
+
+def test_admit_rate_by_band(tmp_path):
+    store_directory = str(tmp_path / 'decisions')
+    columnar_sink = ycs.ColumnarSink(store_directory, yue.HEADER_FIELDS)
+    for row in UNIVERSITY_ROWS + [['MS CS', 'Uni A ', '8.7', '160', '166', '110', '24', 'BE', 'College', 'Reject', '', '/profile/5']]:
+        columnar_sink.write_row(row)
+    columnar_sink.close()
+
+    admit_rate_bands = ycs.ColumnarStore(store_directory).admit_rate_by_band(gpa_band=0.5, gre_band=5, university='Uni A').to_pylist()
+    assert [(band['gpa_band'], band['gre_band'], band['admit_sum'], band['admit_count'], band['admit_rate'])
+            for band in admit_rate_bands] == [(7.5, 300.0, 0, 1, 0.0), (8.5, 325.0, 1, 2, 0.5)]
@@ -0,0 +1,17 @@
+import pytest
+
+import yocket_config as yco
+import yocket_university_extractor as yue
+
+
+def test_overrides_of_default_type_are_applied():
+    constants = yco.apply_overrides(yue.get_constants(), dict(MINIMUM_GPA=8, MINIMUM_GRE=320, BACKOFF_BASE_SECONDS=2.5, SINCE_LAST_RUN=True,
+                                                              EXPORT_FORMATS=['csv'], METRICS_FILE=None, COLUMNAR_STORE_DIRECTORY='decisions'))
+    assert (constants['MINIMUM_GPA'], constants['MINIMUM_GRE'], constants['SINCE_LAST_RUN'], constants['METRICS_FILE']) == (8, 320, True, None)
+
+
+@pytest.mark.parametrize('overrides', [dict(MINIMUM_GRE='320'), dict(MINIMUM_GRE=320.5), dict(MINIMUM_GRE=True), dict(MINIMUM_GPA='8.0'),
+                                       dict(SINCE_LAST_RUN=1), dict(EXPORT_FORMATS='csv'), dict(MINIMUM_SCORE=320)])
+def test_bad_overrides_are_configuration_errors(overrides):
+    with pytest.raises(ValueError):
+        yco.apply_overrides(yue.get_constants(), overrides)
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+import yocket_benchmark_fetch as ybf
+import yocket_export_sinks as yse
+import yocket_fixture_server as yfs
+
+
+class BlockedCoursePageSource(object):
+    """Serve synthetic pages, except that listing pages of one course are always answered with 403"""
+
+    def __init__(self, blocked_course_path):
+        self.page_source = yfs.SyntheticPageSource(pages_per_listing=1)
+        self.blocked_course_path = blocked_course_path
+
+    def get_page(self, request_path):
+        if self.blocked_course_path in request_path:
+            return 403, yfs.build_forbidden_page()
+        return self.page_source.get_page(request_path)
+
+
+def test_failed_worker_fails_the_run_after_other_courses_are_exported(tmp_path):
+    fixture_server = yfs.start_fixture_server(BlockedCoursePageSource('/1-synthetic-university/'))
+    try:
+        with pytest.raises(RuntimeError, match='1 of 2 workers failed: worker 1 yocket_backoff.BlockedError'):
+            ybf.benchmark_course_pool(yfs.get_server_url(fixture_server), 2, 2, 1, 1000.0, str(tmp_path))
+    finally:
+        fixture_server.shutdown()
+    combined_path = os.path.join(str(tmp_path), 'workers_2', 'all_courses.pkls')
+    assert len(list(yse.read_pickle_stream(combined_path))) > 0
@@ -0,0 +1,42 @@
+import yocket_decision_store as yds
+import yocket_general_extractor as yge
+import yocket_university_extractor as yue
+
+UNIVERSITY_ROW = ['MS CS', 'Uni A ', '8.5', '160', '165', '110', '24', 'BE', 'College', 'Admit', '2', '/profile/1']
+GENERAL_ROW = ['MS CS', 'Uni A ', '8.6', '325', '', '30', 'BE', 'College', 'Admit', '/profile/1']
+
+
+def write_rows(database_path, header_fields, rows):
+    store_sink = yds.DecisionStoreSink(database_path, header_fields)
+    for row in rows:
+        store_sink.write_row(row)
+    store_sink.close()
+
+
+def test_upsert_keeps_first_seen_and_stored_scores(tmp_path, monkeypatch):
+    database_path = str(tmp_path / 'decisions.sqlite')
+    monkeypatch.setattr(yds.time, 'time', lambda: 100.0)
+    write_rows(database_path, yue.HEADER_FIELDS, [UNIVERSITY_ROW])
+    monkeypatch.setattr(yds.time, 'time', lambda: 200.0)
+    write_rows(database_path, yge.HEADER_FIELDS, [GENERAL_ROW])
+
+    decision_store = yds.DecisionStore(database_path)
+    rows = decision_store.connection.execute('SELECT gpa, gre, gre_quant, gre_verbal, toefl, workex, papers, first_seen, last_seen '
+                                             'FROM decisions').fetchall()
+    decision_store.close()
+    # Scores of the later general record replace stored ones, scores it does not have are kept
+    assert rows == [(8.6, 325, 160, 165, 110, 30, 2, 100.0, 200.0)]
+
+
+def test_decisions_are_unique_on_profile_university_course_and_status(tmp_path):
+    database_path = str(tmp_path / 'decisions.sqlite')
+    rejected_row = UNIVERSITY_ROW[:9] + ['Reject'] + UNIVERSITY_ROW[10:]
+    other_course_row = ['MS DS'] + UNIVERSITY_ROW[1:]
+    write_rows(database_path, yue.HEADER_FIELDS, [UNIVERSITY_ROW, UNIVERSITY_ROW, rejected_row, other_course_row])
+    write_rows(database_path, yge.HEADER_FIELDS, [GENERAL_ROW])
+
+    decision_store = yds.DecisionStore(database_path)
+    assert sorted(decision_store.read(['course', 'university', 'status', 'profile_path'])) == [
+        ('MS CS', 'Uni A', 'Admit', '/profile/1'), ('MS CS', 'Uni A', 'Reject', '/profile/1'), ('MS DS', 'Uni A', 'Admit', '/profile/1')]
+    assert decision_store.count(university='Uni A', minimum_gre=325) == 3
+    decision_store.close()
@@ -0,0 +1,14 @@
+import yocket_export_sinks as yse
+import yocket_university_extractor as yue
+
+ROWS = [['MS CS', 'Uni A', 8.5, 160, 165, 110, 24, 'BE', 'College', 'Admit', 2, '/profile/1'],
+        ['MS CS', 'Uni A', 7.9, 150, 150, 95, 0, 'BE', 'College', 'Reject', None, '/profile/2']]
+
+
+def test_pickle_stream_is_written_as_pkls_and_read_back(tmp_path):
+    base_path = str(tmp_path / 'CMU_ML')
+    with yse.open_sinks(base_path, yue.HEADER_FIELDS, ['pickle']) as export_sink:
+        for row in ROWS:
+            export_sink.write_row(row)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['CMU_ML.pkls']
+    assert list(yse.read_pickle_stream(base_path + '.pkls')) == ROWS
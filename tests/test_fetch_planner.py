@@ -0,0 +1,29 @@
+import yocket_fetch_planner as yfp
+import yocket_listing_parser as ylp
+
+
+def split_university_course(university_course):
+    university, _, course = university_course.partition(' - ')
+    return (university, course) if course else (None, None)
+
+
+def make_decision(profile_page_path, admit_status='Admit', meets_criteria=True, university_course='uni a - ms cs'):
+    return ylp.ListingDecision(profile_page_path, university_course, admit_status, 320, 105, 8.5, 12, meets_criteria)
+
+
+def test_only_exported_and_cached_profiles_count_as_avoided():
+    fetch_planner = yfp.FetchPlanner(split_university_course)
+    planned_decisions = fetch_planner.plan_page([
+        make_decision('/profile/1', admit_status='Interested'),
+        make_decision('/profile/2', meets_criteria=False),
+        make_decision('/profile/3', university_course='no course'),
+        make_decision('/profile/4'),
+        make_decision('/profile/5'),
+        # Same profile listed again under another decision
+        make_decision('/profile/5', admit_status='Reject'),
+    ], exported_profile_paths={'/profile/4'})
+    assert [decision.profile_page_path for decision, _, _ in planned_decisions] == ['/profile/5', '/profile/5']
+    summary = fetch_planner.get_summary()
+    assert (summary['listed'], summary['not_decision'], summary['below_criteria'], summary['unsplittable_course']) == (6, 1, 1, 1)
+    assert (summary['already_exported'], summary['served_from_cache'], summary['profile_requests']) == (1, 1, 1)
+    assert summary['avoided_profile_requests'] == 2
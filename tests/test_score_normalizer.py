@@ -0,0 +1,26 @@
+import yocket_score_normalizer as ysn
+
+GRE_TEXTS = ['\n320\n', ' 305 ', '', '\nNA\n', '7.5', None]
+TOEFL_TEXTS = ['\n110\n', '\n7.5\n', '', '\n98\n', '101', '\n\n']
+GPA_TEXTS = ['\n8.73 CGPA\n', '\n85 %\n', '', '\n9 CGPA\n', '\n72.456 %\n', None]
+WORKEX_TEXTS = ['\n24 months\n', '\n0 months\n', '', '\nNone\n', '3 years 5 months', None]
+CONSTANTS = dict(MINIMUM_GRE=310, MINIMUM_GPA=7.5, MINIMUM_TOEFL=100)
+
+
+def test_scalar_helpers():
+    assert [ysn.get_gre_or_toefl(text) for text in GRE_TEXTS] == [320, 305, 0, 0, 0, 0]
+    assert [ysn.get_gre_or_toefl(text) for text in TOEFL_TEXTS] == [110, 0, 0, 98, 101, 0]
+    # Percentages are divided by 10, the whole number and not only its first digit
+    assert [ysn.get_gpa(text) for text in GPA_TEXTS] == [8.73, 8.5, 0.0, 9.0, 7.25, 0.0]
+    assert [ysn.get_first_integer(text) for text in WORKEX_TEXTS] == [24, 0, 0, 0, 3, 0]
+
+
+def test_normalize_scores_matches_scalar_helpers():
+    scores = ysn.normalize_scores(GRE_TEXTS, TOEFL_TEXTS, GPA_TEXTS, WORKEX_TEXTS)
+    assert scores['gre'].tolist() == [ysn.get_gre_or_toefl(text) for text in GRE_TEXTS]
+    assert scores['toefl'].tolist() == [ysn.get_gre_or_toefl(text) for text in TOEFL_TEXTS]
+    assert scores['gpa'].tolist() == [ysn.get_gpa(text) for text in GPA_TEXTS]
+    assert scores['workex'].tolist() == [ysn.get_first_integer(text) for text in WORKEX_TEXTS]
+    assert ysn.get_criteria_mask(scores, CONSTANTS).tolist() == [ysn.meets_criteria(gre, gpa, toefl, CONSTANTS) for gre, gpa, toefl in
+                                                                zip(scores['gre'].tolist(), scores['gpa'].tolist(),
+                                                                    scores['toefl'].tolist())]
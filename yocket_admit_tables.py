@@ -0,0 +1,199 @@
+import os
+import tempfile
+import numpy as np
+import yocket_decision_store as yds
+
+# Scores are binned by these edges, bin 0 holds decisions without the score
+DIMENSIONS = ('gpa', 'gre', 'toefl', 'workex')
+BIN_EDGES = dict(gpa=np.array([6.0, 6.5, 7.0, 7.5, 8.0, 8.5, 9.0, 9.5]),
+                 gre=np.array([300, 305, 310, 315, 320, 325, 330, 335], dtype=np.float64),
+                 toefl=np.array([90, 95, 100, 105, 110, 115], dtype=np.float64),
+                 workex=np.array([1, 12, 24, 36, 60], dtype=np.float64))
+# Unparsable GPA, GRE and TOEFL are exported as zero, no work experience is a real zero
+ZERO_IS_MISSING = dict(gpa=True, gre=True, toefl=True, workex=False)
+# Pseudo decisions pulling admit rate of a course towards the overall rate and of a bin towards the rate of its course
+PAIR_PRIOR_STRENGTH = 10.0
+BIN_PRIOR_STRENGTH = 5.0
+STORE_COLUMNS = ['university', 'course', 'gpa', 'gre', 'toefl', 'workex', 'status']
+
+
+def get_bin_indices(dimension, values):
+    """Return int array of bins of score values, None and missing scores fall into bin 0"""
+
+    values = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    missing = np.isnan(values)
+    if ZERO_IS_MISSING[dimension]:
+        missing |= values == 0
+    return np.where(missing, 0, np.searchsorted(BIN_EDGES[dimension], values, side='right') + 1)
+
+
+def get_log_odds(rates):
+    return np.log(rates) - np.log1p(-rates)
+
+
+class AdmitTables(object):
+    """Admit and decision counts of every (university, course) over bins of GPA, GRE, TOEFL and work experience.
+
+    Counts of a dimension are an int32 array of shape (bins, courses), so a
+    query reads one contiguous row per dimension. Estimates combine the
+    smoothed admit rate of the course with the log odds of each of the
+    profile's bins against it, as naive Bayes does. The log odds tables are
+    precomputed whenever counts change, so ranking all courses is a few
+    vector additions and a sort. Decisions are taken in from the decision
+    store by rowid, a decision whose scores are filled in after it was
+    counted keeps its old bins until tables are rebuilt."""
+
+    def __init__(self):
+        self.pair_keys = []
+        self.pair_index = dict()
+        self.admits = dict((dimension, np.zeros((len(BIN_EDGES[dimension]) + 2, 0), dtype=np.int32)) for dimension in DIMENSIONS)
+        self.decisions = dict((dimension, np.zeros((len(BIN_EDGES[dimension]) + 2, 0), dtype=np.int32)) for dimension in DIMENSIONS)
+        self.last_rowid = 0
+        self.precompute()
+
+    def get_pair_rows(self, universities, courses):
+        """Return int array of table columns of (university, course) pairs, columns of new pairs are appended"""
+
+        known_pair_count = len(self.pair_keys)
+        pair_rows = []
+        for pair_key in zip(universities, courses):
+            if pair_key not in self.pair_index:
+                self.pair_index[pair_key] = len(self.pair_keys)
+                self.pair_keys.append(pair_key)
+            pair_rows.append(self.pair_index[pair_key])
+        new_pair_count = len(self.pair_keys) - known_pair_count
+        if new_pair_count > 0:
+            for counts in (self.admits, self.decisions):
+                for dimension in DIMENSIONS:
+                    counts[dimension] = np.concatenate([counts[dimension], np.zeros((counts[dimension].shape[0], new_pair_count), dtype=np.int32)],
+                                                       axis=1)
+        return np.array(pair_rows, dtype=np.intp)
+
+    def add_decisions(self, universities, courses, scores, admitted):
+        """Count decisions in, scores is a dictionary of dimension -> score values and admitted a boolean sequence"""
+
+        if len(universities) == 0:
+            return
+        pair_rows = self.get_pair_rows(universities, courses)
+        admitted = np.array(admitted, dtype=np.int32)
+        for dimension in DIMENSIONS:
+            bin_indices = get_bin_indices(dimension, scores[dimension])
+            np.add.at(self.admits[dimension], (bin_indices, pair_rows), admitted)
+            np.add.at(self.decisions[dimension], (bin_indices, pair_rows), 1)
+        self.precompute()
+
+    def precompute(self):
+        """Recompute admit rate of every course and log odds of every bin against it"""
+
+        # Names are kept in arrays too so that ranked courses are gathered without a Python loop
+        self.pair_universities = np.array([university for university, _ in self.pair_keys], dtype=object)
+        self.pair_courses = np.array([course for _, course in self.pair_keys], dtype=object)
+        # Every decision is counted in exactly one bin of a dimension, bin 0 included
+        self.pair_admits = self.admits['gpa'].sum(axis=0)
+        self.pair_decisions = self.decisions['gpa'].sum(axis=0)
+        overall_rate = (self.pair_admits.sum() + 1.0) / (self.pair_decisions.sum() + 2.0)
+        pair_rates = (self.pair_admits + PAIR_PRIOR_STRENGTH * overall_rate) / (self.pair_decisions + PAIR_PRIOR_STRENGTH)
+        self.pair_log_odds = get_log_odds(pair_rates)
+        self.bin_log_odds = dict()
+        for dimension in DIMENSIONS:
+            bin_rates = (self.admits[dimension] + BIN_PRIOR_STRENGTH * pair_rates) / (self.decisions[dimension] + BIN_PRIOR_STRENGTH)
+            self.bin_log_odds[dimension] = get_log_odds(bin_rates) - self.pair_log_odds
+
+    def update_from_store(self, decision_store):
+        """Count in decisions added to decision store since the last update, return number of admits and rejects counted"""
+
+        added_rows = decision_store.read_added(self.last_rowid, STORE_COLUMNS)
+        if len(added_rows) == 0:
+            return 0
+        self.last_rowid = added_rows[-1][0]
+        decision_rows = [row for row in added_rows if str(row[7]).lower() in ('admit', 'reject')]
+        if len(decision_rows) == 0:
+            return 0
+        _, universities, courses, gpa, gre, toefl, workex, statuses = zip(*decision_rows)
+        self.add_decisions(universities, courses, dict(gpa=gpa, gre=gre, toefl=toefl, workex=workex),
+                           [status.lower() == 'admit' for status in statuses])
+        return len(decision_rows)
+
+    def estimate(self, gpa=None, gre=None, toefl=None, workex=None):
+        """Return float array of estimated admit probability of profile for every course in order of pair_keys.
+        Scores left out do not move the estimate away from the admit rate of the course"""
+
+        log_odds = self.pair_log_odds.copy()
+        for dimension, value in zip(DIMENSIONS, (gpa, gre, toefl, workex)):
+            if value is not None:
+                log_odds += self.bin_log_odds[dimension][get_bin_indices(dimension, [value])[0]]
+        return 1.0 / (1.0 + np.exp(-log_odds))
+
+    def rank(self, gpa=None, gre=None, toefl=None, workex=None, minimum_decisions=1, limit=None):
+        """Return list of 4 tuple (university, course, estimated admit probability, decisions) in order of
+        decreasing probability, courses with fewer than minimum_decisions decisions are left out"""
+
+        estimates = self.estimate(gpa, gre, toefl, workex)
+        pair_rows = np.flatnonzero(self.pair_decisions >= minimum_decisions)
+        negated_estimates = -estimates[pair_rows]
+        if limit is not None and limit < len(pair_rows):
+            # Only the best courses are sorted when a few are asked for
+            pair_rows = pair_rows[np.argpartition(negated_estimates, limit)[:limit]]
+            negated_estimates = -estimates[pair_rows]
+        pair_rows = pair_rows[np.argsort(negated_estimates)]
+        return list(zip(self.pair_universities[pair_rows].tolist(), self.pair_courses[pair_rows].tolist(), estimates[pair_rows].tolist(),
+                        self.pair_decisions[pair_rows].tolist()))
+
+    def get_summary(self):
+        return dict(courses=len(self.pair_keys), decisions=int(self.pair_decisions.sum()), admits=int(self.pair_admits.sum()),
+                    last_rowid=self.last_rowid)
+
+    def save(self, tables_path):
+        """Write counts, bin edges and index of courses atomically to an uncompressed npz file"""
+
+        arrays = dict(universities=self.pair_universities.astype(str), courses=self.pair_courses.astype(str), last_rowid=np.array(self.last_rowid))
+        for dimension in DIMENSIONS:
+            arrays['admits_' + dimension] = self.admits[dimension]
+            arrays['decisions_' + dimension] = self.decisions[dimension]
+            arrays['bin_edges_' + dimension] = BIN_EDGES[dimension]
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(tables_path)), suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temporary_path, tables_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+
+def load_admit_tables(tables_path):
+    """Return tables saved at tables_path. Empty tables returned if nothing was saved yet
+    or bin edges have changed since, so that the next update rebuilds them from the decision store"""
+
+    admit_tables = AdmitTables()
+    if tables_path is None or not os.path.exists(tables_path):
+        return admit_tables
+    with np.load(tables_path) as saved_arrays:
+        for dimension in DIMENSIONS:
+            if not np.array_equal(saved_arrays['bin_edges_' + dimension], BIN_EDGES[dimension]):
+                return admit_tables
+        admit_tables.pair_keys = list(zip(saved_arrays['universities'].tolist(), saved_arrays['courses'].tolist()))
+        admit_tables.pair_index = dict((pair_key, pair_row) for pair_row, pair_key in enumerate(admit_tables.pair_keys))
+        for dimension in DIMENSIONS:
+            admit_tables.admits[dimension] = saved_arrays['admits_' + dimension]
+            admit_tables.decisions[dimension] = saved_arrays['decisions_' + dimension]
+        admit_tables.last_rowid = int(saved_arrays['last_rowid'])
+    admit_tables.precompute()
+    return admit_tables
+
+
+def refresh_admit_tables(constants):
+    """Return saved admit tables with decisions added to the decision store counted in and saved again.
+    None returned if ADMIT_TABLES_PATH or DECISION_STORE_PATH is not set"""
+
+    if constants['ADMIT_TABLES_PATH'] is None or constants['DECISION_STORE_PATH'] is None:
+        return None
+    admit_tables = load_admit_tables(constants['ADMIT_TABLES_PATH'])
+    decision_store = yds.DecisionStore(constants['DECISION_STORE_PATH'])
+    try:
+        admit_tables.update_from_store(decision_store)
+    finally:
+        decision_store.close()
+    admit_tables.save(constants['ADMIT_TABLES_PATH'])
+    return admit_tables
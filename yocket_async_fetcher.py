@@ -0,0 +1,190 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+import yocket_backoff as ybo
+import yocket_run_metrics as yrm
+
+
+class TokenBucket(object):
+    """Token bucket limiting the request rate towards a single host.
+
+    Tokens refill continuously at `rate` per second up to `capacity`,
+    each request consumes one token and waits until one is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = None
+
+    def refill(self):
+        """Add tokens accumulated since last refill, bounded by capacity"""
+
+        current_time = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (current_time - self.last_refill) * self.rate)
+        self.last_refill = current_time
+
+    async def acquire(self):
+        """Wait until a token is available and consume it"""
+
+        # Lock is created lazily so that bucket is bound to the running event loop
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            self.refill()
+            while self.tokens < 1.0:
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1.0
+
+
+class ConcurrencyLimiter(object):
+    """Bound number of requests in flight to a limit which can change while requests wait"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.condition = None
+
+    def get_condition(self):
+        # Condition is created lazily so that limiter is bound to the running event loop
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+        return self.condition
+
+    async def acquire(self):
+        async with self.get_condition():
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        async with self.get_condition():
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    async def set_limit(self, limit):
+        async with self.get_condition():
+            self.limit = limit
+            self.condition.notify_all()
+
+
+class AsyncFetcher(object):
+    """Fetch URLs concurrently on a requests session.
+
+    Number of in-flight requests is bounded by `max_in_flight` and every
+    host gets its own token bucket of `host_rate` requests per second with
+    a burst of `host_burst`. `host_rates` can override the rate for specific
+    hosts as a dictionary of host -> requests per second. A backoff controller
+    attached as `controller` lowers both while requests are being blocked.
+    Network time, waits and bytes downloaded are recorded in `metrics`."""
+
+    def __init__(self, current_session, max_in_flight=4, host_rate=0.5, host_burst=2, host_rates=None, metrics=None):
+        self.current_session = current_session
+        self.max_in_flight = max_in_flight
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.host_rates = dict(host_rates or {})
+        self.host_buckets = dict()
+        self.limiter = ConcurrencyLimiter(max_in_flight)
+        self.rate_scale = 1.0
+        self.controller = None
+        self.metrics = metrics if metrics is not None else yrm.RunMetrics()
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def get_host_rate(self, host):
+        return self.host_rates.get(host, self.host_rate) * self.rate_scale
+
+    def get_host_bucket(self, url):
+        """Return token bucket for host of url, creating it on first use"""
+
+        host = urlsplit(url).netloc
+        if host not in self.host_buckets:
+            self.host_buckets[host] = TokenBucket(self.get_host_rate(host), self.host_burst)
+        return self.host_buckets[host]
+
+    async def set_limits(self, in_flight_limit, rate_scale):
+        """Change in-flight limit and scale rate of every host relative to its configured rate"""
+
+        self.rate_scale = rate_scale
+        for host, host_bucket in self.host_buckets.items():
+            host_bucket.refill()
+            host_bucket.rate = self.get_host_rate(host)
+        await self.limiter.set_limit(in_flight_limit)
+
+    async def fetch(self, url, referer, headers=None):
+        """Return response of GET request on url once rate budget of host allows it.
+        Headers are sent in addition to referer"""
+
+        request_headers = dict(referer=referer)
+        if headers is not None:
+            request_headers.update(headers)
+
+        wait_start = time.perf_counter()
+        await self.limiter.acquire()
+        try:
+            self.metrics.record_sleep('concurrency_limit', time.perf_counter() - wait_start)
+            wait_start = time.perf_counter()
+            await self.get_host_bucket(url).acquire()
+            self.metrics.record_sleep('rate_limit', time.perf_counter() - wait_start)
+            loop = asyncio.get_running_loop()
+            request_start = time.perf_counter()
+            response = await loop.run_in_executor(self.executor, functools.partial(self.current_session.get, url,
+                                                                                   headers=request_headers))
+            latency = time.perf_counter() - request_start
+        finally:
+            await self.limiter.release()
+        self.metrics.record('network', latency)
+        self.metrics.count('requests')
+        self.metrics.count('status_' + str(response.status_code))
+        self.metrics.count('bytes_downloaded', len(response.content))
+        if self.controller is not None:
+            await self.controller.record_response(response.status_code, latency)
+        return response
+
+    async def fetch_with_backoff(self, url, referer, max_retries=None, headers=None, forbidden_retries=None):
+        """Return response of GET request on url, retrying blocked responses, timeouts and
+        connection failures with backoff of controller. Last response is returned once retries
+        are exhausted, last timeout or connection error is raised.
+        403 responses are retried forbidden_retries times instead if it is given"""
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.fetch(url, referer, headers)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as error:
+                if self.controller is None:
+                    raise
+                await self.controller.record_failure()
+                if not await self.controller.back_off(attempt, type(error).__name__, max_retries):
+                    raise
+                attempt += 1
+                continue
+            if self.controller is None or not self.controller.is_blocked_status(response.status_code):
+                return response
+            status_retries = forbidden_retries if response.status_code == 403 and forbidden_retries is not None else max_retries
+            if not await self.controller.back_off(attempt, 'status ' + str(response.status_code), status_retries):
+                return response
+            attempt += 1
+
+    def close(self):
+        """Release worker threads used for blocking requests"""
+
+        self.executor.shutdown(wait=True)
+
+
+def create_fetcher(current_session, constants, metrics=None):
+    """Return AsyncFetcher configured from scraping constants with its backoff controller attached.
+    Fetcher records into metrics if given, into metrics of its own otherwise"""
+
+    fetcher = AsyncFetcher(current_session,
+                           max_in_flight=constants['MAX_CONCURRENT_REQUESTS'],
+                           host_rate=constants['HOST_REQUESTS_PER_SECOND'],
+                           host_burst=constants['HOST_BURST'],
+                           host_rates=constants.get('HOST_RATE_OVERRIDES'),
+                           metrics=metrics)
+    fetcher.controller = ybo.create_backoff_controller(fetcher, constants)
+    return fetcher
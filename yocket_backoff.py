@@ -0,0 +1,122 @@
+import asyncio
+import random
+import time
+
+
+class BlockedError(Exception):
+    """Raised when requests are still blocked after the retry cap of the backoff controller"""
+
+
+class BackoffController(object):
+    """Adapt request pressure of a fetcher to blocking signals.
+
+    Blocked statuses (403, 429, 5xx), slow responses, timeouts and captcha pages halve
+    the in-flight limit and the request rate of the fetcher, at most once per
+    `base_delay` seconds. Every `recovery_responses` consecutive good responses
+    the limit grows by one request and the rate by a tenth of the configured
+    rate, up to the configured values. Retries wait `base_delay * 2 ** attempt`
+    seconds, capped at `max_delay`, with random jitter of up to half the delay."""
+
+    def __init__(self, fetcher, base_delay=15.0, max_delay=600.0, max_retries=8, slow_latency=10.0, recovery_responses=20,
+                 min_rate_scale=0.05):
+        self.fetcher = fetcher
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.slow_latency = slow_latency
+        self.recovery_responses = recovery_responses
+        self.min_rate_scale = min_rate_scale
+        self.max_in_flight = fetcher.max_in_flight
+        self.consecutive_successes = 0
+        self.last_reduction = None
+        self.counters = dict(responses=0, blocked_responses=0, slow_responses=0, failed_requests=0, captcha_pages=0, retries=0, exhausted=0,
+                             reductions=0, recoveries=0, backoff_seconds=0.0)
+
+    def is_blocked_status(self, status_code):
+        return status_code in (403, 429) or status_code >= 500
+
+    async def record_response(self, status_code, latency):
+        """Update limits of fetcher from status and latency of a response"""
+
+        self.counters['responses'] += 1
+        if self.is_blocked_status(status_code):
+            self.counters['blocked_responses'] += 1
+            await self.reduce()
+        elif latency > self.slow_latency:
+            self.counters['slow_responses'] += 1
+            await self.reduce()
+        else:
+            self.consecutive_successes += 1
+            if self.consecutive_successes >= self.recovery_responses:
+                await self.recover()
+
+    async def record_failure(self):
+        """Lower limits of fetcher after a request timed out or its connection failed"""
+
+        self.counters['failed_requests'] += 1
+        await self.reduce()
+
+    async def reduce(self):
+        """Halve in-flight limit and request rate of fetcher"""
+
+        self.consecutive_successes = 0
+        current_time = time.monotonic()
+        # Failures of requests which were in flight together count as one signal
+        if self.last_reduction is not None and current_time - self.last_reduction < self.base_delay:
+            return
+        self.last_reduction = current_time
+        self.counters['reductions'] += 1
+        await self.fetcher.set_limits(max(1, self.fetcher.limiter.limit // 2), max(self.min_rate_scale, self.fetcher.rate_scale / 2.0))
+
+    async def recover(self):
+        """Raise in-flight limit and request rate of fetcher one step towards configured values"""
+
+        self.consecutive_successes = 0
+        if self.fetcher.limiter.limit >= self.max_in_flight and self.fetcher.rate_scale >= 1.0:
+            return
+        self.counters['recoveries'] += 1
+        await self.fetcher.set_limits(min(self.max_in_flight, self.fetcher.limiter.limit + 1), min(1.0, self.fetcher.rate_scale + 0.1))
+
+    def get_delay(self, attempt):
+        """Return seconds to wait before retry number attempt(starting at 0) including jitter"""
+
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay - random.uniform(0, delay / 2.0)
+
+    async def back_off(self, attempt, reason, max_retries=None):
+        """Wait before retry number attempt of a blocked request and return True.
+        False returned without waiting once attempt reaches the retry cap"""
+
+        if reason == 'captcha':
+            self.counters['captcha_pages'] += 1
+            await self.reduce()
+        if attempt >= (self.max_retries if max_retries is None else max_retries):
+            self.counters['exhausted'] += 1
+            return False
+        delay = self.get_delay(attempt)
+        print("Backing off", round(delay, 1), "seconds after", reason, "(retry", str(attempt + 1) + ")")
+        self.counters['retries'] += 1
+        self.counters['backoff_seconds'] += delay
+        self.fetcher.metrics.record_sleep('captcha_backoff' if reason == 'captcha' else 'retry_backoff', delay)
+        await asyncio.sleep(delay)
+        return True
+
+    def get_summary(self):
+        """Return dictionary of counters with current limits of fetcher"""
+
+        summary = dict(self.counters)
+        summary['backoff_seconds'] = round(summary['backoff_seconds'], 2)
+        summary['in_flight_limit'] = self.fetcher.limiter.limit
+        summary['rate_scale'] = round(self.fetcher.rate_scale, 3)
+        return summary
+
+
+def create_backoff_controller(fetcher, constants):
+    """Return BackoffController configured from scraping constants"""
+
+    return BackoffController(fetcher,
+                             base_delay=constants['BACKOFF_BASE_SECONDS'],
+                             max_delay=constants['BACKOFF_MAX_SECONDS'],
+                             max_retries=constants['BACKOFF_MAX_RETRIES'],
+                             slow_latency=constants['SLOW_RESPONSE_SECONDS'],
+                             recovery_responses=constants['RECOVERY_RESPONSES'])
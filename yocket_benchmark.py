@@ -0,0 +1,129 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import yocket_benchmark_fetch as ybf
+import yocket_benchmark_parse as ybp
+import yocket_benchmark_storage as ybs
+import yocket_benchmark_suite as ybr
+
+
+def benchmark_startup(commands, repeat):
+    """Print median wall time of starting a fresh interpreter for every command, as a user typing it would wait"""
+
+    package_directory = os.path.dirname(os.path.abspath(__file__))
+    for command_name, command_arguments in commands:
+        samples = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            subprocess.run([sys.executable] + command_arguments, cwd=package_directory, stdout=subprocess.DEVNULL, check=True)
+            samples.append(time.perf_counter() - start_time)
+        print("%-24s median=%7.1fms min=%7.1fms" % (command_name, np.median(samples) * 1000, min(samples) * 1000))
+
+
+def run_startup_benchmarks(arguments):
+    benchmark_startup([('python', ['-c', 'pass']),
+                       ('import extractors', ['-c', 'import yocket_general_extractor, yocket_university_extractor']),
+                       ('cli help', ['yocket_cli.py', '--help']),
+                       ('general dry run', ['yocket_cli.py', 'general', '--dry-run']),
+                       ('university dry run', ['yocket_cli.py', 'university', '--dry-run'])], arguments.repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark extractors against a local fixture server and saved fixture pages')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    fetch_parser = subparsers.add_parser('fetch', help='fetch engine, profile cache and worker pool against fixture server')
+    fetch_parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every fixture response')
+    fetch_parser.add_argument('--pages', type=int, default=5, help='listing pages per listing url')
+    fetch_parser.add_argument('--courses', type=int, default=2, help='course entries scraped by university benchmark')
+    fetch_parser.add_argument('--host-rate', type=float, default=1000.0, help='token bucket rate per host in requests per second')
+    fetch_parser.add_argument('--in-flight', type=int, nargs='+', default=[1, 4, 16], help='in-flight request limits to compare')
+    fetch_parser.add_argument('--course-count', type=int, default=16, help='synthetic courses scraped by worker pool benchmark')
+    fetch_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='worker pool sizes to compare')
+    fetch_parser.set_defaults(run_benchmark=ybf.run_fetch_benchmarks)
+
+    parse_parser = subparsers.add_parser('parse', help='listing page parsing over saved fixture pages')
+    parse_parser.add_argument('--fixture-directory', help='directory of saved listing pages, synthetic pages used if omitted')
+    parse_parser.add_argument('--pages', type=int, default=50, help='synthetic listing pages generated without fixture directory')
+    parse_parser.add_argument('--repeat', type=int, default=5, help='passes over fixture pages')
+    parse_parser.set_defaults(run_benchmark=ybp.run_parse_benchmarks)
+
+    export_parser = subparsers.add_parser('export', help='streaming export sinks, peak memory should not grow with rows')
+    export_parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help='rows exported per run')
+    export_parser.add_argument('--formats', nargs='+', default=['xlsx', 'csv', 'jsonl', 'pickle'], help='export formats to compare')
+    export_parser.set_defaults(run_benchmark=ybs.run_export_benchmarks)
+
+    store_parser = subparsers.add_parser('store', help='batched upserts into decision store and indexed queries against pickle streams and columnar store')
+    store_parser.add_argument('--decisions', type=int, default=100000, help='distinct decisions')
+    store_parser.add_argument('--duplication', type=int, default=3, help='times every decision is written')
+    store_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 1000], help='rows upserted per transaction')
+    store_parser.set_defaults(run_benchmark=ybs.run_store_benchmarks)
+
+    normalize_parser = subparsers.add_parser('normalize', help='per record score helpers against batch normalization')
+    normalize_parser.add_argument('--rows', type=int, default=1000000, help='records in synthetic corpus')
+    normalize_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[20, 1000, 100000], help='records normalized together')
+    normalize_parser.set_defaults(run_benchmark=ybp.run_normalize_benchmarks)
+
+    plan_parser = subparsers.add_parser('plan', help='profile requests planned by general extractor for stricter minimum GRE')
+    plan_parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every fixture response')
+    plan_parser.add_argument('--pages', type=int, default=20, help='listing pages scraped')
+    plan_parser.add_argument('--in-flight', type=int, default=8, help='in-flight request limit')
+    plan_parser.add_argument('--minimum-gre', type=int, nargs='+', default=[300, 310, 320, 330], help='minimum GRE values to compare')
+    plan_parser.set_defaults(run_benchmark=ybf.run_plan_benchmarks)
+
+    backoff_parser = subparsers.add_parser('backoff', help='general extractor against fixture server serving captcha pages and 403')
+    backoff_parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every fixture response')
+    backoff_parser.add_argument('--pages', type=int, default=10, help='listing pages scraped')
+    backoff_parser.add_argument('--in-flight', type=int, default=8, help='in-flight request limit')
+    backoff_parser.add_argument('--captcha-rate', type=float, nargs='+', default=[0.0, 0.1, 0.3], help='share of listing requests served captcha')
+    backoff_parser.add_argument('--forbidden-rate', type=float, default=0.02, help='share of requests answered with 403')
+    backoff_parser.add_argument('--block-start', type=int, default=40, help='request number at which a temporary block starts')
+    backoff_parser.add_argument('--block-length', type=int, default=10, help='requests answered with 403 during temporary block')
+    backoff_parser.set_defaults(run_benchmark=ybf.run_backoff_benchmarks)
+
+    session_parser = subparsers.add_parser('session', help='uncompressed and default requests sessions against session factory')
+    session_parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every fixture response')
+    session_parser.add_argument('--pages', type=int, default=20, help='listing pages scraped')
+    session_parser.add_argument('--in-flight', type=int, default=16, help='in-flight request limit, requests pools 10 connections by default')
+    session_parser.set_defaults(run_benchmark=ybf.run_session_benchmarks)
+
+    suite_parser = subparsers.add_parser('suite', help='both extractors replaying a fixture archive, tracked against earlier runs')
+    suite_parser.add_argument('--archive', help='fixture archive to replay, recorded from synthetic fixture server if it does not exist')
+    suite_parser.add_argument('--transport', choices=['session', 'server'], default='session',
+                              help='replay at session layer or through local fixture server')
+    suite_parser.add_argument('--pages', type=int, default=10, help='listing pages scraped by general extractor and per listing url')
+    suite_parser.add_argument('--courses', type=int, default=2, help='course entries scraped by university extractor')
+    suite_parser.add_argument('--in-flight', type=int, default=8, help='in-flight request limit, same as when archive was recorded')
+    suite_parser.add_argument('--repeat', type=int, default=3, help='runs of which best result is kept')
+    suite_parser.add_argument('--history', default=ybr.HISTORY_PATH, help='JSON lines file of earlier suite results')
+    suite_parser.add_argument('--window', type=int, default=5, help='earlier runs whose median is the baseline')
+    suite_parser.add_argument('--tolerance', type=float, default=0.25, help='share below baseline reported as regression')
+    suite_parser.set_defaults(run_benchmark=ybr.run_suite_benchmarks)
+
+    rank_parser = subparsers.add_parser('rank', help='admit tables built, updated and ranking every course against SQL per profile')
+    rank_parser.add_argument('--decisions', type=int, default=200000, help='decisions in store before the update')
+    rank_parser.add_argument('--universities', type=int, default=500, help='synthetic universities of 10 courses each')
+    rank_parser.add_argument('--added', type=int, default=2000, help='new decisions of the incremental update')
+    rank_parser.add_argument('--queries', type=int, default=1000, help='profiles ranked')
+    rank_parser.set_defaults(run_benchmark=ybs.run_rank_benchmarks)
+
+    startup_parser = subparsers.add_parser('startup', help='command line help and dry runs against importing the extractors')
+    startup_parser.add_argument('--repeat', type=int, default=10, help='interpreter starts per command')
+    startup_parser.set_defaults(run_benchmark=run_startup_benchmarks)
+
+    records_parser = subparsers.add_parser('records', help='memory of row lists against typed records and batches, and their export')
+    records_parser.add_argument('--records', type=int, default=200000, help='records held and exported')
+    records_parser.add_argument('--page-rows', type=int, default=20, help='records of a page batch')
+    records_parser.add_argument('--formats', nargs='+', default=['pickle'], help='export formats of files target')
+    records_parser.set_defaults(run_benchmark=ybs.run_records_benchmarks)
+
+    arguments = parser.parse_args()
+    # Suite exits with status 1 if it found a regression
+    sys.exit(arguments.run_benchmark(arguments))
+
+
+if __name__ == "__main__":
+    main()
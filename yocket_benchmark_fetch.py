@@ -0,0 +1,231 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import requests
+import yocket_async_fetcher as yaf
+import yocket_export_sinks as yse
+import yocket_profile_cache as ypc
+import yocket_fetch_planner as yfp
+import yocket_fixture_server as yfs
+import yocket_general_extractor as yge
+import yocket_listing_parser as ylp
+import yocket_session_factory as ysf
+import yocket_university_extractor as yue
+
+# Backoff controller summary of the last fetch benchmark run
+last_backoff_summary = None
+
+
+def configure_extractor(extractor_module, base_url, max_in_flight, host_rate):
+    """Point constants of extractor module at fixture server with given fetch budget"""
+
+    constants = yfs.rebase_constants(extractor_module.get_constants(), base_url)
+    constants['MAX_CONCURRENT_REQUESTS'] = max_in_flight
+    constants['HOST_REQUESTS_PER_SECOND'] = host_rate
+    constants['HOST_BURST'] = max_in_flight
+    if 'PAGE_WINDOW' in constants:
+        constants['PAGE_WINDOW'] = max_in_flight
+    # Fixture server recovers at once, so backoff delays are scaled down from minutes
+    constants['BACKOFF_BASE_SECONDS'] = 0.05
+    constants['BACKOFF_MAX_SECONDS'] = 1.0
+    # Benchmarks report their own results instead of run metrics files
+    constants['METRICS_FILE'] = None
+    extractor_module.global_constants = constants
+    return constants
+
+
+def run_fetch_benchmark(extractor_module, scrape_coroutine, base_url, max_in_flight, host_rate, cache_path, current_session=None):
+    """Return 3 tuple (records collected, elapsed seconds, profile cache summary) for scrape coroutine factory.
+    Scrape coroutine returns number of records collected. Requests go through current_session if given, a new session otherwise"""
+
+    constants = configure_extractor(extractor_module, base_url, max_in_flight, host_rate)
+    constants['PROFILE_CACHE_PATH'] = cache_path
+    # Benchmark runs always paginate from the first page
+    constants['CHECKPOINT_DIRECTORY'] = tempfile.mkdtemp(prefix='checkpoints_', dir=os.path.dirname(cache_path))
+    constants['DECISION_STORE_PATH'] = os.path.join(constants['CHECKPOINT_DIRECTORY'], 'decisions.sqlite')
+    extractor_module.profile_cache = ypc.create_profile_cache(constants)
+    extractor_module.fetch_planner = yfp.FetchPlanner(ylp.split_bucket_university_course, extractor_module.profile_cache)
+    fetcher = yaf.create_fetcher(current_session if current_session is not None else ysf.create_session(constants), constants)
+    extractor_module.run_metrics = fetcher.metrics
+    start_time = time.perf_counter()
+    try:
+        records = asyncio.run(scrape_coroutine(fetcher))
+    finally:
+        fetcher.close()
+        extractor_module.profile_cache.close()
+    global last_backoff_summary
+    last_backoff_summary = fetcher.controller.get_summary()
+    return records, time.perf_counter() - start_time, extractor_module.profile_cache.get_summary()
+
+
+def benchmark_general(base_url, pages, max_in_flight, host_rate, cache_path, minimum_gre=None, current_session=None):
+    """Benchmark general extractor over pages listing pages"""
+
+    async def scrape_coroutine(fetcher):
+        if minimum_gre is not None:
+            yge.global_constants['MINIMUM_GRE'] = minimum_gre
+        yge.global_constants['NUMBER_PAGE_TO_SCRAPE_FIRST'] = 1
+        yge.global_constants['NUMBER_PAGE_TO_SCRAPE_LAST'] = pages + 1
+        yge.global_constants['EXPORT_FILE_NAME'] = os.path.join(yge.global_constants['CHECKPOINT_DIRECTORY'], 'yocket_data')
+        with yge.open_export_sink() as export_sink:
+            return await yge.scrape_all_pages(fetcher, export_sink)
+
+    return run_fetch_benchmark(yge, scrape_coroutine, base_url, max_in_flight, host_rate, cache_path, current_session)
+
+
+def benchmark_university(base_url, courses, max_in_flight, host_rate, cache_path, current_session=None, export_directory=None):
+    """Benchmark university extractor over first courses entries of course_url.
+    Courses are also exported into export_directory if given"""
+
+    async def scrape_courses(fetcher):
+        course_records = 0
+        for course_name, course_value in list(yue.global_constants['course_url'].items())[:courses]:
+            await yue.scrape_course(fetcher, course_name, course_value)
+            course_records += sum(1 for _ in yue.iterate_course_records(course_name))
+            if export_directory is not None:
+                yue.global_constants['OUTPUT_DIRECTORY'] = export_directory
+                yue.export_course(course_name, None)
+        return course_records
+
+    return run_fetch_benchmark(yue, scrape_courses, base_url, max_in_flight, host_rate, cache_path, current_session)
+
+
+def benchmark_course_pool(base_url, course_count, workers, max_in_flight, host_rate, benchmark_directory):
+    """Benchmark university worker pool over course_count synthetic courses.
+    Return 2 tuple (records in combined dataset, elapsed seconds)"""
+
+    course_url = dict()
+    for course_index in range(course_count):
+        course_url['Synthetic_%d' % course_index] = yfs.LIVE_HOME_PAGE + 'applications-admits-rejects/%d-synthetic-university/' % course_index
+    constants = configure_extractor(yue, base_url, max_in_flight, host_rate)
+    constants['course_url'] = yfs.rebase_constants(course_url, base_url)
+    constants['COURSE_WORKERS'] = workers
+    constants['CHECKPOINT_DIRECTORY'] = os.path.join(benchmark_directory, 'workers_%d_checkpoints' % workers)
+    constants['OUTPUT_DIRECTORY'] = os.path.join(benchmark_directory, 'workers_%d' % workers) + '/'
+    constants['PROFILE_CACHE_PATH'] = os.path.join(benchmark_directory, 'workers_%d.sqlite' % workers)
+    constants['DECISION_STORE_PATH'] = os.path.join(benchmark_directory, 'workers_%d_decisions.sqlite' % workers)
+    os.makedirs(constants['OUTPUT_DIRECTORY'])
+
+    start_time = time.perf_counter()
+    yue.perform_scraping_with_workers(dict())
+    elapsed = time.perf_counter() - start_time
+    return sum(1 for _ in yse.read_pickle_stream(constants['OUTPUT_DIRECTORY'] + constants['COMBINED_EXPORT_NAME'] + '.pkls')), elapsed
+
+
+def print_result(name, max_in_flight, records, elapsed, cache_summary):
+    print("%-16s in-flight=%-3d records=%-6d elapsed=%8.2fs records/sec=%8.1f profile fetches=%-5d cache hit rate=%.2f" %
+          (name, max_in_flight, records, elapsed, records / elapsed if elapsed > 0 else 0.0, cache_summary['fetched'],
+           cache_summary['hit_rate']))
+
+
+def expire_profile_cache(cache_path):
+    """Age every cached profile beyond any TTL, next run requests them again as conditional requests"""
+
+    connection = sqlite3.connect(cache_path)
+    connection.execute('UPDATE profile_pages SET fetched_at = 0')
+    connection.commit()
+    connection.close()
+
+
+def create_default_session(accept_encoding=None):
+    """Return session with connection pool and encodings of requests defaults, only counting transferred bytes"""
+
+    current_session = requests.session()
+    if accept_encoding is not None:
+        current_session.headers['Accept-Encoding'] = accept_encoding
+    session_adapter = ysf.SessionAdapter()
+    current_session.mount('http://', session_adapter)
+    current_session.mount('https://', session_adapter)
+    return current_session
+
+
+def run_session_benchmarks(arguments):
+    fixture_server = yfs.start_fixture_server(yfs.SyntheticPageSource(pages_per_listing=arguments.pages), latency=arguments.latency)
+    base_url = yfs.get_server_url(fixture_server)
+    session_constants = dict(yge.get_constants(), MAX_CONCURRENT_REQUESTS=arguments.in_flight)
+    try:
+        with tempfile.TemporaryDirectory(prefix='yocket_benchmark_') as benchmark_directory:
+            session_factories = [('identity', lambda: create_default_session('identity')), ('default', create_default_session),
+                                 ('pooled', lambda: ysf.create_session(session_constants))]
+            for session_name, create_session in session_factories:
+                cache_path = os.path.join(benchmark_directory, 'profile_cache_%s.sqlite' % session_name)
+                # Second run finds every profile expired and revalidates it
+                for run_name in ('cold', 'expired'):
+                    if run_name == 'expired':
+                        expire_profile_cache(cache_path)
+                    current_session = create_session()
+                    records, elapsed, cache_summary = benchmark_general(base_url, arguments.pages, arguments.in_flight, 1000.0, cache_path,
+                                                                        current_session=current_session)
+                    transfer_summary = ysf.get_transfer_summary(current_session, base_url)
+                    print("%-8s %-8s records=%-5d elapsed=%7.2fs records/sec=%7.1f connections=%-4d wire bytes=%-9d content bytes=%-9d "
+                          "not modified=%-4d" % (session_name, run_name, records, elapsed, records / elapsed if elapsed > 0 else 0.0,
+                                                 transfer_summary['connections_opened'], transfer_summary['wire_bytes'],
+                                                 transfer_summary['content_bytes'], cache_summary['not_modified']))
+                    current_session.close()
+    finally:
+        fixture_server.shutdown()
+
+
+def run_plan_benchmarks(arguments):
+    page_source = yfs.SyntheticPageSource(pages_per_listing=arguments.pages)
+    fixture_server = yfs.start_fixture_server(page_source, latency=arguments.latency)
+    base_url = yfs.get_server_url(fixture_server)
+    try:
+        with tempfile.TemporaryDirectory(prefix='yocket_benchmark_') as benchmark_directory:
+            for minimum_gre in arguments.minimum_gre:
+                # Every threshold starts from an empty profile cache
+                cache_path = os.path.join(benchmark_directory, 'profile_cache_%d.sqlite' % minimum_gre)
+                records, elapsed, cache_summary = benchmark_general(base_url, arguments.pages, arguments.in_flight, 1000.0, cache_path,
+                                                                    minimum_gre)
+                plan_summary = yge.fetch_planner.get_summary()
+                print("minimum GRE=%-4d records=%-6d elapsed=%8.2fs listed=%-6d profile requests=%-6d avoided=%-6d" %
+                      (minimum_gre, records, elapsed, plan_summary['listed'], plan_summary['profile_requests'],
+                       plan_summary['avoided_profile_requests']))
+    finally:
+        fixture_server.shutdown()
+
+
+def run_backoff_benchmarks(arguments):
+    with tempfile.TemporaryDirectory(prefix='yocket_benchmark_') as benchmark_directory:
+        for captcha_rate in arguments.captcha_rate:
+            page_source = yfs.FaultInjectingPageSource(yfs.SyntheticPageSource(pages_per_listing=arguments.pages), captcha_rate=captcha_rate,
+                                                       forbidden_rate=arguments.forbidden_rate, block_start=arguments.block_start,
+                                                       block_length=arguments.block_length)
+            fixture_server = yfs.start_fixture_server(page_source, latency=arguments.latency)
+            try:
+                # Every fault rate starts from an empty profile cache
+                cache_path = os.path.join(benchmark_directory, 'profile_cache_%d.sqlite' % int(captcha_rate * 1000))
+                records, elapsed, cache_summary = benchmark_general(yfs.get_server_url(fixture_server), arguments.pages, arguments.in_flight,
+                                                                    1000.0, cache_path)
+            finally:
+                fixture_server.shutdown()
+            print("captcha rate=%-5.2f records=%-6d elapsed=%8.2fs backoff=%7.2fs requests=%-6d retries=%-5d reductions=%-4d recoveries=%-4d" %
+                  (captcha_rate, records, elapsed, last_backoff_summary['backoff_seconds'], last_backoff_summary['responses'],
+                   last_backoff_summary['retries'], last_backoff_summary['reductions'], last_backoff_summary['recoveries']))
+
+
+def run_fetch_benchmarks(arguments):
+    page_source = yfs.SyntheticPageSource(pages_per_listing=arguments.pages)
+    fixture_server = yfs.start_fixture_server(page_source, latency=arguments.latency)
+    base_url = yfs.get_server_url(fixture_server)
+    try:
+        with tempfile.TemporaryDirectory(prefix='yocket_benchmark_') as benchmark_directory:
+            for max_in_flight in arguments.in_flight:
+                # Every in-flight limit starts from an empty profile cache
+                cache_path = os.path.join(benchmark_directory, 'profile_cache_%d.sqlite' % max_in_flight)
+                print_result('general', max_in_flight, *benchmark_general(base_url, arguments.pages, max_in_flight, arguments.host_rate,
+                                                                          cache_path))
+                print_result('university', max_in_flight, *benchmark_university(base_url, arguments.courses, max_in_flight,
+                                                                                arguments.host_rate, cache_path))
+                # Second university run stands in for a re-run served from the on-disk cache
+                print_result('university rerun', max_in_flight, *benchmark_university(base_url, arguments.courses, max_in_flight,
+                                                                                      arguments.host_rate, cache_path))
+            for workers in arguments.workers:
+                records, elapsed = benchmark_course_pool(base_url, arguments.course_count, workers, arguments.in_flight[0], arguments.host_rate,
+                                                         benchmark_directory)
+                print("%-16s workers=%-5d records=%-6d elapsed=%8.2fs records/sec=%8.1f" % ('course pool', workers, records, elapsed,
+                                                                                           records / elapsed if elapsed > 0 else 0.0))
+    finally:
+        fixture_server.shutdown()
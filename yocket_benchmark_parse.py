@@ -0,0 +1,139 @@
+import functools
+import os
+import random
+import tempfile
+import time
+from lxml import html as lxml_html
+import yocket_fixture_server as yfs
+import yocket_listing_parser as ylp
+import yocket_score_normalizer as ysn
+
+# Minimum scores applied by listing parser in parse benchmark
+PARSE_CONSTANTS = dict(MINIMUM_GRE=320, MINIMUM_GPA=7.5, MINIMUM_TOEFL=100)
+
+
+def parse_listing_page_per_field(tree):
+    """Return decisions of listing page with one uncompiled XPath call per field as extractors did before the listing parser"""
+
+    page_decisions = []
+    decision_buckets = tree.xpath('//*[@class="row"]/div[@class="col-sm-6"]/div[@class="panel panel-warning"]/div[@class="panel-body"]')
+    for individual_decision_bucket in decision_buckets:
+        current_admit_status = ((individual_decision_bucket.xpath('./div[1]/div[2]/label'))[0]).text.strip()
+        if current_admit_status.lower() == 'admit' or current_admit_status.lower() == 'reject':
+            current_bucket_university_course = ((individual_decision_bucket.xpath('./div[1]/div[1]/h4/small'))[0]).text.replace("\n", "").strip()
+            current_gre = ysn.get_gre_or_toefl(((((individual_decision_bucket.xpath('./div[2]/div[1]'))[0]).getchildren())[1]).tail)
+            current_toefl = ysn.get_gre_or_toefl(((((individual_decision_bucket.xpath('./div[2]/div[2]'))[0]).getchildren())[1]).tail)
+            current_gpa = ysn.get_gpa(((((individual_decision_bucket.xpath('./div[2]/div[3]'))[0]).getchildren())[1]).tail)
+            current_workex = ysn.get_first_integer(((((individual_decision_bucket.xpath('./div[2]/div[4]'))[0]).getchildren())[1]).tail)
+            profile_page_path = ((individual_decision_bucket.xpath('./div[1]/div[1]/h4/a'))[0]).attrib['href']
+            page_decisions.append((profile_page_path, current_bucket_university_course.lower(), current_admit_status, current_gre,
+                                   current_toefl, current_gpa, current_workex))
+    return page_decisions
+
+
+def parse_listing_page_decisions(tree):
+    """Return admit and reject decisions of listing page parsed by listing parser"""
+
+    return [decision for decision in ylp.parse_listing_page(tree, PARSE_CONSTANTS) if decision.admit_status.lower() in ylp.DECISION_STATUSES]
+
+
+def save_fixture_pages(fixture_directory, pages):
+    """Write synthetic listing pages into fixture directory"""
+
+    os.makedirs(fixture_directory, exist_ok=True)
+    page_source = yfs.SyntheticPageSource(pages_per_listing=pages)
+    for page_index in range(1, pages + 1):
+        with open(os.path.join(fixture_directory, 'listing_%d.html' % page_index), 'w', encoding='utf-8') as f:
+            f.write(page_source.get_page('/profiles/find/matching-admits-and-rejects?page=%d' % page_index)[1])
+
+
+def load_fixture_trees(fixture_directory):
+    """Return parsed html trees of saved listing pages in fixture directory"""
+
+    fixture_trees = []
+    for file_name in sorted(os.listdir(fixture_directory)):
+        if file_name.endswith('.html'):
+            with open(os.path.join(fixture_directory, file_name), 'rb') as f:
+                fixture_trees.append(lxml_html.fromstring(f.read()))
+    return fixture_trees
+
+
+def benchmark_listing_parser(fixture_trees, repeat):
+    """Print records/sec of per field XPath extraction against listing parser over fixture pages"""
+
+    for name, parse_page in [('per-field xpath', parse_listing_page_per_field), ('listing parser', parse_listing_page_decisions)]:
+        records = 0
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            for tree in fixture_trees:
+                records += len(parse_page(tree))
+        elapsed = time.perf_counter() - start_time
+        print("%-16s pages=%-6d records=%-8d elapsed=%8.3fs records/sec=%10.1f" % (name, len(fixture_trees) * repeat, records, elapsed,
+                                                                                  records / elapsed if elapsed > 0 else 0.0))
+
+
+def generate_score_texts(row_count):
+    """Return 4 tuple of lists (GRE, TOEFL, GPA, work experience) of raw score texts as found on listing pages"""
+
+    score_random = random.Random(row_count)
+    gre_texts = ['\n%d\n' % score_random.randrange(290, 341) for _ in range(row_count)]
+    toefl_texts = [score_random.choice(['\n%d\n' % score_random.randrange(80, 121), '\n7.5\n', '']) for _ in range(row_count)]
+    gpa_texts = [score_random.choice(['\n%.2f CGPA\n' % score_random.uniform(6, 10), '\n%d %%\n' % score_random.randrange(55, 96)])
+                 for _ in range(row_count)]
+    workex_texts = ['\n%d months\n' % score_random.randrange(0, 60) for _ in range(row_count)]
+    return gre_texts, toefl_texts, gpa_texts, workex_texts
+
+
+def normalize_per_record(gre_texts, toefl_texts, gpa_texts, workex_texts):
+    """Return number of records meeting minimum scores using scalar score helpers, as listing parser does per page"""
+
+    qualifying = 0
+    for gre_text, toefl_text, gpa_text, workex_text in zip(gre_texts, toefl_texts, gpa_texts, workex_texts):
+        current_gre = ysn.get_gre_or_toefl(gre_text)
+        current_toefl = ysn.get_gre_or_toefl(toefl_text)
+        current_gpa = ysn.get_gpa(gpa_text)
+        ysn.get_first_integer(workex_text)
+        if ysn.meets_criteria(current_gre, current_gpa, current_toefl, PARSE_CONSTANTS):
+            qualifying += 1
+    return qualifying
+
+
+def normalize_batch(gre_texts, toefl_texts, gpa_texts, workex_texts, batch_rows):
+    """Return number of records meeting minimum scores using batch normalization in batches of batch_rows"""
+
+    qualifying = 0
+    for batch_start in range(0, len(gre_texts), batch_rows):
+        batch_end = batch_start + batch_rows
+        scores = ysn.normalize_scores(gre_texts[batch_start:batch_end], toefl_texts[batch_start:batch_end], gpa_texts[batch_start:batch_end],
+                                      workex_texts[batch_start:batch_end])
+        qualifying += int(ysn.get_criteria_mask(scores, PARSE_CONSTANTS).sum())
+    return qualifying
+
+
+def benchmark_normalization(row_count, batch_sizes):
+    """Print records/sec of per record score helpers against batch normalization over a synthetic corpus"""
+
+    score_texts = generate_score_texts(row_count)
+    runs = [('per-record', functools.partial(normalize_per_record, *score_texts))]
+    for batch_rows in batch_sizes:
+        runs.append(('batch %d' % batch_rows, functools.partial(normalize_batch, *score_texts, batch_rows=batch_rows)))
+    for name, normalize in runs:
+        start_time = time.perf_counter()
+        qualifying = normalize()
+        elapsed = time.perf_counter() - start_time
+        print("%-16s records=%-8d qualifying=%-8d elapsed=%8.3fs records/sec=%12.1f" % (name, row_count, qualifying, elapsed,
+                                                                                       row_count / elapsed if elapsed > 0 else 0.0))
+
+
+def run_parse_benchmarks(arguments):
+    if arguments.fixture_directory is not None:
+        benchmark_listing_parser(load_fixture_trees(arguments.fixture_directory), arguments.repeat)
+        return
+    with tempfile.TemporaryDirectory(prefix='yocket_fixtures_') as fixture_directory:
+        save_fixture_pages(fixture_directory, arguments.pages)
+        fixture_trees = load_fixture_trees(fixture_directory)
+    benchmark_listing_parser(fixture_trees, arguments.repeat)
+
+
+def run_normalize_benchmarks(arguments):
+    benchmark_normalization(arguments.rows, arguments.batch_sizes)
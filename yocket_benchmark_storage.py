@@ -0,0 +1,274 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import yocket_admit_tables as yat
+import yocket_columnar_store as ycs
+import yocket_decision_store as yds
+import yocket_export_sinks as yse
+import yocket_records as yrc
+import yocket_university_extractor as yue
+
+
+def generate_export_rows(row_count):
+    """Yield synthetic decision rows laid out like university extractor records"""
+
+    for row_index in range(row_count):
+        yield ['computer science', 'synthetic university ', 8.5, '165', '158', '110', '24', 'B.Tech Computer Science',
+               'Institute %d' % (row_index % 50), 'Admit', '1', '/profile/%d' % row_index]
+
+
+def benchmark_export(row_counts, export_formats, benchmark_directory):
+    """Print elapsed time and peak traced memory of streaming row_count rows into every export format"""
+
+    for export_format in export_formats:
+        for row_count in row_counts:
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            with yse.open_sinks(os.path.join(benchmark_directory, '%s_%d' % (export_format, row_count)), yue.HEADER_FIELDS,
+                                [export_format]) as export_sink:
+                for row in generate_export_rows(row_count):
+                    export_sink.write_row(row)
+            elapsed = time.perf_counter() - start_time
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("%-8s rows=%-8d elapsed=%8.3fs rows/sec=%10.1f peak memory=%8.1f KiB" % (export_format, row_count, elapsed,
+                                                                                         row_count / elapsed if elapsed > 0 else 0.0,
+                                                                                         peak_memory / 1024.0))
+
+
+def generate_store_rows(decision_count, duplication, university_count=50, first_decision=0):
+    """Return list of synthetic university records where every decision appears duplication times, as it does
+    when overlapping courses, the general listing and later runs see it again"""
+
+    row_random = random.Random(7 + first_decision)
+    decision_rows = []
+    for decision_index in range(first_decision, first_decision + decision_count):
+        gre_quant = row_random.randint(150, 170)
+        gre_verbal = row_random.randint(140, 170)
+        decision_rows.append(['course %d' % row_random.randint(0, 9), 'university %d' % row_random.randint(0, university_count - 1),
+                              round(row_random.uniform(6.0, 10.0), 2), str(gre_quant), str(gre_verbal), str(row_random.randint(80, 120)),
+                              str(row_random.randint(0, 48)), 'B.Tech', 'Institute %d' % (decision_index % 50),
+                              row_random.choice(['Admit', 'Reject']), str(row_random.randint(0, 3)), '/profile/%d' % decision_index])
+    store_rows = decision_rows * duplication
+    row_random.shuffle(store_rows)
+    return store_rows
+
+
+def query_pickle_stream(pickle_path, university, minimum_gpa, minimum_gre):
+    """Return decisions matching filters by loading and merging a pickle stream, as analytics did before the decision store"""
+
+    merged_decisions = dict()
+    for row in yse.read_pickle_stream(pickle_path):
+        merged_decisions[(row[11], row[1], row[0], row[9])] = row
+    return [row for row in merged_decisions.values()
+            if row[1] == university and float(row[2]) >= minimum_gpa and int(row[3]) + int(row[4]) >= minimum_gre]
+
+
+def benchmark_decision_store(decision_count, duplication, batch_sizes, benchmark_directory):
+    """Print upsert throughput of decision store per batch size and query time against merging a pickle stream"""
+
+    store_rows = generate_store_rows(decision_count, duplication)
+    for batch_rows in batch_sizes:
+        database_path = os.path.join(benchmark_directory, 'decisions_%d.sqlite' % batch_rows)
+        start_time = time.perf_counter()
+        store_sink = yds.DecisionStoreSink(database_path, yue.HEADER_FIELDS, batch_rows=batch_rows)
+        for row in store_rows:
+            store_sink.write_row(row)
+        store_sink.close()
+        elapsed = time.perf_counter() - start_time
+        decision_store = yds.DecisionStore(database_path)
+        print("upsert batch=%-7d rows=%-8d stored decisions=%-7d elapsed=%8.3fs rows/sec=%10.1f" %
+              (batch_rows, len(store_rows), decision_store.count(), elapsed, len(store_rows) / elapsed if elapsed > 0 else 0.0))
+        decision_store.close()
+
+    pickle_path = os.path.join(benchmark_directory, 'decisions.pkls')
+    with yse.open_sinks(pickle_path[:-len('.pkls')], yue.HEADER_FIELDS, ['pickle']) as export_sink:
+        for row in store_rows:
+            export_sink.write_row(row)
+    query_filters = dict(university='university 7', minimum_gpa=8.0, minimum_gre=320)
+    decision_store = yds.DecisionStore(os.path.join(benchmark_directory, 'decisions_%d.sqlite' % batch_sizes[-1]))
+    start_time = time.perf_counter()
+    store_matches = decision_store.read(**query_filters)
+    store_elapsed = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    pickle_matches = query_pickle_stream(pickle_path, **query_filters)
+    pickle_elapsed = time.perf_counter() - start_time
+    print("query plan:", decision_store.get_query_plan(**query_filters))
+    print("query decision store matches=%-6d elapsed=%8.4fs" % (len(store_matches), store_elapsed))
+    print("query pickle stream  matches=%-6d elapsed=%8.4fs" % (len(pickle_matches), pickle_elapsed))
+    decision_store.close()
+    if ycs.pa is not None:
+        benchmark_columnar_store(generate_store_rows(decision_count, 1), query_filters, os.path.join(benchmark_directory, 'columnar'))
+
+
+def benchmark_columnar_store(decision_rows, query_filters, store_directory):
+    """Print append throughput of columnar store and time of filtered reads and admit rate bands pushed down into the scan"""
+
+    start_time = time.perf_counter()
+    with yse.MultiSink(ycs.open_columnar_sinks(store_directory, yue.HEADER_FIELDS)) as store_sink:
+        store_sink.write_rows(decision_rows, yrc.UNIVERSITY_ROW_FIELDS)
+    elapsed = time.perf_counter() - start_time
+    print("append columnar store rows=%-8d elapsed=%8.3fs rows/sec=%10.1f" % (len(decision_rows), elapsed,
+                                                                             len(decision_rows) / elapsed if elapsed > 0 else 0.0))
+    columnar_store = ycs.ColumnarStore(store_directory)
+    start_time = time.perf_counter()
+    columnar_matches = columnar_store.read(**query_filters)
+    print("query columnar store matches=%-6d elapsed=%8.4fs" % (columnar_matches.num_rows, time.perf_counter() - start_time))
+    start_time = time.perf_counter()
+    admit_rate_bands = columnar_store.admit_rate_by_band(university=query_filters['university'])
+    print("admit rate bands of %s bands=%-6d elapsed=%8.4fs" % (query_filters['university'], admit_rate_bands.num_rows,
+                                                                time.perf_counter() - start_time))
+
+
+def write_store_rows(database_path, store_rows):
+    store_sink = yds.DecisionStoreSink(database_path, yue.HEADER_FIELDS)
+    for row in store_rows:
+        store_sink.write_row(row)
+    store_sink.close()
+
+
+def benchmark_admit_tables(decision_count, university_count, added_decisions, query_count, benchmark_directory):
+    """Print build, incremental update and ranking time of admit tables against a SQL query per profile"""
+
+    database_path = os.path.join(benchmark_directory, 'decisions.sqlite')
+    tables_path = os.path.join(benchmark_directory, 'admit_tables.npz')
+    write_store_rows(database_path, generate_store_rows(decision_count, 1, university_count))
+    constants = dict(DECISION_STORE_PATH=database_path, ADMIT_TABLES_PATH=tables_path)
+    start_time = time.perf_counter()
+    admit_tables = yat.refresh_admit_tables(constants)
+    build_elapsed = time.perf_counter() - start_time
+    print("build    decisions=%-8d courses=%-6d elapsed=%8.3fs file size=%8.1f KiB" %
+          (admit_tables.get_summary()['decisions'], admit_tables.get_summary()['courses'], build_elapsed, os.path.getsize(tables_path) / 1024.0))
+
+    # New decisions of a later run and decisions seen again, only the new ones are counted in
+    write_store_rows(database_path, generate_store_rows(added_decisions, 1, university_count, decision_count) +
+                     generate_store_rows(added_decisions, 1, university_count))
+    start_time = time.perf_counter()
+    admit_tables = yat.refresh_admit_tables(constants)
+    update_elapsed = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    rebuilt_tables = yat.AdmitTables()
+    decision_store = yds.DecisionStore(database_path)
+    rebuilt_tables.update_from_store(decision_store)
+    rebuild_elapsed = time.perf_counter() - start_time
+    print("update   added=%-12d decisions=%-8d elapsed=%8.3fs full rebuild=%8.3fs identical=%s" %
+          (added_decisions, admit_tables.get_summary()['decisions'], update_elapsed, rebuild_elapsed,
+           all(np.array_equal(admit_tables.decisions[dimension], rebuilt_tables.decisions[dimension]) for dimension in yat.DIMENSIONS)))
+
+    query_random = random.Random(11)
+    profiles = [(round(query_random.uniform(6.5, 10.0), 2), query_random.randint(295, 340), query_random.randint(85, 120),
+                 query_random.randint(0, 48)) for _ in range(query_count)]
+    for limit in (None, 20):
+        samples = []
+        for gpa, gre, toefl, workex in profiles:
+            start_time = time.perf_counter()
+            admit_tables.rank(gpa, gre, toefl, workex, limit=limit)
+            samples.append(time.perf_counter() - start_time)
+        print("rank     courses=%-6s queries=%-6d median=%8.1fus p99=%8.1fus" % ('all' if limit is None else limit, query_count,
+                                                                                  np.median(samples) * 1e6, np.percentile(samples, 99) * 1e6))
+
+    # Without tables every profile is an aggregate over the decisions of its score band
+    samples = []
+    for gpa, gre, toefl, workex in profiles[:20]:
+        start_time = time.perf_counter()
+        decision_store.connection.execute("SELECT university, course, AVG(LOWER(status) = 'admit') AS admit_rate, COUNT(*) FROM decisions "
+                                          "WHERE gpa BETWEEN ? AND ? AND gre BETWEEN ? AND ? GROUP BY university, course ORDER BY admit_rate DESC",
+                                          [gpa - 0.25, gpa + 0.25, gre - 3, gre + 3]).fetchall()
+        samples.append(time.perf_counter() - start_time)
+    print("sql      courses=%-6s queries=%-6d median=%8.1fus" % ('all', len(samples), np.median(samples) * 1e6))
+    decision_store.close()
+
+
+def iterate_scraped_fields(record_count):
+    """Yield field tuples of university records as scraping returned them before typed records, every text
+    a new string as lxml creates one per text node and GRE split and papers still texts"""
+
+    field_random = random.Random(record_count)
+    for record_index in range(record_count):
+        yield (''.join(['course ', str(record_index % 10)]), ''.join(['university ', str(field_random.randint(0, 499))]),
+               round(field_random.uniform(6.0, 10.0), 2), str(field_random.randint(150, 170)), str(field_random.randint(140, 170)),
+               field_random.randint(80, 120), field_random.randint(0, 48), ''.join(['B.Tech ', 'Computer Science']),
+               ''.join(['Institute ', str(field_random.randint(0, 199))]), ''.join([field_random.choice(['Admit', 'Reject'])]),
+               str(field_random.randint(0, 3)), '/profile/%d' % record_index)
+
+
+def hold_row_lists(record_count):
+    return [list(scraped_fields) for scraped_fields in iterate_scraped_fields(record_count)]
+
+
+def hold_records(record_count):
+    return [yrc.DecisionRecord.from_row(scraped_fields, yrc.UNIVERSITY_ROW_FIELDS) for scraped_fields in iterate_scraped_fields(record_count)]
+
+
+def hold_record_batch(record_count):
+    record_batch = yrc.RecordBatch()
+    for scraped_fields in iterate_scraped_fields(record_count):
+        record_batch.append(yrc.DecisionRecord.from_row(scraped_fields, yrc.UNIVERSITY_ROW_FIELDS))
+    return record_batch
+
+
+def benchmark_records(record_count, page_rows, export_formats, benchmark_directory):
+    """Print traced memory per record held as row lists, typed records and record batch,
+    and elapsed time of exporting them row by row, in chunks of rows and as page batches into export formats and decision store"""
+
+    held_records = dict()
+    for name, hold in [('row lists', hold_row_lists), ('records', hold_records), ('record batch', hold_record_batch)]:
+        tracemalloc.start()
+        held_records[name] = hold(record_count)
+        current_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print("%-12s records=%-8d memory=%8.1f KiB bytes/record=%6.1f" % (name, record_count, current_memory / 1024.0,
+                                                                         current_memory / float(record_count)))
+
+    page_batches = []
+    for batch_start in range(0, record_count, page_rows):
+        page_batch = yrc.RecordBatch()
+        page_batch.extend(held_records['records'][batch_start:batch_start + page_rows])
+        page_batches.append(page_batch)
+    # University export reads typed rows back from checkpoint records files and writes them in chunks
+    typed_rows = [record.to_row(yrc.UNIVERSITY_ROW_FIELDS) for record in held_records['records']]
+    # Upserts cost the same whichever way records come in, so files and decision store are timed apart
+    for target in ['files', 'store']:
+        for name in ['row lists', 'row chunks', 'page batches']:
+            base_path = os.path.join(benchmark_directory, target + '_' + name.replace(' ', '_'))
+            start_time = time.perf_counter()
+            if target == 'files':
+                export_sink = yse.open_sinks(base_path, yue.HEADER_FIELDS, export_formats)
+            else:
+                export_sink = yse.MultiSink(yds.open_decision_store_sinks(base_path + '.sqlite', yue.HEADER_FIELDS))
+            with export_sink:
+                if name == 'row lists':
+                    for row in held_records[name]:
+                        export_sink.write_row(row)
+                elif name == 'row chunks':
+                    for rows in yse.iterate_chunks(typed_rows, yue.EXPORT_BATCH_ROWS):
+                        export_sink.write_rows(rows, yrc.UNIVERSITY_ROW_FIELDS)
+                else:
+                    for page_batch in page_batches:
+                        export_sink.write_batch(page_batch, yrc.UNIVERSITY_ROW_FIELDS)
+            elapsed = time.perf_counter() - start_time
+            print("%-6s %-12s records=%-8d elapsed=%8.3fs records/sec=%10.1f" % (target, name, record_count, elapsed,
+                                                                                record_count / elapsed if elapsed > 0 else 0.0))
+
+
+def run_export_benchmarks(arguments):
+    with tempfile.TemporaryDirectory(prefix='yocket_export_') as benchmark_directory:
+        benchmark_export(arguments.rows, arguments.formats, benchmark_directory)
+
+
+def run_store_benchmarks(arguments):
+    with tempfile.TemporaryDirectory(prefix='yocket_store_') as benchmark_directory:
+        benchmark_decision_store(arguments.decisions, arguments.duplication, arguments.batch_sizes, benchmark_directory)
+
+
+def run_rank_benchmarks(arguments):
+    with tempfile.TemporaryDirectory(prefix='yocket_rank_') as benchmark_directory:
+        benchmark_admit_tables(arguments.decisions, arguments.universities, arguments.added, arguments.queries, benchmark_directory)
+
+
+def run_records_benchmarks(arguments):
+    with tempfile.TemporaryDirectory(prefix='yocket_records_') as benchmark_directory:
+        benchmark_records(arguments.records, arguments.page_rows, arguments.formats, benchmark_directory)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import requests
+import yocket_benchmark_fetch as ybf
+import yocket_fixture_server as yfs
+import yocket_general_extractor as yge
+import yocket_replay as yrp
+import yocket_university_extractor as yue
+
+# Suite results are appended here unless another history file is given, the directory is ignored by git
+HISTORY_PATH = os.path.join('benchmark_results', 'yocket_benchmark_history.jsonl')
+
+
+def record_fixture_archive(archive_path, pages, courses, max_in_flight):
+    """Record responses of general and university runs against synthetic fixture server into fixture archive"""
+
+    fixture_server = yfs.start_fixture_server(yfs.SyntheticPageSource(pages_per_listing=pages))
+    base_url = yfs.get_server_url(fixture_server)
+    archive_writer = yrp.FixtureArchiveWriter(archive_path)
+    recording_session = yrp.mount_http_archive(requests.session(), archive_writer)
+    try:
+        with tempfile.TemporaryDirectory(prefix='yocket_record_') as benchmark_directory:
+            ybf.benchmark_general(base_url, pages, max_in_flight, 1000.0, os.path.join(benchmark_directory, 'general.sqlite'),
+                                  current_session=recording_session)
+            ybf.benchmark_university(base_url, courses, max_in_flight, 1000.0, os.path.join(benchmark_directory, 'university.sqlite'),
+                                     current_session=recording_session)
+    finally:
+        archive_writer.close()
+        fixture_server.shutdown()
+    print("Recorded fixture archive", archive_path, archive_writer.get_summary())
+
+
+def get_archive_digest(archive):
+    """Return digest of recorded responses, runs are only compared against history of the same fixtures"""
+
+    archive_hash = hashlib.sha1()
+    for request_key, status_code, content in archive.iterate_responses():
+        archive_hash.update(('%s %d %s\n' % (request_key, status_code, hashlib.sha1(content).hexdigest())).encode('utf-8'))
+    return archive_hash.hexdigest()[:16]
+
+
+def get_stage_throughput(run_summary, stage_names, items):
+    """Return items per second of time spent in stages of run metrics summary"""
+
+    stage_seconds = sum(run_summary['stages'][stage_name]['total_seconds'] for stage_name in stage_names if stage_name in run_summary['stages'])
+    return items / stage_seconds if stage_seconds > 0 else 0.0
+
+
+def get_suite_results(name, records, elapsed, run_summary):
+    """Return dictionary of throughput metrics of an extractor run, higher is better for all of them"""
+
+    stages = run_summary['stages']
+    return {
+        name + '_records_per_second': records / elapsed if elapsed > 0 else 0.0,
+        name + '_listing_pages_per_second': get_stage_throughput(run_summary, ['parse_listing', 'extract_listing'],
+                                                                 stages.get('parse_listing', dict(count=0))['count']),
+        name + '_profile_pages_per_second': get_stage_throughput(run_summary, ['parse_profile', 'extract_profile'],
+                                                                 stages.get('parse_profile', dict(count=0))['count']),
+        name + '_export_records_per_second': get_stage_throughput(run_summary, ['export'], run_summary['counters'].get('records_exported', 0)),
+    }
+
+
+def run_suite_once(archive, transport, pages, courses, max_in_flight):
+    """Return results of general and university runs replaying archive at session layer or through fixture server"""
+
+    fixture_server = None
+    if transport == 'server':
+        fixture_server = yfs.start_fixture_server(yrp.ArchivePageSource(archive))
+        base_url = yfs.get_server_url(fixture_server)
+        replay_session = requests.session()
+    else:
+        base_url = yfs.LIVE_HOME_PAGE
+        replay_session = yrp.mount_http_archive(requests.session(), archive)
+    try:
+        with tempfile.TemporaryDirectory(prefix='yocket_suite_') as benchmark_directory:
+            # Every run starts from an empty profile cache so that profiles are replayed as well
+            records, elapsed, _ = ybf.benchmark_general(base_url, pages, max_in_flight, 1000.0,
+                                                        os.path.join(benchmark_directory, 'general.sqlite'), current_session=replay_session)
+            suite_results = get_suite_results('general', records, elapsed, yge.run_metrics.get_summary())
+            records, elapsed, _ = ybf.benchmark_university(base_url, courses, max_in_flight, 1000.0,
+                                                           os.path.join(benchmark_directory, 'university.sqlite'),
+                                                           current_session=replay_session, export_directory=benchmark_directory + '/')
+            suite_results.update(get_suite_results('university', records, elapsed, yue.run_metrics.get_summary()))
+    finally:
+        if fixture_server is not None:
+            fixture_server.shutdown()
+    return suite_results
+
+
+def load_history(history_path, archive_digest, transport):
+    """Return list of results of earlier suite runs over the same fixtures and transport, oldest first"""
+
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, encoding='utf-8') as f:
+        history_entries = [json.loads(line) for line in f if line.strip()]
+    return [history_entry['results'] for history_entry in history_entries
+            if history_entry['archive_digest'] == archive_digest and history_entry['transport'] == transport]
+
+
+def find_regressions(suite_results, history_results, tolerance):
+    """Return list of 3 tuple (metric, value, baseline) for metrics more than tolerance below baseline.
+    Baseline of a metric is the median of history results"""
+
+    regressions = []
+    for metric, value in sorted(suite_results.items()):
+        history_values = [results[metric] for results in history_results if metric in results]
+        if len(history_values) == 0:
+            continue
+        baseline = float(np.median(history_values))
+        if value < baseline * (1.0 - tolerance):
+            regressions.append((metric, value, baseline))
+    return regressions
+
+
+def replay_suite(archive_path, arguments):
+    """Return 3 tuple (archive digest, best suite results of repeated runs, replay summary) of replaying archive,
+    recorded from synthetic fixture server first if it does not exist"""
+
+    if not os.path.exists(archive_path):
+        record_fixture_archive(archive_path, arguments.pages, arguments.courses, arguments.in_flight)
+    archive = yrp.FixtureArchive(archive_path)
+    try:
+        archive_digest = get_archive_digest(archive)
+        # Best of repeated runs keeps noise of a single slow run out of the history
+        suite_results = dict()
+        for _ in range(arguments.repeat):
+            for metric, value in run_suite_once(archive, arguments.transport, arguments.pages, arguments.courses, arguments.in_flight).items():
+                suite_results[metric] = max(value, suite_results.get(metric, 0.0))
+        return archive_digest, suite_results, archive.get_summary()
+    finally:
+        archive.close()
+
+
+def run_suite_benchmarks(arguments):
+    if arguments.archive is not None:
+        archive_digest, suite_results, replay_summary = replay_suite(arguments.archive, arguments)
+    else:
+        with tempfile.TemporaryDirectory(prefix='yocket_archive_') as archive_directory:
+            archive_digest, suite_results, replay_summary = replay_suite(os.path.join(archive_directory, 'yocket_fixtures.zip'), arguments)
+
+    history_results = load_history(arguments.history, archive_digest, arguments.transport)[-arguments.window:]
+    regressions = find_regressions(suite_results, history_results, arguments.tolerance)
+    regressed_metrics = set(metric for metric, _, _ in regressions)
+    print("Fixtures:", archive_digest, "replay:", replay_summary, "runs in history:", len(history_results))
+    for metric, value in sorted(suite_results.items()):
+        history_values = [results[metric] for results in history_results if metric in results]
+        baseline = float(np.median(history_values)) if len(history_values) > 0 else None
+        print("%-40s %12.1f %12s %s" % (metric, value, '%.1f' % baseline if baseline is not None else '-',
+                                        'REGRESSION' if metric in regressed_metrics else ''))
+
+    if os.path.dirname(arguments.history) != '':
+        os.makedirs(os.path.dirname(arguments.history), exist_ok=True)
+    with open(arguments.history, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(dict(timestamp=time.time(), archive_digest=archive_digest, transport=arguments.transport,
+                                results=suite_results)) + '\n')
+    return 1 if len(regressions) > 0 else 0
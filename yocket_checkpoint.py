@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+import yocket_export_sinks as yse
+
+# Pagination of a decision code is running or was interrupted
+STATUS_IN_PROGRESS = 'in_progress'
+# All pages collected but the course has not been exported yet
+STATUS_COMPLETE = 'complete'
+# Records were exported, next run starts pagination again
+STATUS_EXPORTED = 'exported'
+
+
+def new_checkpoint():
+    """Return state of a decision code that has not been scraped before.
+    Records themselves live in an append-only records file, checkpoint holds its valid length"""
+
+    return dict(status=STATUS_EXPORTED, last_completed_page=0, records_offset=0, seen_profile_paths=[], previous_profile_paths=[])
+
+
+def get_checkpoint_path(checkpoint_directory, checkpoint_name):
+    return os.path.join(checkpoint_directory, checkpoint_name + '.json')
+
+
+def get_records_path(checkpoint_directory, checkpoint_name):
+    return os.path.join(checkpoint_directory, checkpoint_name + '.records.jsonl')
+
+
+def get_carried_records_path(checkpoint_directory, checkpoint_name):
+    return os.path.join(checkpoint_directory, checkpoint_name + '.carried.jsonl')
+
+
+def load_checkpoint(checkpoint_directory, checkpoint_name):
+    """Return saved state for checkpoint name.
+    New state returned if nothing was saved yet"""
+
+    checkpoint_path = get_checkpoint_path(checkpoint_directory, checkpoint_name)
+    if not os.path.exists(checkpoint_path):
+        return new_checkpoint()
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        checkpoint = new_checkpoint()
+        checkpoint.update(json.load(f))
+        return checkpoint
+
+
+def save_checkpoint(checkpoint_directory, checkpoint_name, checkpoint):
+    """Write state atomically so that a crash leaves either the old or the new checkpoint"""
+
+    os.makedirs(checkpoint_directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=checkpoint_directory, prefix=checkpoint_name, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, get_checkpoint_path(checkpoint_directory, checkpoint_name))
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def start_run(checkpoint_directory, checkpoint_name, checkpoint, since_last_run):
+    """Return state to paginate with for a new run or resumed run.
+
+    An interrupted run is resumed as is. After an export pagination starts
+    again from page 1; in since last run mode previously exported records are
+    carried over and profile paths seen before mark where to stop."""
+
+    if checkpoint['status'] != STATUS_EXPORTED:
+        return checkpoint, set(checkpoint['previous_profile_paths'])
+
+    os.makedirs(checkpoint_directory, exist_ok=True)
+    records_path = get_records_path(checkpoint_directory, checkpoint_name)
+    carried_records_path = get_carried_records_path(checkpoint_directory, checkpoint_name)
+    if since_last_run and os.path.exists(records_path):
+        previous_profile_paths = set(checkpoint['seen_profile_paths'])
+        os.replace(records_path, carried_records_path)
+    else:
+        previous_profile_paths = set()
+        for stale_path in [records_path, carried_records_path]:
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+    resumed_checkpoint = new_checkpoint()
+    resumed_checkpoint['status'] = STATUS_IN_PROGRESS
+    resumed_checkpoint['previous_profile_paths'] = sorted(previous_profile_paths)
+    save_checkpoint(checkpoint_directory, checkpoint_name, resumed_checkpoint)
+    return resumed_checkpoint, previous_profile_paths
+
+
+def open_records(checkpoint_directory, checkpoint_name, checkpoint):
+    """Return sink appending records after the last checkpointed record.
+    Records written after the last saved checkpoint are discarded"""
+
+    return yse.JsonLinesSink(get_records_path(checkpoint_directory, checkpoint_name), offset=checkpoint['records_offset'])
+
+
+def iterate_records(checkpoint_directory, checkpoint_name):
+    """Yield records collected for checkpoint name without loading them all"""
+
+    return yse.read_json_lines(get_records_path(checkpoint_directory, checkpoint_name))
+
+
+def complete_run(checkpoint_directory, checkpoint_name, checkpoint, profile_path_index):
+    """Mark pagination as complete, appending records carried over from last run.
+    Carried records of profiles scraped again in this run are replaced by the new ones"""
+
+    scraped_profile_paths = set(record[profile_path_index] for record in iterate_records(checkpoint_directory, checkpoint_name))
+    carried_records_path = get_carried_records_path(checkpoint_directory, checkpoint_name)
+    records = open_records(checkpoint_directory, checkpoint_name, checkpoint)
+    try:
+        for record in yse.read_json_lines(carried_records_path):
+            if record[profile_path_index] not in scraped_profile_paths:
+                records.write_row(record)
+        records.sync()
+        checkpoint['records_offset'] = records.tell()
+    finally:
+        records.close()
+
+    new_profile_paths = set(checkpoint['seen_profile_paths'])
+    checkpoint['seen_profile_paths'] = checkpoint['seen_profile_paths'] + [profile_path for profile_path in
+                                                                           checkpoint['previous_profile_paths']
+                                                                           if profile_path not in new_profile_paths]
+    checkpoint['previous_profile_paths'] = []
+    checkpoint['status'] = STATUS_COMPLETE
+    save_checkpoint(checkpoint_directory, checkpoint_name, checkpoint)
+    if os.path.exists(carried_records_path):
+        os.remove(carried_records_path)
+    return checkpoint
+
+
+def mark_exported(checkpoint_directory, checkpoint_name):
+    """Record that collected records of checkpoint name have been exported"""
+
+    checkpoint = load_checkpoint(checkpoint_directory, checkpoint_name)
+    checkpoint['status'] = STATUS_EXPORTED
+    save_checkpoint(checkpoint_directory, checkpoint_name, checkpoint)
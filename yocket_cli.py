@@ -0,0 +1,259 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import yocket_config as yco
+import yocket_cookie_cache as yck
+
+# Extractor module of every scrape command, imported only once a scrape actually runs
+EXTRACTOR_MODULES = dict(general='yocket_general_extractor', university='yocket_university_extractor')
+# Command line flags and the constant each of them sets, flags left out keep the configured value
+COMMON_FLAG_CONSTANTS = dict(minimum_gpa='MINIMUM_GPA', minimum_gre='MINIMUM_GRE', minimum_toefl='MINIMUM_TOEFL',
+                             output_directory='OUTPUT_DIRECTORY', export_formats='EXPORT_FORMATS', in_flight='MAX_CONCURRENT_REQUESTS',
+                             host_rate='HOST_REQUESTS_PER_SECOND', page_window='PAGE_WINDOW', decision_store='DECISION_STORE_PATH',
+                             columnar_store='COLUMNAR_STORE_DIRECTORY', metrics_file='METRICS_FILE', profiler='PROFILER',
+                             cookie_cache='COOKIE_CACHE_PATH')
+GENERAL_FLAG_CONSTANTS = dict(first_page='NUMBER_PAGE_TO_SCRAPE_FIRST', last_page='NUMBER_PAGE_TO_SCRAPE_LAST')
+UNIVERSITY_FLAG_CONSTANTS = dict(last_page_limit='LAST_PAGE_LIMIT', workers='COURSE_WORKERS', since_last_run='SINCE_LAST_RUN')
+
+
+def parse_assignment(assignment):
+    """Return 2 tuple (name, value) of NAME=VALUE, value is read as JSON and taken as plain text if it is not JSON"""
+
+    name, separator, value = assignment.partition('=')
+    if separator == '' or name == '':
+        raise argparse.ArgumentTypeError("expected NAME=VALUE: " + assignment)
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+def get_overrides(arguments):
+    """Return dictionary of constant overrides in order of precedence, config file first then --set then flags"""
+
+    overrides = dict()
+    if arguments.config is not None:
+        overrides.update(yco.load_config_file(arguments.config, arguments.command))
+    overrides.update(arguments.assignments)
+    for flag_name, constant_name in arguments.flag_constants.items():
+        if getattr(arguments, flag_name) is not None:
+            overrides[constant_name] = getattr(arguments, flag_name)
+    if arguments.record is not None:
+        overrides.update(HTTP_ARCHIVE_MODE='record', HTTP_ARCHIVE_PATH=arguments.record)
+    if arguments.replay is not None:
+        overrides.update(HTTP_ARCHIVE_MODE='replay', HTTP_ARCHIVE_PATH=arguments.replay)
+    return overrides
+
+
+def select_courses(course_url, course_names, added_courses):
+    """Return course name -> url of courses in course_names, all configured courses if it is None, followed by added courses"""
+
+    if course_names is None:
+        selected_courses = dict(course_url)
+    else:
+        unknown_courses = [course_name for course_name in course_names if course_name not in course_url]
+        if len(unknown_courses) > 0:
+            raise ValueError("unknown courses: " + ', '.join(unknown_courses) + ", configured courses are " + ', '.join(course_url))
+        selected_courses = dict((course_name, course_url[course_name]) for course_name in course_names)
+    selected_courses.update(added_courses)
+    return selected_courses
+
+
+def get_constants(arguments):
+    """Return constants of scrape command, defaults of the extractor with config file and command line applied"""
+
+    constants = yco.apply_overrides(arguments.get_default_constants(), get_overrides(arguments))
+    # Export paths are the output directory joined to file names
+    if constants['OUTPUT_DIRECTORY'] and not constants['OUTPUT_DIRECTORY'].endswith('/'):
+        constants['OUTPUT_DIRECTORY'] += '/'
+    if arguments.command == 'university':
+        constants['course_url'] = select_courses(constants['course_url'], arguments.courses, arguments.added_courses)
+    return constants
+
+
+def print_common_plan(constants):
+    print("Minimum scores: GPA", constants['MINIMUM_GPA'], "GRE", constants['MINIMUM_GRE'], "TOEFL", constants['MINIMUM_TOEFL'])
+    print("Fetch budget:", constants['MAX_CONCURRENT_REQUESTS'], "requests in flight,", constants['HOST_REQUESTS_PER_SECOND'],
+          "requests per second per host, windows of", constants['PAGE_WINDOW'], "pages")
+    print("Cookies:", yck.get_cookie_source(constants))
+    if constants['HTTP_ARCHIVE_MODE'] is not None:
+        print("HTTP archive:", constants['HTTP_ARCHIVE_MODE'], constants['HTTP_ARCHIVE_PATH'])
+    print("Profile cache:", constants['PROFILE_CACHE_PATH'])
+    print("Decision store:", constants['DECISION_STORE_PATH'])
+    print("Columnar store:", constants['COLUMNAR_STORE_DIRECTORY'])
+    print("Metrics file:", constants['METRICS_FILE'])
+
+
+def print_general_plan(constants):
+    """Print listing pages which a general scrape would request, nothing is fetched"""
+
+    page_range = range(constants['NUMBER_PAGE_TO_SCRAPE_FIRST'], constants['NUMBER_PAGE_TO_SCRAPE_LAST'])
+    print("Listing pages:", len(page_range))
+    for pagination_index in page_range:
+        print("  ", yco.get_general_page_url(constants, pagination_index))
+    print("Export:", constants['OUTPUT_DIRECTORY'] + constants['EXPORT_FILE_NAME'], "as", ', '.join(constants['EXPORT_FORMATS']))
+    print_common_plan(constants)
+
+
+def print_university_plan(constants):
+    """Print courses which a university scrape would paginate and the page every decision code resumes from, nothing is fetched"""
+
+    import yocket_checkpoint as ycp
+    print("Courses:", len(constants['course_url']), "in", min(constants['COURSE_WORKERS'], len(constants['course_url'])), "worker(s),",
+          "up to page", constants['LAST_PAGE_LIMIT'] - 1, "of every decision code")
+    for course_name, course_value in constants['course_url'].items():
+        print("  ", course_name)
+        for decision_code in ('admit_url_code', 'reject_url_code'):
+            checkpoint = ycp.load_checkpoint(constants['CHECKPOINT_DIRECTORY'], course_name + '_' + decision_code)
+            # Decision codes which completed but were not exported are only exported again
+            first_page = checkpoint['last_completed_page'] + 1 if checkpoint['status'] == ycp.STATUS_IN_PROGRESS else 1
+            state = 'export pending' if checkpoint['status'] == ycp.STATUS_COMPLETE else 'from page ' + str(first_page)
+            print("    ", decision_code.split('_')[0], state, yco.get_course_page_url(constants, course_value, decision_code, first_page))
+    print("Export:", constants['OUTPUT_DIRECTORY'] + '<course>', "and", constants['OUTPUT_DIRECTORY'] + constants['COMBINED_EXPORT_NAME'], "as",
+          ', '.join(constants['EXPORT_FORMATS']))
+    print("Since last run:", constants['SINCE_LAST_RUN'])
+    print_common_plan(constants)
+
+
+def run_scrape(arguments, constants):
+    if arguments.dry_run:
+        arguments.print_plan(constants)
+        return 0
+    # Scraping stack is only loaded here so that help and dry runs start at once
+    extractor_module = importlib.import_module(EXTRACTOR_MODULES[arguments.command])
+    extractor_module.main(constants)
+    return 0
+
+
+def check_rank_constants(constants):
+    """Raise ValueError if admit tables cannot be kept up to date with the decision store"""
+
+    for constant_name in ('ADMIT_TABLES_PATH', 'DECISION_STORE_PATH'):
+        if constants[constant_name] is None:
+            raise ValueError("rank needs " + constant_name + " to be set")
+
+
+def run_rank(arguments, constants):
+    """Print configured courses ranked by estimated admit probability of the given profile"""
+
+    import yocket_admit_tables as yat
+    if os.path.exists(constants['DECISION_STORE_PATH']):
+        # Decisions stored since the tables were last saved are counted in first
+        admit_tables = yat.refresh_admit_tables(constants)
+    else:
+        # Ranking creates no decision store or tables where nothing was scraped yet
+        admit_tables = yat.load_admit_tables(constants['ADMIT_TABLES_PATH'])
+    if admit_tables.get_summary()['decisions'] == 0:
+        print("No admits or rejects stored in", constants['DECISION_STORE_PATH'] + ", scrape with the general or university command first",
+              file=sys.stderr)
+        return 1
+    start_time = time.perf_counter()
+    ranked_courses = admit_tables.rank(arguments.gpa, arguments.gre, arguments.toefl, arguments.workex, arguments.minimum_decisions,
+                                       arguments.top)
+    elapsed = time.perf_counter() - start_time
+    print("%4s %9s %9s  %s" % ('rank', 'estimate', 'decisions', 'university / course'))
+    for rank, (university, course, estimate, decisions) in enumerate(ranked_courses, 1):
+        print("%4d %8.1f%% %9d  %s / %s" % (rank, estimate * 100, decisions, university, course))
+    print("Ranked", admit_tables.get_summary()['courses'], "courses in %.3f ms" % (elapsed * 1000))
+    return 0
+
+
+def run_cookie_export(arguments, constants):
+    """Read yocket cookies from the browser once and cache them for later runs"""
+
+    cookiejar = yck.read_browser_cookies()
+    yck.export_cookies(cookiejar, arguments.cookie_cache)
+    print("Exported", len(cookiejar), "cookies to", arguments.cookie_cache)
+    return 0
+
+
+def add_config_arguments(command_parser):
+    command_parser.add_argument('--config', help="JSON file of constant overrides shared by all commands, "
+                                "with overrides of one command under its name")
+    command_parser.add_argument('--set', dest='assignments', type=parse_assignment, action='append', default=[], metavar='NAME=VALUE',
+                                help="override any constant, value is read as JSON, may be repeated")
+
+
+def add_common_arguments(command_parser):
+    add_config_arguments(command_parser)
+    command_parser.add_argument('--dry-run', action='store_true', help="print planned pages and outputs without fetching anything")
+    command_parser.add_argument('--minimum-gpa', type=float)
+    command_parser.add_argument('--minimum-gre', type=int)
+    command_parser.add_argument('--minimum-toefl', type=int)
+    command_parser.add_argument('--output-directory', help="directory of exported files, created if missing")
+    command_parser.add_argument('--export-formats', nargs='+', choices=['xlsx', 'csv', 'jsonl', 'pickle', 'msgpack'])
+    command_parser.add_argument('--in-flight', type=int, help="maximum concurrent requests")
+    command_parser.add_argument('--host-rate', type=float, help="requests per second per host")
+    command_parser.add_argument('--page-window', type=int, help="listing pages fetched concurrently")
+    command_parser.add_argument('--decision-store', help="SQLite decision store path")
+    command_parser.add_argument('--columnar-store', help="directory of Parquet dataset partitioned by university and course")
+    command_parser.add_argument('--metrics-file', help="JSON run metrics path")
+    command_parser.add_argument('--profiler', choices=['cprofile', 'tracemalloc'])
+    command_parser.add_argument('--cookie-cache', help="cookie cache path")
+    archive_group = command_parser.add_mutually_exclusive_group()
+    archive_group.add_argument('--record', metavar='ARCHIVE', help="record responses into fixture archive")
+    archive_group.add_argument('--replay', metavar='ARCHIVE', help="answer requests from fixture archive, needs no cookies")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Scrape admits and rejects of yocket")
+    command_parsers = parser.add_subparsers(dest='command', required=True)
+
+    general_parser = command_parsers.add_parser('general', help="scrape pages of the matching admits and rejects listing")
+    add_common_arguments(general_parser)
+    general_parser.add_argument('--first-page', type=int)
+    general_parser.add_argument('--last-page', type=int, help="page at which scraping stops, it is not scraped itself")
+    general_parser.set_defaults(run_command=run_scrape, get_default_constants=yco.get_general_constants, print_plan=print_general_plan,
+                                flag_constants=dict(COMMON_FLAG_CONSTANTS, **GENERAL_FLAG_CONSTANTS))
+
+    university_parser = command_parsers.add_parser('university', help="scrape admits and rejects of university courses")
+    add_common_arguments(university_parser)
+    university_parser.add_argument('--courses', nargs='+', metavar='COURSE', help="configured courses to scrape, all by default")
+    university_parser.add_argument('--add-course', dest='added_courses', type=parse_assignment, action='append', default=[],
+                                   metavar='NAME=URL', help="scrape course at yocket URL as well, may be repeated")
+    university_parser.add_argument('--last-page-limit', type=int)
+    university_parser.add_argument('--workers', type=int, help="worker processes courses are sharded across")
+    university_parser.add_argument('--since-last-run', action='store_const', const=True,
+                                   help="stop paginating at decisions seen by the previous run")
+    university_parser.set_defaults(run_command=run_scrape, get_default_constants=yco.get_university_constants,
+                                   print_plan=print_university_plan, flag_constants=dict(COMMON_FLAG_CONSTANTS, **UNIVERSITY_FLAG_CONSTANTS))
+
+    rank_parser = command_parsers.add_parser('rank', help="rank courses by estimated admit probability of a profile")
+    add_config_arguments(rank_parser)
+    rank_parser.add_argument('--gpa', type=float, help="GPA on a 10 point scale")
+    rank_parser.add_argument('--gre', type=int, help="total GRE score")
+    rank_parser.add_argument('--toefl', type=int)
+    rank_parser.add_argument('--workex', type=int, help="months of work experience")
+    rank_parser.add_argument('--top', type=int, default=20, help="courses printed")
+    rank_parser.add_argument('--minimum-decisions', type=int, default=5, help="courses with fewer decisions are left out")
+    rank_parser.add_argument('--admit-tables', help="admit tables path")
+    rank_parser.add_argument('--decision-store', help="SQLite decision store path")
+    rank_parser.set_defaults(run_command=run_rank, get_default_constants=yco.get_common_constants, check_constants=check_rank_constants,
+                             flag_constants=dict(admit_tables='ADMIT_TABLES_PATH', decision_store='DECISION_STORE_PATH'), record=None, replay=None)
+
+    cookie_parser = command_parsers.add_parser('cookies', help="export yocket cookies of Chrome into the cookie cache")
+    cookie_parser.add_argument('--cookie-cache', default=yco.get_common_constants()['COOKIE_CACHE_PATH'])
+    cookie_parser.set_defaults(run_command=run_cookie_export)
+    return parser
+
+
+def main():
+    parser = get_parser()
+    arguments = parser.parse_args()
+    constants = None
+    if hasattr(arguments, 'get_default_constants'):
+        try:
+            constants = get_constants(arguments)
+            if hasattr(arguments, 'check_constants'):
+                arguments.check_constants(constants)
+        except (OSError, ValueError) as error:
+            # Configuration errors are reported like errors of the command line itself
+            parser.error(str(error))
+    return arguments.run_command(arguments, constants)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
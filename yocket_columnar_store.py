@@ -0,0 +1,143 @@
+import uuid
+import yocket_records as yrc
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+
+# Columns of the store are the record fields, university and course are also the partition directories
+PARTITION_COLUMNS = ['university', 'course']
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("columnar store requires the pyarrow package")
+
+
+def get_schema():
+    """Return arrow schema of decision records with the types of record batch columns, status is stored as a category"""
+
+    require_pyarrow()
+    column_types = []
+    for field in yrc.RECORD_FIELDS:
+        if field == 'gpa':
+            column_types.append((field, pa.float64()))
+        elif field in yrc.INTEGER_FIELDS:
+            column_types.append((field, pa.int32()))
+        elif field == 'status':
+            column_types.append((field, pa.dictionary(pa.int8(), pa.string())))
+        else:
+            column_types.append((field, pa.string()))
+    return pa.schema(column_types)
+
+
+class ColumnarSink(object):
+    """Append decision records to a Parquet dataset partitioned by university and course.
+
+    Rows are buffered and every `batch_rows` rows are written as new files,
+    so earlier runs stay in the store and memory stays bounded. Rows are
+    converted to records with the record batch of the exports."""
+
+    def __init__(self, store_directory, header_fields, batch_rows=10000):
+        self.schema = get_schema()
+        self.store_directory = store_directory
+        self.batch_rows = batch_rows
+        self.row_fields = yrc.get_row_fields(header_fields)
+        self.rows = []
+        self.record_batches = []
+        self.buffered_rows = 0
+
+    def write_row(self, row):
+        self.rows.append(row)
+        self.buffered_rows += 1
+        if self.buffered_rows >= self.batch_rows:
+            self.flush()
+
+    def write_batch(self, record_batch):
+        """Append typed columns of batch as they are, without parsing scores of rows again"""
+
+        # Rows written before stay ahead of the batch
+        self.convert_rows()
+        self.record_batches.append(record_batch)
+        self.buffered_rows += len(record_batch)
+        if self.buffered_rows >= self.batch_rows:
+            self.flush()
+
+    def convert_rows(self):
+        if len(self.rows) > 0:
+            self.record_batches.append(yrc.RecordBatch.from_rows(self.rows, self.row_fields))
+            self.rows = []
+
+    def flush(self):
+        """Write buffered records as new files of the dataset"""
+
+        if self.buffered_rows == 0:
+            return
+        self.convert_rows()
+        arrays = []
+        for field in yrc.RECORD_FIELDS:
+            column = []
+            for record_batch in self.record_batches:
+                column.extend(record_batch.get_column(field))
+            arrays.append(pa.array(column, type=self.schema.field(field).type))
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        ds.write_dataset(table, self.store_directory, format='parquet', partitioning=PARTITION_COLUMNS, partitioning_flavor='hive',
+                         basename_template=uuid.uuid4().hex + '-{i}.parquet', existing_data_behavior='overwrite_or_ignore')
+        self.record_batches = []
+        self.buffered_rows = 0
+
+    def close(self):
+        self.flush()
+
+
+def open_columnar_sinks(store_directory, header_fields):
+    """Return list holding columnar sink of store directory, empty if store is not configured"""
+
+    if store_directory is None:
+        return []
+    return [ColumnarSink(store_directory, header_fields)]
+
+
+class ColumnarStore(object):
+    """Query API over the Parquet dataset written by ColumnarSink.
+    Filters are pushed down into the scan so only matching partitions and rows are read"""
+
+    def __init__(self, store_directory):
+        schema = get_schema()
+        self.dataset = ds.dataset(store_directory, format='parquet', schema=schema,
+                                  partitioning=ds.partitioning(pa.schema([schema.field(name) for name in PARTITION_COLUMNS]),
+                                                               flavor='hive'))
+
+    def get_filter(self, **filters):
+        """Return dataset filter expression for the given constraints, None if there is none"""
+
+        combined_expression = None
+        for field, operator, value in yrc.get_filter_conditions(**filters):
+            expression = ds.field(field) == value if operator == '=' else ds.field(field) >= value
+            combined_expression = expression if combined_expression is None else combined_expression & expression
+        return combined_expression
+
+    def read(self, columns=None, **filters):
+        """Return arrow table of requested columns for records matching filters"""
+
+        return self.dataset.to_table(columns=columns, filter=self.get_filter(**filters))
+
+    def admit_rate_by_band(self, gpa_band=0.5, gre_band=5, **filters):
+        """Return arrow table of admits, decisions and admit rate per university, GPA band and GRE band.
+        Band columns hold the lower bound of the band, records without GPA or GRE are left out"""
+
+        table = self.read(['university', 'gpa', 'gre', 'status'], **filters)
+        table = table.filter(pc.and_(pc.is_valid(table['gpa']), pc.is_valid(table['gre'])))
+        banded_table = pa.table({
+            'university': table['university'],
+            'gpa_band': pc.multiply(pc.floor(pc.divide(table['gpa'], gpa_band)), gpa_band),
+            'gre_band': pc.multiply(pc.floor(pc.divide(pc.cast(table['gre'], pa.float64()), gre_band)), gre_band),
+            'admit': pc.cast(pc.equal(pc.utf8_lower(pc.cast(table['status'], pa.string())), 'admit'), pa.int64()),
+        })
+        grouped_table = banded_table.group_by(['university', 'gpa_band', 'gre_band']).aggregate([('admit', 'sum'), ('admit', 'count')])
+        grouped_table = grouped_table.append_column('admit_rate', pc.divide(pc.cast(grouped_table['admit_sum'], pa.float64()),
+                                                                            pc.cast(grouped_table['admit_count'], pa.float64())))
+        return grouped_table.sort_by([('university', 'ascending'), ('gpa_band', 'ascending'), ('gre_band', 'ascending')])
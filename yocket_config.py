@@ -0,0 +1,193 @@
+import json
+from urllib.parse import urlencode
+
+
+def get_common_constants():
+    """Return a dictionary of constants shared by the general and the university extractor.
+    Only the standard library is imported here so that runs can be configured and planned without loading the scraping stack"""
+
+    dict_constants = dict()
+    dict_constants['LOGIN_URL'] = "https://yocket.in/account/login"
+    dict_constants['HOME_PAGE'] = 'https://yocket.in/'
+    dict_constants['MINIMUM_GPA'] = 7.5
+    dict_constants['MINIMUM_TOEFL'] = 100
+    # Query parameters appended to listing URLs so that the server filters decisions itself.
+    # Empty by default since the accepted parameters are not known, listing pages then hold every decision
+    dict_constants['LISTING_FILTER_PARAMETERS'] = dict()
+    dict_constants['PAGE_WINDOW'] = 4
+    dict_constants['MAX_CONCURRENT_REQUESTS'] = 4
+    dict_constants['HOST_REQUESTS_PER_SECOND'] = 0.5
+    dict_constants['HOST_BURST'] = 2
+    # Keep-alive connections are pooled for POOL_HOSTS hosts, each pool holds MAX_CONCURRENT_REQUESTS connections
+    dict_constants['POOL_HOSTS'] = 4
+    dict_constants['CONNECT_TIMEOUT_SECONDS'] = 10.0
+    dict_constants['READ_TIMEOUT_SECONDS'] = 60.0
+    # Connection failures are retried by the session before the backoff controller sees them
+    dict_constants['CONNECTION_RETRIES'] = 3
+    # Blocked responses and captcha pages are retried after exponential backoff with jitter
+    dict_constants['BACKOFF_BASE_SECONDS'] = 15.0
+    dict_constants['BACKOFF_MAX_SECONDS'] = 600.0
+    dict_constants['BACKOFF_MAX_RETRIES'] = 8
+    dict_constants['SLOW_RESPONSE_SECONDS'] = 10.0
+    dict_constants['RECOVERY_RESPONSES'] = 20
+    dict_constants['PROFILE_CACHE_PATH'] = 'yocket_profile_cache.sqlite'
+    dict_constants['PROFILE_CACHE_TTL_DAYS'] = 30.0
+    dict_constants['PROFILE_CACHE_MEMORY_ENTRIES'] = 512
+    # Browser cookies are exported once into COOKIE_CACHE_PATH and reused until they are COOKIE_CACHE_TTL_HOURS old
+    # or one of them expires, None reads the browser cookie database on every run
+    dict_constants['COOKIE_CACHE_PATH'] = 'yocket_cookies.json'
+    dict_constants['COOKIE_CACHE_TTL_HOURS'] = 12.0
+    # Directory of exported files, created if missing
+    dict_constants['OUTPUT_DIRECTORY'] = ''
+    # Any of xlsx, csv, jsonl, pickle, msgpack
+    dict_constants['EXPORT_FORMATS'] = ['xlsx', 'pickle']
+    # Typed Parquet dataset partitioned by university and course, requires pyarrow
+    dict_constants['COLUMNAR_STORE_DIRECTORY'] = None
+    # Decisions of every run upserted into one indexed SQLite store shared by both extractors, None to skip it
+    dict_constants['DECISION_STORE_PATH'] = 'yocket_decisions.sqlite'
+    # Admit rate tables of every university and course, updated from decisions added to the decision store, None to skip them
+    dict_constants['ADMIT_TABLES_PATH'] = 'yocket_admit_tables.npz'
+    # JSON summary of stage timings, waits and throughput written at end of run, None to skip it
+    dict_constants['METRICS_FILE'] = 'yocket_run_metrics.json'
+    # None, 'cprofile' or 'tracemalloc', cProfile stats are also dumped to PROFILER_OUTPUT
+    dict_constants['PROFILER'] = None
+    dict_constants['PROFILER_OUTPUT'] = 'yocket_run.prof'
+    # None, 'record' to capture listing and profile responses into HTTP_ARCHIVE_PATH or 'replay' to answer requests from it
+    # Replay runs need no browser cookies or network access
+    dict_constants['HTTP_ARCHIVE_MODE'] = None
+    dict_constants['HTTP_ARCHIVE_PATH'] = 'yocket_fixtures.zip'
+    return dict_constants
+
+
+def get_general_constants():
+    """Return a dictionary containing all input constraints for scraping the general listing.
+    All attributes except URL can be changed as per requirement"""
+
+    dict_constants = get_common_constants()
+    dict_constants['PAST_RESULTS_URL'] = "https://yocket.in/recent-admits-rejects?page="
+    dict_constants['ALL_RESULTS_URL'] = "https://yocket.in/profiles/find/matching-admits-and-rejects?page="
+    # Pages NUMBER_PAGE_TO_SCRAPE_FIRST up to but not including NUMBER_PAGE_TO_SCRAPE_LAST are scraped
+    dict_constants['NUMBER_PAGE_TO_SCRAPE_FIRST'] = 1
+    dict_constants['NUMBER_PAGE_TO_SCRAPE_LAST'] = 2
+    dict_constants['MINIMUM_GRE'] = 320
+    dict_constants['EXPORT_FILE_NAME'] = 'yocket_data'
+    return dict_constants
+
+
+def get_university_constants():
+    """Return a dictionary containing all input constraints for scraping courses of universities.
+    Courses can be added based on yocket URLs"""
+
+    dict_constants = get_common_constants()
+    dict_university_course_url = dict()
+    dict_university_course_url['USC_General'] = 'https://yocket.in/applications-admits-rejects/168-university-of-southern-california/'
+    dict_university_course_url['USC_DataScience'] = 'https://yocket.in/applications-admits-rejects/51720-university-of-southern-california/'
+    dict_university_course_url['UCLA_General'] = 'https://yocket.in/applications-admits-rejects/53-university-of-california-los-angeles/'
+    dict_university_course_url['UMass_General'] = 'https://yocket.in/applications-admits-rejects/232-university-of-massachusetts-amherst/'
+    dict_university_course_url['Georgia_General'] = 'https://yocket.in/applications-admits-rejects/18-georgia-institute-of-technology/'
+    dict_university_course_url['CMU_General'] = 'https://yocket.in/applications-admits-rejects/9-carnegie-mellon-university/'
+    dict_university_course_url['CMU_ML'] = 'https://yocket.in/applications-admits-rejects/835-carnegie-mellon-university/'
+    dict_university_course_url['CMU_MCDS'] = 'https://yocket.in/applications-admits-rejects/55949-carnegie-mellon-university/'
+    dict_university_course_url['UCSD_General'] = 'https://yocket.in/applications-admits-rejects/219-university-of-california-san-diego/'
+    dict_university_course_url['CalTech_GeneralPhD'] = 'https://yocket.in/applications-admits-rejects/226-california-institute-of-technology/'
+    dict_university_course_url['UTA_General'] = 'https://yocket.in/applications-admits-rejects/46152-university-of-texas-austin/'
+    dict_university_course_url['SBU_General'] = 'https://yocket.in/applications-admits-rejects/129-state-university-of-new-york-at-stony-brook/'
+    dict_university_course_url['NYU_General'] = 'https://yocket.in/applications-admits-rejects/588-new-york-university/'
+    dict_university_course_url['UIUC_General'] = 'https://yocket.in/applications-admits-rejects/81-university-of-illinois-at-urbana-champaign/'
+    dict_university_course_url['Cornell_General'] = 'https://yocket.in/applications-admits-rejects/239-cornell-university/'
+    dict_university_course_url['UMCP_General'] = 'https://yocket.in/applications-admits-rejects/31922-university-of-maryland-college-park/'
+
+    dict_constants['admit_url_code'] = '2'
+    dict_constants['reject_url_code'] = '3'
+    dict_constants['pagination_suffix'] = '?page='
+    dict_constants['course_url'] = dict_university_course_url
+    dict_constants['MINIMUM_GRE'] = 315
+    dict_constants['LAST_PAGE_LIMIT'] = 300
+    # Listing pages beyond the last page are served as 403, so they are only retried a few times
+    dict_constants['FORBIDDEN_RETRIES'] = 2
+    dict_constants['CHECKPOINT_DIRECTORY'] = 'yocket_checkpoints'
+    dict_constants['SINCE_LAST_RUN'] = False
+    # Courses are sharded across worker processes, every worker has its own request budget.
+    # Recording into HTTP_ARCHIVE_PATH needs COURSE_WORKERS of 1
+    dict_constants['COURSE_WORKERS'] = 1
+    dict_constants['COMBINED_EXPORT_NAME'] = 'all_courses'
+    dict_constants['OUTPUT_DIRECTORY'] = 'ResultDocuments/'
+    return dict_constants
+
+
+# Default constants of every command of the command line
+COMMAND_CONSTANTS = dict(general=get_general_constants, university=get_university_constants, rank=get_common_constants)
+
+
+def check_override_type(constant_name, default_value, value):
+    """Raise ValueError if value does not have the type of the default value of the constant.
+    Whole numbers are taken for floats, None for text such as paths and any value for constants which default to None"""
+
+    if default_value is None or (value is None and isinstance(default_value, str)):
+        return
+    if isinstance(default_value, bool):
+        expected_type, is_valid = 'true or false', isinstance(value, bool)
+    elif isinstance(default_value, float):
+        expected_type, is_valid = 'a number', isinstance(value, (int, float))
+    else:
+        expected_type, is_valid = 'of type ' + type(default_value).__name__, isinstance(value, type(default_value))
+    # bool is a subclass of int but a flag is not a number
+    if isinstance(value, bool) and not isinstance(default_value, bool):
+        is_valid = False
+    if not is_valid:
+        raise ValueError("%s must be %s, got %r" % (constant_name, expected_type, value))
+
+
+def apply_overrides(constants, overrides):
+    """Return copy of constants with overrides applied.
+    Unknown names and values of another type than the default raise ValueError so that a misspelt setting does not pass silently"""
+
+    for constant_name, value in overrides.items():
+        if constant_name not in constants:
+            raise ValueError("unknown constant: " + str(constant_name))
+        check_override_type(constant_name, constants[constant_name], value)
+    return dict(constants, **overrides)
+
+
+def load_config_file(config_path, command_name):
+    """Return dictionary of constant overrides of command read from JSON object in config_path.
+
+    Constants at the top level apply to every command, those of other
+    commands only are left out so that one file can configure all. Objects
+    under "general", "university" and "rank" hold overrides of that command alone."""
+
+    with open(config_path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("config file must hold a JSON object of constant names and values: " + config_path)
+    command_constants = COMMAND_CONSTANTS[command_name]()
+    other_constant_names = set()
+    for other_command_name, get_command_constants in COMMAND_CONSTANTS.items():
+        if other_command_name != command_name:
+            other_constant_names.update(get_command_constants())
+    # Names known to no command are kept so that applying them reports the misspelt setting
+    overrides = dict((constant_name, value) for constant_name, value in config.items()
+                     if constant_name not in COMMAND_CONSTANTS and (constant_name in command_constants or constant_name not in other_constant_names))
+    overrides.update(config.get(command_name, dict()))
+    return overrides
+
+
+def get_listing_url(listing_url, filter_parameters):
+    """Return listing url with server side filter parameters appended to its query string"""
+
+    if not filter_parameters:
+        return listing_url
+    return listing_url + ('&' if '?' in listing_url else '?') + urlencode(filter_parameters)
+
+
+def get_general_page_url(constants, pagination_index):
+    """Return url of page of the general admits and rejects listing"""
+
+    return get_listing_url(constants['ALL_RESULTS_URL'] + str(pagination_index), constants['LISTING_FILTER_PARAMETERS'])
+
+
+def get_course_page_url(constants, course_value, decision_code, pagination_index):
+    """Return url of admit or reject page of course, decision code is the name of its url code constant"""
+
+    return get_listing_url(course_value + constants[decision_code] + constants['pagination_suffix'] + str(pagination_index),
+                           constants['LISTING_FILTER_PARAMETERS'])
@@ -0,0 +1,83 @@
+import http.cookiejar
+import json
+import os
+import time
+
+# Only cookies of this domain are exported, other sites of the browser profile stay out of the cache file
+COOKIE_DOMAIN = 'yocket.in'
+COOKIE_CACHE_VERSION = 1
+
+
+def cookie_to_dict(cookie):
+    return dict(name=cookie.name, value=cookie.value, domain=cookie.domain, path=cookie.path, secure=cookie.secure, expires=cookie.expires)
+
+
+def dict_to_cookie(cookie_fields):
+    return http.cookiejar.Cookie(version=0, name=cookie_fields['name'], value=cookie_fields['value'], port=None, port_specified=False,
+                                 domain=cookie_fields['domain'], domain_specified=True, domain_initial_dot=cookie_fields['domain'].startswith('.'),
+                                 path=cookie_fields['path'], path_specified=True, secure=cookie_fields['secure'], expires=cookie_fields['expires'],
+                                 discard=cookie_fields['expires'] is None, comment=None, comment_url=None, rest=dict())
+
+
+def read_browser_cookies():
+    """Return cookie jar of yocket cookies decrypted from the Chrome cookie database.
+    browser_cookie3 is imported here since runs served from the cache never need it"""
+
+    import browser_cookie3
+    return browser_cookie3.chrome(domain_name=COOKIE_DOMAIN)
+
+
+def export_cookies(cookiejar, cache_path):
+    """Write cookies of jar to cache_path, readable by the current user only"""
+
+    cache = dict(version=COOKIE_CACHE_VERSION, exported_at=time.time(), cookies=[cookie_to_dict(cookie) for cookie in cookiejar])
+    file_descriptor = os.open(cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(file_descriptor, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=1)
+
+
+def read_cached_cookies(cache_path, ttl_hours):
+    """Return cookie jar of cache_path, None if there is no cache, it is older than ttl_hours or one of its cookies expired"""
+
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    now = time.time()
+    if cache.get('version') != COOKIE_CACHE_VERSION or cache['exported_at'] + ttl_hours * 3600 < now:
+        return None
+    cookiejar = http.cookiejar.CookieJar()
+    for cookie_fields in cache['cookies']:
+        if cookie_fields['expires'] is not None and cookie_fields['expires'] < now:
+            return None
+        cookiejar.set_cookie(dict_to_cookie(cookie_fields))
+    return cookiejar
+
+
+def get_cookie_source(constants):
+    """Return where cookies of a run come from, one of 'none', 'cache' or 'browser'"""
+
+    if constants['HTTP_ARCHIVE_MODE'] == 'replay':
+        return 'none'
+    if constants['COOKIE_CACHE_PATH'] is not None and read_cached_cookies(constants['COOKIE_CACHE_PATH'],
+                                                                          constants['COOKIE_CACHE_TTL_HOURS']) is not None:
+        return 'cache'
+    return 'browser'
+
+
+def load_cookies(constants):
+    """Return cookie jar logging session in as the browser session.
+    Cached cookies are used while they are fresh, otherwise browser cookies are read and cached again.
+    Replayed responses need no login, so the jar is empty in replay mode"""
+
+    if constants['HTTP_ARCHIVE_MODE'] == 'replay':
+        return http.cookiejar.CookieJar()
+    cache_path = constants['COOKIE_CACHE_PATH']
+    if cache_path is None:
+        return read_browser_cookies()
+    cookiejar = read_cached_cookies(cache_path, constants['COOKIE_CACHE_TTL_HOURS'])
+    if cookiejar is None:
+        cookiejar = read_browser_cookies()
+        export_cookies(cookiejar, cache_path)
+    return cookiejar
@@ -0,0 +1,138 @@
+import sqlite3
+import time
+import yocket_records as yrc
+
+KEY_COLUMNS = ['profile_path', 'university', 'course', 'status']
+INDEXED_COLUMNS = ['university', 'course', 'gpa', 'gre']
+
+
+def get_column_definitions():
+    """Return SQL column definitions of record fields with the types of record batch columns, key columns are required"""
+
+    column_definitions = []
+    for field in yrc.RECORD_FIELDS:
+        if field == 'gpa':
+            column_type = 'REAL'
+        elif field in yrc.INTEGER_FIELDS:
+            column_type = 'INTEGER'
+        else:
+            column_type = 'TEXT'
+        column_definitions.append(field + ' ' + column_type + (' NOT NULL' if field in KEY_COLUMNS else ''))
+    return column_definitions
+
+
+class DecisionStore(object):
+    """SQLite store of decision records of both extractors in one schema.
+
+    A decision is identified by profile path, university, course and status,
+    so the same decision seen again by another course, the general listing or
+    a later run updates its row instead of adding one. Scores missing from a
+    record, such as the GRE split of general records, keep their stored value.
+    University, course, GPA and GRE are indexed for analytics queries."""
+
+    def __init__(self, database_path):
+        self.connection = sqlite3.connect(database_path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS decisions (' + ', '.join(get_column_definitions()) + ', first_seen REAL NOT NULL, '
+                                'last_seen REAL NOT NULL, UNIQUE (' + ', '.join(KEY_COLUMNS) + '))')
+        for column_name in INDEXED_COLUMNS:
+            self.connection.execute('CREATE INDEX IF NOT EXISTS decisions_' + column_name + ' ON decisions (' + column_name + ')')
+        self.connection.commit()
+        updated_columns = [column_name for column_name in yrc.RECORD_FIELDS if column_name not in KEY_COLUMNS]
+        self.upsert_statement = ('INSERT INTO decisions (' + ', '.join(yrc.RECORD_FIELDS) + ', first_seen, last_seen) VALUES (' +
+                                 ', '.join('?' for _ in yrc.RECORD_FIELDS) + ', ?, ?) ON CONFLICT (' + ', '.join(KEY_COLUMNS) + ') DO UPDATE SET ' +
+                                 ', '.join('%s = COALESCE(excluded.%s, %s)' % (column_name, column_name, column_name)
+                                           for column_name in updated_columns) + ', last_seen = excluded.last_seen')
+
+    def upsert(self, column_rows):
+        """Insert or update rows of column values in a single transaction"""
+
+        seen_at = time.time()
+        with self.connection:
+            self.connection.executemany(self.upsert_statement, [list(column_values) + [seen_at, seen_at] for column_values in column_rows])
+
+    def get_filter(self, **filters):
+        """Return 2 tuple (where clause, parameters) for the given constraints, empty clause if there is none"""
+
+        filter_conditions = yrc.get_filter_conditions(**filters)
+        if len(filter_conditions) == 0:
+            return '', []
+        return (' WHERE ' + ' AND '.join('%s %s ?' % (field, operator) for field, operator, _ in filter_conditions),
+                [value for _, _, value in filter_conditions])
+
+    def read(self, columns=None, **filters):
+        """Return list of tuples of requested columns for decisions matching filters"""
+
+        where_clause, parameters = self.get_filter(**filters)
+        return self.connection.execute('SELECT ' + ', '.join(columns if columns is not None else yrc.RECORD_FIELDS) + ' FROM decisions' +
+                                       where_clause, parameters).fetchall()
+
+    def read_added(self, after_rowid, columns):
+        """Return list of tuples (rowid, requested columns...) of decisions added after row after_rowid, in order of rowid.
+        Upserts keep the rowid of an existing decision, so every decision is returned once however often it is seen again"""
+
+        return self.connection.execute('SELECT rowid, ' + ', '.join(columns) + ' FROM decisions WHERE rowid > ? ORDER BY rowid',
+                                       [after_rowid]).fetchall()
+
+    def count(self, **filters):
+        where_clause, parameters = self.get_filter(**filters)
+        return self.connection.execute('SELECT COUNT(*) FROM decisions' + where_clause, parameters).fetchone()[0]
+
+    def get_query_plan(self, **filters):
+        """Return SQLite query plan of reading decisions matching filters, to check which index is used"""
+
+        where_clause, parameters = self.get_filter(**filters)
+        return [row[-1] for row in self.connection.execute('EXPLAIN QUERY PLAN SELECT * FROM decisions' + where_clause, parameters)]
+
+    def close(self):
+        self.connection.close()
+
+
+class DecisionStoreSink(object):
+    """Export sink upserting records into decision store in batched transactions of `batch_rows` rows.
+    Rows are converted to records with the record batch of the exports"""
+
+    def __init__(self, database_path, header_fields, batch_rows=1000):
+        self.store = DecisionStore(database_path)
+        self.batch_rows = batch_rows
+        self.row_fields = yrc.get_row_fields(header_fields)
+        self.rows = []
+        self.column_rows = []
+
+    def write_row(self, row):
+        self.rows.append(row)
+        if len(self.rows) + len(self.column_rows) >= self.batch_rows:
+            self.flush()
+
+    def write_batch(self, record_batch):
+        """Take column values of typed records of batch as they are, without parsing scores of rows again"""
+
+        # Rows written before stay ahead of the batch
+        self.convert_rows()
+        self.column_rows.extend(record_batch.iterate_columns())
+        if len(self.column_rows) >= self.batch_rows:
+            self.flush()
+
+    def convert_rows(self):
+        if len(self.rows) > 0:
+            self.column_rows.extend(yrc.RecordBatch.from_rows(self.rows, self.row_fields).iterate_columns())
+            self.rows = []
+
+    def flush(self):
+        self.convert_rows()
+        if len(self.column_rows) == 0:
+            return
+        self.store.upsert(self.column_rows)
+        self.column_rows = []
+
+    def close(self):
+        self.flush()
+        self.store.close()
+
+
+def open_decision_store_sinks(database_path, header_fields):
+    """Return list holding decision store sink, empty if store is not configured"""
+
+    if database_path is None:
+        return []
+    return [DecisionStoreSink(database_path, header_fields)]
@@ -0,0 +1,223 @@
+import csv
+import json
+import os
+import itertools
+import pickle
+import xlsxwriter
+import yocket_records as yrc
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class XlsxSink(object):
+    """Excel file in readable format written row by row.
+    Workbook runs in constant_memory mode so only the current row is held in memory"""
+
+    def __init__(self, file_path, header_fields):
+        self.workbook = xlsxwriter.Workbook(file_path, {'constant_memory': True})
+        self.worksheet = self.workbook.add_worksheet()
+        # Write Header Fields
+        self.worksheet.write_row(0, 0, header_fields)
+        self.row_num = 1
+
+    def write_row(self, row):
+        self.worksheet.write_row(self.row_num, 0, row)
+        self.row_num += 1
+
+    def close(self):
+        self.workbook.close()
+
+
+class CsvSink(object):
+    """CSV file appended row by row with header fields as first row"""
+
+    def __init__(self, file_path, header_fields):
+        self.f = open(file_path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(header_fields)
+
+    def write_row(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.f.close()
+
+
+class JsonLinesSink(object):
+    """Append-only file holding one JSON list per row.
+
+    If offset is given existing file is kept and truncated to offset first,
+    dropping rows written after the offset was taken."""
+
+    def __init__(self, file_path, header_fields=None, offset=None):
+        if offset is None:
+            self.f = open(file_path, 'wb')
+        else:
+            # Append mode would leave position at the old end of file until the first write
+            self.f = open(file_path, 'r+b' if os.path.exists(file_path) else 'w+b')
+            self.f.truncate(offset)
+            self.f.seek(offset)
+
+    def write_row(self, row):
+        self.f.write((json.dumps(row) + '\n').encode('utf-8'))
+
+    def flush(self):
+        self.f.flush()
+
+    def sync(self):
+        """Write buffered rows through to disk, so that an offset saved afterwards never points past the rows on disk"""
+
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def tell(self):
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+
+class PickleStreamSink(object):
+    """Binary file which can be used for analytics, framed as one pickle per row.
+    Written as .pkls, not the .data of the single pickled list exported before, read back with read_pickle_stream"""
+
+    def __init__(self, file_path, header_fields=None):
+        self.f = open(file_path, 'wb')
+
+    def write_row(self, row):
+        pickle.dump(row, self.f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def close(self):
+        self.f.close()
+
+
+class MsgpackStreamSink(object):
+    """Binary file of consecutive msgpack arrays, one per row.
+    Requires optional msgpack package"""
+
+    def __init__(self, file_path, header_fields=None):
+        if msgpack is None:
+            raise ImportError("msgpack export requires the msgpack package")
+        self.f = open(file_path, 'wb')
+        self.packer = msgpack.Packer()
+
+    def write_row(self, row):
+        self.f.write(self.packer.pack(row))
+
+    def close(self):
+        self.f.close()
+
+
+# Export format -> (sink type, file extension)
+SINK_TYPES = dict()
+SINK_TYPES['xlsx'] = (XlsxSink, '.xlsx')
+SINK_TYPES['csv'] = (CsvSink, '.csv')
+SINK_TYPES['jsonl'] = (JsonLinesSink, '.jsonl')
+SINK_TYPES['pickle'] = (PickleStreamSink, '.pkls')
+SINK_TYPES['msgpack'] = (MsgpackStreamSink, '.msgpack')
+
+
+class MultiSink(object):
+    """Forward every row to several sinks"""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+        self.rows_written = 0
+
+    def write_row(self, row):
+        for sink in self.sinks:
+            sink.write_row(row)
+        self.rows_written += 1
+
+    def write_batch(self, record_batch, row_fields):
+        """Write records of batch as rows in order of row_fields.
+        Sinks taking batches themselves read its typed columns instead of the rows"""
+
+        rows = None
+        for sink in self.sinks:
+            if hasattr(sink, 'write_batch'):
+                sink.write_batch(record_batch)
+                continue
+            # Rows are built once for all sinks taking rows
+            if rows is None:
+                rows = list(record_batch.iterate_rows(row_fields))
+            for row in rows:
+                sink.write_row(row)
+        self.rows_written += len(record_batch)
+
+    def write_rows(self, rows, row_fields):
+        """Write list of rows whose values are in order of row_fields.
+        Rows go to sinks taking rows as they are, only sinks taking batches get them as a record batch"""
+
+        record_batch = None
+        for sink in self.sinks:
+            if not hasattr(sink, 'write_batch'):
+                for row in rows:
+                    sink.write_row(row)
+                continue
+            # Records are built once for all sinks taking batches
+            if record_batch is None:
+                record_batch = yrc.RecordBatch.from_rows(rows, row_fields)
+            sink.write_batch(record_batch)
+        self.rows_written += len(rows)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+def open_sinks(base_path, header_fields, export_formats, extra_sinks=()):
+    """Return MultiSink writing rows to base_path + extension for every export format
+    and to already opened extra sinks"""
+
+    sinks = list(extra_sinks)
+    try:
+        for export_format in export_formats:
+            sink_type, file_extension = SINK_TYPES[export_format]
+            sinks.append(sink_type(base_path + file_extension, header_fields))
+    except BaseException:
+        for sink in sinks:
+            sink.close()
+        raise
+    return MultiSink(sinks)
+
+
+def iterate_chunks(rows, chunk_rows):
+    """Yield lists of at most chunk_rows rows of rows"""
+
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def read_pickle_stream(file_path):
+    """Yield rows of a file written by PickleStreamSink"""
+
+    with open(file_path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def read_json_lines(file_path):
+    """Yield rows of a file written by JsonLinesSink"""
+
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, 'rb') as f:
+        for line in f:
+            yield json.loads(line)
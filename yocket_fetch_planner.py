@@ -0,0 +1,59 @@
+import yocket_listing_parser as ylp
+
+
+class FetchPlanner(object):
+    """Decide from listing page data alone which profile pages have to be requested.
+
+    Every listed decision is counted under the reason it needed no profile
+    request, or under profile_requests if it was planned for fetching."""
+
+    def __init__(self, split_university_course, profile_cache=None):
+        self.split_university_course = split_university_course
+        self.profile_cache = profile_cache
+        self.planned_profile_paths = set()
+        self.counters = dict(listed=0, not_decision=0, below_criteria=0, unsplittable_course=0, already_exported=0, served_from_cache=0,
+                             profile_requests=0)
+
+    def plan_page(self, page_decisions, exported_profile_paths=frozenset()):
+        """Return list of 3 tuple (decision, university, course) whose profile is needed for a record.
+        Profiles in exported_profile_paths already have a record and are skipped"""
+
+        planned_decisions = []
+        for decision in page_decisions:
+            self.counters['listed'] += 1
+
+            # Fetch results only if ADMIT or REJECT and minimum criteria met
+            if decision.admit_status.lower() not in ylp.DECISION_STATUSES:
+                self.counters['not_decision'] += 1
+                continue
+            if not decision.meets_criteria:
+                self.counters['below_criteria'] += 1
+                continue
+
+            # Append decision information to final bucket only if university and course can be told apart
+            current_university, current_course = self.split_university_course(decision.university_course)
+            if current_university is None:
+                self.counters['unsplittable_course'] += 1
+                continue
+            if decision.profile_page_path in exported_profile_paths:
+                self.counters['already_exported'] += 1
+                continue
+
+            # Profiles planned earlier in this run are cached or shared with the pending request by then
+            if decision.profile_page_path in self.planned_profile_paths or (self.profile_cache is not None and
+                                                                            self.profile_cache.contains(decision.profile_page_path)):
+                self.counters['served_from_cache'] += 1
+            else:
+                self.counters['profile_requests'] += 1
+                self.planned_profile_paths.add(decision.profile_page_path)
+            planned_decisions.append((decision, current_university, current_course))
+        return planned_decisions
+
+    def get_summary(self):
+        """Return dictionary of counters with number of profile requests avoided.
+        Decisions other than admits and rejects, below minimum scores or of unsplittable courses were never fetched
+        before planning either, so only exported profiles and profiles served from cache count as avoided"""
+
+        summary = dict(self.counters)
+        summary['avoided_profile_requests'] = summary['already_exported'] + summary['served_from_cache']
+        return summary
@@ -0,0 +1,208 @@
+import gzip
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+LIVE_HOME_PAGE = 'https://yocket.in/'
+
+SYNTHETIC_UNIVERSITIES = ['Carnegie Mellon University', 'University of Southern California', 'Georgia Institute of Technology',
+                          'University of California Los Angeles', 'New York University', 'Cornell University']
+SYNTHETIC_COURSES = ['computer science', 'data science', 'machine learning', 'artificial intelligence', 'cyber security',
+                     'network engineering']
+SYNTHETIC_STATUSES = ['Admit', 'Admit', 'Reject', 'Reject', 'Interested']
+
+
+def get_page_random(page_key):
+    """Return random generator seeded by page key so that served pages are deterministic"""
+
+    return random.Random(zlib.crc32(page_key.encode('utf-8')))
+
+
+def build_decision_bucket(page_random, profile_pool):
+    """Return html of a single decision bucket laid out like a yocket listing page"""
+
+    profile_id = page_random.randrange(profile_pool)
+    university_course = page_random.choice(SYNTHETIC_UNIVERSITIES) + ' ' + page_random.choice(SYNTHETIC_COURSES)
+    gpa = page_random.choice([str(round(page_random.uniform(6.0, 10.0), 2)) + ' CGPA', str(page_random.randrange(60, 96)) + ' %'])
+    return ('<div class="panel-body">'
+            '<div><div><h4><a href="/profile/%d">Applicant %d</a>\n<small>\n%s\n</small></h4></div>'
+            '<div><label>\n%s\n</label></div></div>'
+            '<div><div><small>GRE</small><br/>\n%d\n</div>'
+            '<div><small>TOEFL</small><br/>\n%d\n</div>'
+            '<div><small>Undergrad</small><br/>\n%s\n</div>'
+            '<div><small>Work Ex</small><br/>\n%d months\n</div></div>'
+            '</div>') % (profile_id, profile_id, university_course, page_random.choice(SYNTHETIC_STATUSES),
+                         page_random.randrange(300, 341), page_random.randrange(90, 121), gpa, page_random.randrange(0, 60))
+
+
+def build_listing_page(page_key, buckets_per_page, profile_pool):
+    """Return html of a listing page holding buckets_per_page decisions"""
+
+    page_random = get_page_random(page_key)
+    buckets = ''.join('<div class="col-sm-6"><div class="panel panel-warning">' + build_decision_bucket(page_random, profile_pool) +
+                      '</div></div>' for _ in range(buckets_per_page))
+    return '<html><body><div class="container"><div class="row">' + buckets + '</div></div></body></html>'
+
+
+def build_no_results_page():
+    """Return html of page served after the last listing page"""
+
+    return '<html><body><p class="lead"><i class="fa fa-frown-o"></i> No matching profiles found!</p></body></html>'
+
+
+def build_forbidden_page():
+    """Return html of page served with 403 while the client is blocked, it has neither decision buckets nor the no results message"""
+
+    return '<html><body><h1>403 Forbidden</h1></body></html>'
+
+
+def build_captcha_page():
+    """Return html of captcha page, it has neither decision buckets nor the no results message"""
+
+    return '<html><body><form action="/captcha"><div class="g-recaptcha"></div></form></body></html>'
+
+
+def build_profile_page(page_key):
+    """Return html of an applicant profile page with UG details, GRE split and papers"""
+
+    page_random = get_page_random(page_key)
+    empty_columns = '<div></div>' * 6
+    return ('<html><body><div id="yocket_app"><div class="col-sm-6">'
+            '<div class="col-sm-12 card"><div>' + empty_columns +
+            '<div><p><b>\nB.Tech Computer Science\n</b></p><p>\nInstitute %d\n</p></div></div></div>'
+            '<div class="col-sm-12"><div class="row text-center">'
+            '<div><h4><span>Quant %d<br/>Verbal %d</span></h4></div><div></div><div></div>'
+            '<div><h4>Papers<br/>\n%d\n</h4></div>'
+            '</div></div></div></div></body></html>') % (page_random.randrange(50), page_random.randrange(155, 171),
+                                                       page_random.randrange(145, 171), page_random.randrange(0, 4))
+
+
+class SyntheticPageSource(object):
+    """Serve generated listing and profile pages.
+
+    Every listing URL has `pages_per_listing` pages of `buckets_per_page`
+    decisions followed by the no results page. Applicants are drawn from a
+    pool of `profile_pool` profiles so the same profile appears on many pages."""
+
+    def __init__(self, pages_per_listing=5, buckets_per_page=20, profile_pool=2000):
+        self.pages_per_listing = pages_per_listing
+        self.buckets_per_page = buckets_per_page
+        self.profile_pool = profile_pool
+
+    def get_page(self, request_path):
+        """Return 2 tuple (status code, html) for request path including query string"""
+
+        split_path = urlsplit(request_path)
+        if '/profile/' in split_path.path:
+            return 200, build_profile_page(split_path.path)
+        page_index = int(parse_qs(split_path.query).get('page', ['1'])[0])
+        if page_index > self.pages_per_listing:
+            return 200, build_no_results_page()
+        return 200, build_listing_page(request_path, self.buckets_per_page, self.profile_pool)
+
+
+class FaultInjectingPageSource(object):
+    """Serve pages of another page source with blocking faults injected.
+
+    Listing requests get the captcha page with probability `captcha_rate`,
+    any request gets 403 with probability `forbidden_rate`, and the
+    `block_length` requests starting at request number `block_start` are all
+    answered with 403 to stand in for a temporary block of the client."""
+
+    def __init__(self, page_source, captcha_rate=0.0, forbidden_rate=0.0, block_start=None, block_length=0, seed=0):
+        self.page_source = page_source
+        self.captcha_rate = captcha_rate
+        self.forbidden_rate = forbidden_rate
+        self.block_start = block_start
+        self.block_length = block_length
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    def get_page(self, request_path):
+        """Return 2 tuple (status code, html) for request path including query string"""
+
+        # Server threads share request counter and random generator
+        with self.lock:
+            request_index = self.request_count
+            self.request_count += 1
+            fault_draw = self.random.random()
+        if self.block_start is not None and self.block_start <= request_index < self.block_start + self.block_length:
+            return 403, build_forbidden_page()
+        if fault_draw < self.forbidden_rate:
+            return 403, build_forbidden_page()
+        if '/profile/' not in request_path and fault_draw < self.forbidden_rate + self.captcha_rate:
+            return 200, build_captcha_page()
+        return self.page_source.get_page(request_path)
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    """Answer GET requests from page source of server.
+    Connections are kept alive, bodies are gzip encoded if the client accepts it and
+    pages carry an ETag so that conditional requests are answered with 304"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        # Collapse duplicate slashes produced by HOME_PAGE + profile path
+        request_path = '/' + self.path.lstrip('/')
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+        status_code, page_html = self.server.page_source.get_page(request_path)
+        body = page_html.encode('utf-8')
+        entity_tag = '"%08x"' % zlib.crc32(body)
+        if status_code == 200 and self.headers.get('If-None-Match') == entity_tag:
+            self.send_response(304)
+            self.send_header('ETag', entity_tag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if status_code == 200:
+            self.send_header('ETag', entity_tag)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output free of request logs
+        pass
+
+
+def start_fixture_server(page_source=None, latency=0.0, port=0):
+    """Return running fixture server listening on localhost.
+    Latency in seconds is added to every response to stand in for network round trips"""
+
+    fixture_server = ThreadingHTTPServer(('127.0.0.1', port), FixtureRequestHandler)
+    fixture_server.daemon_threads = True
+    fixture_server.page_source = page_source if page_source is not None else SyntheticPageSource()
+    fixture_server.latency = latency
+    threading.Thread(target=fixture_server.serve_forever, daemon=True).start()
+    return fixture_server
+
+
+def get_server_url(fixture_server):
+    """Return base url of fixture server ending with slash like HOME_PAGE"""
+
+    return 'http://127.0.0.1:%d/' % fixture_server.server_address[1]
+
+
+def rebase_constants(constants, base_url):
+    """Return copy of scraping constants with yocket URLs pointing to base_url"""
+
+    rebased_constants = dict()
+    for key, value in constants.items():
+        if isinstance(value, str):
+            rebased_constants[key] = value.replace(LIVE_HOME_PAGE, base_url)
+        elif isinstance(value, dict):
+            rebased_constants[key] = rebase_constants(value, base_url)
+        else:
+            rebased_constants[key] = value
+    return rebased_constants
@@ -1,202 +1,188 @@
-import requests
 from lxml import html as lxml_html
-import browser_cookie3
-import re
-import pickle
-import xlsxwriter
-import random
-import time
+import asyncio
+import yocket_async_fetcher as yaf
+import yocket_backoff as ybo
+import yocket_listing_parser as ylp
+import yocket_export_sinks as yse
+import yocket_records as yrc
+import yocket_columnar_store as ycs
+import yocket_decision_store as yds
+import yocket_admit_tables as yat
+import yocket_profile_cache as ypc
+import yocket_fetch_planner as yfp
+import yocket_run_metrics as yrm
+import yocket_replay as yrp
+import yocket_session_factory as ysf
+import yocket_config as yco
+import yocket_cookie_cache as yck
+import os
 
 global_constants = None
+profile_cache = None
+fetch_planner = None
+run_metrics = None
+
+# Column names for data
+HEADER_FIELDS = ['Course', 'University', 'GPA', 'GRE', 'TOEFL', 'Work Experience', 'UG Course', 'UG College','Admit Status', 'Profile']
 
 
 def get_constants():
     """Return a dictionary containing all input constraints for scraping.
     All attributes except URL can be changed as per requirement"""
 
-    dict_constants = dict()
-    dict_constants['LOGIN_URL'] = "https://yocket.in/account/login"
-    dict_constants['PAST_RESULTS_URL'] = "https://yocket.in/recent-admits-rejects?page="
-    dict_constants['ALL_RESULTS_URL'] = "https://yocket.in/profiles/find/matching-admits-and-rejects?page="
-    dict_constants['HOME_PAGE'] = 'https://yocket.in/'
-    dict_constants['NUMBER_PAGE_TO_SCRAPE_FIRST'] = 1
-    dict_constants['NUMBER_PAGE_TO_SCRAPE_LAST'] = 2
-    dict_constants['MINIMUM_GPA'] = 7.5
-    dict_constants['MINIMUM_GRE'] = 320
-    dict_constants['MINIMUM_TOEFL'] = 100
-
-    return dict_constants
-
-
-def get_gpa(current_bucket_gpa):
-    """Return a float value.
-    Computed grade is obtained by getting numeric/floating
-    part of string and then converting it into GPA if it is a
-    percentage by a factor of 10."""
-
-    computed_grade = re.findall(r"\d+[.]?\d*", current_bucket_gpa)
-    if len(computed_grade) > 0:
-        computed_grade = computed_grade[0]
-        if float(computed_grade) > 10:
-            computed_grade = float(computed_grade[0]) / 10.0
-        return round(float(computed_grade), 2)
-    return 0.0
-
-
-def get_gre_or_toefl(current_bucket_marks):
-    """Return a int value.
-    Computed marks obtained by getting integer part of string
-    Marks for IELTS will be converted to zero or be filtered at later
-    stage."""
-
-    computed_marks = current_bucket_marks.replace("\n", "").strip()
-    try:
-        int(computed_marks)
-        return computed_marks
-    except ValueError:
-        return 0
-
-
-def get_workex_months(current_bucket_workex):
-    """Return a int value.
-    Computed workex is obtained by getting numeric
-    part of string which is equivalent to the number of months."""
-
-    computed_workex = re.findall(r"\d+", current_bucket_workex)
-    if len(computed_workex) > 0:
-        return computed_workex[0]
-    return 0
-
-
-def filter_criteria_met(current_gre, current_gpa, current_toefl):
-    """Return a boolean value.
-    If either of minimum constraints not met then False returned."""
-
-    if int(current_gre) < global_constants['MINIMUM_GRE']:
-        return False
-    if float(current_gpa) < global_constants['MINIMUM_GPA']:
-        return False
-    if int(current_toefl) < global_constants['MINIMUM_TOEFL']:
-        return False
-    return True
-
-def split_bucket_university_course(current_bucket_university_course):
-    """Return a 2 tuple list(university, course).
-    Split performed on keywords which can be course starting names."""
-
-    course_separator_delimiter = ['computer', 'artificial', 'cyber', 'network', 'data', 'machine']
-
-    for delimiter in course_separator_delimiter:
-        separated_list = current_bucket_university_course.split(delimiter,1)
-        if len(separated_list) == 2:
-            return separated_list[0], delimiter+separated_list[1]
+    return yco.get_general_constants()
 
-    return None, None
 
+def open_export_sink():
+    """Return sink streaming decision data into local files.
 
-def export_to_file(final_data_fetch):
-    """Export decision data to local files.
+    A file is created for every format in EXPORT_FORMATS, by default an
+    excel file in readable format and a binary file which can be used for analytics.
+    Records are also appended to the columnar store if COLUMNAR_STORE_DIRECTORY is set
+    and upserted into the decision store if DECISION_STORE_PATH is set."""
 
-    First file created is excel file in readable format
-    Second file is binary file which can be used for analytics."""
+    return yse.open_sinks(global_constants['OUTPUT_DIRECTORY'] + global_constants['EXPORT_FILE_NAME'], HEADER_FIELDS, global_constants['EXPORT_FORMATS'],
+                          ycs.open_columnar_sinks(global_constants['COLUMNAR_STORE_DIRECTORY'], HEADER_FIELDS) +
+                          yds.open_decision_store_sinks(global_constants['DECISION_STORE_PATH'], HEADER_FIELDS))
 
-    # Column names for data
-    header_fields = ['Course', 'University', 'GPA', 'GRE', 'TOEFL', 'Work Experience', 'UG Course', 'UG College','Admit Status']
-    with xlsxwriter.Workbook('yocket_data.xlsx') as workbook:
-        worksheet = workbook.add_worksheet()
 
-        # Write Header Fields
-        worksheet.write_row(0, 0, header_fields)
-        # Write data fields
-        for row_num, data in enumerate(final_data_fetch):
-            worksheet.write_row(row_num+1, 0, data)
+async def scrape_profile(fetcher, profile_page_path, decision_fields):
+    """Return decision record completed with UG details from profile of user.
+    None returned if profile page does not exist"""
 
-    # Store as binary data
-    with open('yocket_data.data', 'wb') as f:
-        pickle.dump(final_data_fetch, f)
+    # Get UG College from profile of user
+    # Profile pages are requested only once across pages, courses and runs
+    profile_content = await profile_cache.fetch(fetcher, profile_page_path, global_constants['HOME_PAGE'] + profile_page_path,
+                                                referer=global_constants['PAST_RESULTS_URL'])
+    with run_metrics.measure('parse_profile'):
+        profile_tree = lxml_html.fromstring(profile_content)
+    with run_metrics.measure('extract_profile'):
+        ug_details_bucket = (profile_tree.xpath('//div[@class="col-sm-12 card"][1]'))
+        if len(ug_details_bucket) >= 1:
+            ug_details_bucket = ug_details_bucket[0]
+            current_ug_course = ((ug_details_bucket.xpath('./div[1]/div[7]/p[1]/b[1]'))[0]).text.replace("\n", "").strip()
+            current_ug_college = ((ug_details_bucket.xpath('./div[1]/div[7]/p[2]'))[0]).text.replace("\n", "").strip()
 
+            (current_course, current_university, current_gpa, current_gre, current_toefl, current_workex,
+             current_admit_status) = decision_fields
+            return yrc.DecisionRecord(current_course, current_university, current_gpa, gre=current_gre, toefl=current_toefl,
+                                      workex=current_workex, ug_course=current_ug_course, ug_college=current_ug_college,
+                                      status=current_admit_status, profile_path=profile_page_path)
+    return None
 
-def perform_scraping(current_session):
-    """Trigger relevant HTTP calls to get requisite data
-    and perform actual scraping"""
 
-    # List Array storing all relevant decision information
-    final_data_fetch = []
-    pagination_index = global_constants['NUMBER_PAGE_TO_SCRAPE_FIRST']
-    while pagination_index < global_constants['NUMBER_PAGE_TO_SCRAPE_LAST']:
-        print("Page:", pagination_index, " Collected records:", len(final_data_fetch))
+async def scrape_listing_page(fetcher, pagination_index):
+    """Return record batch of decisions of a single admit-reject page.
+    Profile pages of qualifying decisions are fetched concurrently"""
 
+    attempt = 0
+    while True:
         # Get relevant admit-reject page based on pagination value
-        result = current_session.get(global_constants['ALL_RESULTS_URL'] + str(pagination_index),
-                                     headers=dict(referer=global_constants['ALL_RESULTS_URL']))
-        tree = lxml_html.fromstring(result.content)
-
-        # Get Nodes containing individual decisions for each page(approx 20 per page)
-        decision_buckets = tree.xpath('//*[@class="row"]/div[@class="col-sm-6"]/div[@class="panel panel-warning"]/div[@class="panel-body"]')
+        result = await fetcher.fetch_with_backoff(yco.get_general_page_url(global_constants, pagination_index),
+                                                  referer=global_constants['ALL_RESULTS_URL'])
+        # Response still blocked after retries of fetcher is no captcha page, backing off again would retry it all over
+        if fetcher.controller.is_blocked_status(result.status_code):
+            raise ybo.BlockedError("Page " + str(pagination_index) + " still answered with status " + str(result.status_code))
+        with run_metrics.measure('parse_listing'):
+            tree = lxml_html.fromstring(result.content)
+
+        # Get decisions of page in a single pass over decision buckets(approx 20 per page)
+        with run_metrics.measure('extract_listing'):
+            page_decisions = ylp.parse_listing_page(tree, global_constants)
 
         # If decision buckets are empty, captcha page has been encountered
-        if len(decision_buckets) == 0:
+        if len(page_decisions) == 0:
             print("Captcha Time")
-            time.sleep(120)
+            if not await fetcher.controller.back_off(attempt, 'captcha'):
+                raise ybo.BlockedError("Captcha still served for page " + str(pagination_index))
+            attempt += 1
             continue
+        break
 
-        for individual_decision_bucket in decision_buckets:
+    # Only profiles of decisions which can become a record are requested
+    profile_requests = []
+    for decision, current_university, current_course in fetch_planner.plan_page(page_decisions):
+        decision_fields = (current_course, current_university, decision.gpa, decision.gre, decision.toefl, decision.workex, decision.admit_status)
+        profile_requests.append(scrape_profile(fetcher, decision.profile_page_path, decision_fields))
 
-            current_admit_status = ((individual_decision_bucket.xpath('./div[1]/div[2]/label'))[0]).text.strip()
+    page_batch = yrc.RecordBatch()
+    page_batch.extend(record for record in await asyncio.gather(*profile_requests) if record is not None)
+    print("Page:", pagination_index, " Collected records:", len(page_batch))
+    return page_batch
 
-            # Fetch results only if ADMIT or REJECT
-            if current_admit_status.lower() == 'admit' or current_admit_status.lower() == 'reject':
 
-                # Get relevant information from html page returned in response
-                current_bucket_university_course = ((individual_decision_bucket.xpath('./div[1]/div[1]/h4/small'))[0]).text.replace("\n","").strip()
-                current_gre = get_gre_or_toefl(((((individual_decision_bucket.xpath('./div[2]/div[1]'))[0]).getchildren())[1]).tail)
-                current_toefl = get_gre_or_toefl(((((individual_decision_bucket.xpath('./div[2]/div[2]'))[0]).getchildren())[1]).tail)
-                current_gpa = get_gpa(((((individual_decision_bucket.xpath('./div[2]/div[3]'))[0]).getchildren())[1]).tail)
-                current_workex = get_workex_months(((((individual_decision_bucket.xpath('./div[2]/div[4]'))[0]).getchildren())[1]).tail)
+async def scrape_all_pages(fetcher, export_sink):
+    """Write decision records of all pages in configured range to export sink as they are collected.
+    Listing pages and their profile pages are fetched concurrently in windows of PAGE_WINDOW pages,
+    records of a window are written in page order. Return number of records written"""
 
-                current_university, current_course = split_bucket_university_course(current_bucket_university_course.lower())
-                # Append decision information to final bucket only if minimum criteria met
-                if current_university is not None and filter_criteria_met(current_gre, current_gpa, current_toefl):
+    records_written = 0
+    page_range = range(global_constants['NUMBER_PAGE_TO_SCRAPE_FIRST'], global_constants['NUMBER_PAGE_TO_SCRAPE_LAST'])
+    for window_start in range(0, len(page_range), global_constants['PAGE_WINDOW']):
+        window_pages = page_range[window_start:window_start + global_constants['PAGE_WINDOW']]
+        for page_batch in await asyncio.gather(*[scrape_listing_page(fetcher, pagination_index) for pagination_index in window_pages]):
+            with run_metrics.measure('export'):
+                export_sink.write_batch(page_batch, yrc.GENERAL_ROW_FIELDS)
+            run_metrics.count('records_exported', len(page_batch))
+            records_written += len(page_batch)
+    return records_written
 
-                    # Get UG College from profile of user
-                    profile_page_path = ((individual_decision_bucket.xpath('./div[1]/div[1]/h4/a'))[0]).attrib['href']
-                    profile_result = current_session.get(global_constants['HOME_PAGE'] + profile_page_path,
-                                                         headers=dict(referer=global_constants['PAST_RESULTS_URL']))
-                    profile_tree = lxml_html.fromstring(profile_result.content)
-                    ug_details_bucket = (profile_tree.xpath('//div[@class="col-sm-12 card"][1]'))
-                    if len(ug_details_bucket) >= 1:
-                        ug_details_bucket = ug_details_bucket[0]
-                        current_ug_course = ((ug_details_bucket.xpath('./div[1]/div[7]/p[1]/b[1]'))[0]).text.replace("\n", "").strip()
-                        current_ug_college = ((ug_details_bucket.xpath('./div[1]/div[7]/p[2]'))[0]).text.replace("\n", "").strip()
 
-                        final_data_fetch.append([current_course, current_university, current_gpa, current_gre, current_toefl,
-                                                 current_workex, current_ug_course, current_ug_college, current_admit_status])
+def perform_scraping(current_session):
+    """Trigger relevant HTTP calls to get requisite data
+    and perform actual scraping"""
 
-        # Add sleep time to allow for web scraping in undetected manner
-        sleep_delay = random.choice([0, 1, 2, 3])
-        time.sleep(sleep_delay)
-        pagination_index += 1
+    # Requests are rate limited per host instead of sleeping between them
+    global profile_cache, fetch_planner, run_metrics
+    run_metrics = yrm.RunMetrics()
+    profiler = yrm.create_profiler(global_constants)
+    profiler.start()
+    profile_cache = ypc.create_profile_cache(global_constants)
+    fetch_planner = yfp.FetchPlanner(ylp.split_bucket_university_course, profile_cache)
+    fetcher = yaf.create_fetcher(current_session, global_constants, run_metrics)
+    try:
+        # Records are exported as soon as their page is complete
+        with open_export_sink() as export_sink:
+            asyncio.run(scrape_all_pages(fetcher, export_sink))
+    finally:
+        fetcher.close()
+        run_metrics.stop()
+        yrm.report_run(run_metrics, profile_cache, fetch_planner, fetcher, current_session, profiler, global_constants['METRICS_FILE'])
+        profile_cache.close()
 
-    # Export final_data to excel sheet
-    export_to_file(final_data_fetch)
 
+def refresh_admit_tables():
+    """Count decisions stored by this run into admit rate tables"""
 
-def main():
-    # Get cookie from Chrome Browser
-    cookiejar = browser_cookie3.chrome()
+    admit_tables = yat.refresh_admit_tables(global_constants)
+    if admit_tables is not None:
+        print("Admit tables:", admit_tables.get_summary())
 
-    # Load all scraping constants
-    global global_constants
-    global_constants = get_constants()
 
-    # Start session
-    current_session = requests.session()
+def main(constants=None):
+    # Load all scraping constants, command line passes its configured constants
+    global global_constants
+    global_constants = constants if constants is not None else get_constants()
+    if global_constants['OUTPUT_DIRECTORY']:
+        os.makedirs(global_constants['OUTPUT_DIRECTORY'], exist_ok=True)
 
-    # Get login page and set cookie of current session as the browser session to bypass authentication
-    current_session.get(global_constants['LOGIN_URL'], cookies=cookiejar, headers=dict([('referer', global_constants['HOME_PAGE'])]))
+    # Get cookie from cache or Chrome Browser, replayed responses need no login
+    cookiejar = yck.load_cookies(global_constants)
 
-    # Perform actual scraping
-    perform_scraping(current_session)
+    # Start session with pooled connections, requests are recorded or replayed if HTTP_ARCHIVE_MODE is set
+    http_archive = yrp.open_http_archive(global_constants)
+    current_session = ysf.create_session(global_constants, http_archive)
+    try:
+        # Get login page and set cookie of current session as the browser session to bypass authentication
+        current_session.get(global_constants['LOGIN_URL'], cookies=cookiejar, headers=dict([('referer', global_constants['HOME_PAGE'])]))
+
+        # Perform actual scraping
+        perform_scraping(current_session)
+        refresh_admit_tables()
+    finally:
+        if http_archive is not None:
+            print("HTTP archive:", http_archive.get_summary())
+            http_archive.close()
 
 
 if __name__ == "__main__":
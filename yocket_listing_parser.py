@@ -0,0 +1,80 @@
+from collections import namedtuple
+from lxml import etree
+import yocket_score_normalizer as ysn
+
+# Decision of a single bucket on a listing page, scores are only parsed for admits and rejects.
+# meets_criteria is True for admits and rejects whose GRE, GPA and TOEFL meet the minimum scores
+ListingDecision = namedtuple('ListingDecision', ['profile_page_path', 'university_course', 'admit_status', 'gre', 'toefl', 'gpa',
+                                                 'workex', 'meets_criteria'])
+
+# XPath expressions are compiled once instead of being parsed again for every bucket
+DECISION_BUCKETS_XPATH = etree.XPath('//*[@class="row"]/div[@class="col-sm-6"]/div[@class="panel panel-warning"]/div[@class="panel-body"]')
+NO_RESULTS_XPATH = etree.XPath('//p[@class="lead"]/i')
+HEADER_XPATH = etree.XPath('./div[1]/div[1]/h4')
+STATUS_XPATH = etree.XPath('./div[1]/div[2]/label')
+SCORES_XPATH = etree.XPath('./div[2]/div')
+
+DECISION_STATUSES = ('admit', 'reject')
+# Score texts of buckets which are neither admit nor reject, normalized to zero
+EMPTY_SCORE_TEXTS = ('', '', '', '')
+
+
+def get_decision_buckets(tree):
+    """Return nodes containing individual decisions of listing page(approx 20 per page)"""
+
+    return DECISION_BUCKETS_XPATH(tree)
+
+
+def is_no_results_page(tree):
+    """Return True if page is served after the last page of results"""
+
+    no_results_page = NO_RESULTS_XPATH(tree)
+    return len(no_results_page) > 0 and str(no_results_page[0].tail).strip().lower() == 'no matching profiles found!'
+
+
+def parse_decision_bucket(individual_decision_bucket):
+    """Return 4 tuple (profile path, university course, admit status, raw score texts) of a decision bucket.
+    Header and score nodes are each located once and their fields read from the same nodes"""
+
+    header = HEADER_XPATH(individual_decision_bucket)[0]
+    current_admit_status = STATUS_XPATH(individual_decision_bucket)[0].text.strip()
+    profile_page_path = header.find('a').attrib['href']
+    current_bucket_university_course = header.find('small').text.replace("\n", "").strip().lower()
+
+    if current_admit_status.lower() not in DECISION_STATUSES:
+        return profile_page_path, current_bucket_university_course, current_admit_status, EMPTY_SCORE_TEXTS
+
+    # GRE, TOEFL, GPA and work experience follow the label of their score node
+    score_texts = tuple(score_node[1].tail for score_node in SCORES_XPATH(individual_decision_bucket)[:4])
+    return profile_page_path, current_bucket_university_course, current_admit_status, score_texts
+
+
+def split_bucket_university_course(current_bucket_university_course):
+    """Return a 2 tuple list(university, course).
+    Split performed on keywords which can be course starting names."""
+
+    course_separator_delimiter = ['computer', 'artificial', 'cyber', 'network', 'data', 'machine']
+
+    for delimiter in course_separator_delimiter:
+        separated_list = current_bucket_university_course.split(delimiter,1)
+        if len(separated_list) == 2:
+            return separated_list[0], delimiter+separated_list[1]
+
+    return None, None
+
+
+def parse_listing_page(tree, constants):
+    """Return list of ListingDecision for every decision bucket of page in page order.
+    Scores are normalized and checked against minimum scores of constants. A page holds
+    about 20 decisions, too few for batch normalization to pay off, so scalar helpers are used.
+    Empty list returned for captcha and no results pages"""
+
+    page_decisions = []
+    for individual_decision_bucket in get_decision_buckets(tree):
+        profile_page_path, university_course, admit_status, score_texts = parse_decision_bucket(individual_decision_bucket)
+        gre_text, toefl_text, gpa_text, workex_text = score_texts
+        gre, toefl, gpa = ysn.get_gre_or_toefl(gre_text), ysn.get_gre_or_toefl(toefl_text), ysn.get_gpa(gpa_text)
+        page_decisions.append(ListingDecision(profile_page_path, university_course, admit_status, gre, toefl, gpa,
+                                              ysn.get_first_integer(workex_text),
+                                              admit_status.lower() in DECISION_STATUSES and ysn.meets_criteria(gre, gpa, toefl, constants)))
+    return page_decisions
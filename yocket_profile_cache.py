@@ -0,0 +1,157 @@
+import asyncio
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+
+
+class ProfileCache(object):
+    """Two tier cache of profile page content keyed by profile path.
+
+    Pages are kept zlib compressed in a SQLite file so that re-runs and
+    overlapping courses reuse them, with the most recently used pages also
+    held in memory. Entries older than `ttl_seconds` are fetched again as
+    conditional requests with the ETag and Last-Modified of the cached copy,
+    which is kept if the server answers 304 Not Modified."""
+
+    def __init__(self, database_path, ttl_seconds, memory_entries=512):
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.memory_tier = OrderedDict()
+        self.pending_fetches = dict()
+        self.counters = dict(memory_hits=0, disk_hits=0, misses=0, expired=0, shared=0, fetched=0, not_modified=0)
+        self.connection = sqlite3.connect(database_path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS profile_pages (profile_path TEXT PRIMARY KEY, content BLOB NOT NULL, '
+                                'fetched_at REAL NOT NULL, etag TEXT, last_modified TEXT)')
+        # Caches written before validators were stored lack their columns
+        column_names = [row[1] for row in self.connection.execute('PRAGMA table_info(profile_pages)')]
+        for column_name in ('etag', 'last_modified'):
+            if column_name not in column_names:
+                self.connection.execute('ALTER TABLE profile_pages ADD COLUMN ' + column_name + ' TEXT')
+        self.connection.commit()
+
+    def remember(self, profile_page_path, content, fetched_at):
+        """Put page in memory tier evicting least recently used pages beyond capacity"""
+
+        self.memory_tier[profile_page_path] = (content, fetched_at)
+        self.memory_tier.move_to_end(profile_page_path)
+        while len(self.memory_tier) > self.memory_entries:
+            self.memory_tier.popitem(last=False)
+
+    def is_fresh(self, fetched_at):
+        return time.time() - fetched_at < self.ttl_seconds
+
+    def contains(self, profile_page_path):
+        """Return True if a fresh copy of profile page is cached, without touching counters or LRU order"""
+
+        if profile_page_path in self.memory_tier and self.is_fresh(self.memory_tier[profile_page_path][1]):
+            return True
+        row = self.connection.execute('SELECT fetched_at FROM profile_pages WHERE profile_path = ?', (profile_page_path,)).fetchone()
+        return row is not None and self.is_fresh(row[0])
+
+    def get(self, profile_page_path):
+        """Return cached content of profile page.
+        None returned if page is not cached or has expired"""
+
+        if profile_page_path in self.memory_tier:
+            content, fetched_at = self.memory_tier[profile_page_path]
+            if self.is_fresh(fetched_at):
+                self.memory_tier.move_to_end(profile_page_path)
+                self.counters['memory_hits'] += 1
+                return content
+            del self.memory_tier[profile_page_path]
+
+        row = self.connection.execute('SELECT content, fetched_at FROM profile_pages WHERE profile_path = ?',
+                                      (profile_page_path,)).fetchone()
+        if row is not None:
+            if self.is_fresh(row[1]):
+                content = zlib.decompress(row[0])
+                self.remember(profile_page_path, content, row[1])
+                self.counters['disk_hits'] += 1
+                return content
+            self.counters['expired'] += 1
+        self.counters['misses'] += 1
+        return None
+
+    def get_conditional_headers(self, profile_page_path):
+        """Return 2 tuple (content, headers of conditional request) of expired cached copy of profile page.
+        (None, None) returned if there is no copy or the server sent no validators for it"""
+
+        row = self.connection.execute('SELECT content, etag, last_modified FROM profile_pages WHERE profile_path = ?',
+                                      (profile_page_path,)).fetchone()
+        if row is None or (row[1] is None and row[2] is None):
+            return None, None
+        conditional_headers = dict()
+        if row[1] is not None:
+            conditional_headers['If-None-Match'] = row[1]
+        if row[2] is not None:
+            conditional_headers['If-Modified-Since'] = row[2]
+        return zlib.decompress(row[0]), conditional_headers
+
+    def put(self, profile_page_path, content, etag=None, last_modified=None):
+        """Store content of profile page in both tiers with validators of the response"""
+
+        fetched_at = time.time()
+        self.connection.execute('INSERT OR REPLACE INTO profile_pages (profile_path, content, fetched_at, etag, last_modified) '
+                                'VALUES (?, ?, ?, ?, ?)', (profile_page_path, zlib.compress(content), fetched_at, etag, last_modified))
+        self.connection.commit()
+        self.remember(profile_page_path, content, fetched_at)
+
+    async def fetch(self, fetcher, profile_page_path, url, referer):
+        """Return content of profile page, requesting it only if not cached.
+        Concurrent requests for the same profile share a single HTTP call"""
+
+        content = self.get(profile_page_path)
+        if content is not None:
+            return content
+        if profile_page_path in self.pending_fetches:
+            self.counters['shared'] += 1
+            return await asyncio.shield(self.pending_fetches[profile_page_path])
+
+        pending_fetch = asyncio.get_running_loop().create_future()
+        self.pending_fetches[profile_page_path] = pending_fetch
+        try:
+            self.counters['fetched'] += 1
+            cached_content, conditional_headers = self.get_conditional_headers(profile_page_path)
+            profile_result = await fetcher.fetch_with_backoff(url, referer=referer, headers=conditional_headers)
+            content = profile_result.content
+            if profile_result.status_code == 304 and cached_content is not None:
+                # Expired copy is still current, only its age is reset
+                self.counters['not_modified'] += 1
+                content = cached_content
+                self.put(profile_page_path, content, profile_result.headers.get('ETag', conditional_headers.get('If-None-Match')),
+                         profile_result.headers.get('Last-Modified', conditional_headers.get('If-Modified-Since')))
+            # Only complete pages are cached, error pages are fetched again next time
+            elif profile_result.status_code == 200:
+                self.put(profile_page_path, content, profile_result.headers.get('ETag'), profile_result.headers.get('Last-Modified'))
+            pending_fetch.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            pending_fetch.cancel()
+            raise
+        except Exception as error:
+            pending_fetch.set_exception(error)
+            # Mark exception as retrieved when no other request was waiting on it
+            pending_fetch.exception()
+            raise
+        finally:
+            del self.pending_fetches[profile_page_path]
+
+    def get_summary(self):
+        """Return dictionary of hit and miss counters"""
+
+        summary = dict(self.counters)
+        lookups = summary['memory_hits'] + summary['disk_hits'] + summary['misses']
+        summary['hit_rate'] = round((summary['memory_hits'] + summary['disk_hits']) / lookups, 4) if lookups > 0 else 0.0
+        return summary
+
+    def close(self):
+        self.connection.close()
+
+
+def create_profile_cache(constants):
+    """Return ProfileCache configured from scraping constants"""
+
+    return ProfileCache(constants['PROFILE_CACHE_PATH'], constants['PROFILE_CACHE_TTL_DAYS'] * 24 * 3600,
+                        constants['PROFILE_CACHE_MEMORY_ENTRIES'])
@@ -0,0 +1,167 @@
+import array
+import math
+import sys
+
+# Fields of a decision record, in order of the columns of the columnar store and decision store
+RECORD_FIELDS = ('course', 'university', 'gpa', 'gre', 'gre_quant', 'gre_verbal', 'toefl', 'workex', 'ug_course', 'ug_college', 'status',
+                 'papers', 'profile_path')
+# Fields of export rows of either extractor, in order of its header fields
+GENERAL_ROW_FIELDS = ('course', 'university', 'gpa', 'gre', 'toefl', 'workex', 'ug_course', 'ug_college', 'status', 'profile_path')
+UNIVERSITY_ROW_FIELDS = ('course', 'university', 'gpa', 'gre_quant', 'gre_verbal', 'toefl', 'workex', 'ug_course', 'ug_college', 'status',
+                         'papers', 'profile_path')
+# Scores held by batches in typed arrays, -1 and NaN stand for scores missing from a record
+INTEGER_FIELDS = ('gre', 'gre_quant', 'gre_verbal', 'toefl', 'workex', 'papers')
+MISSING_INTEGER = -1
+# Text repeated across decisions, every distinct value is held once however many records refer to it
+INTERNED_FIELDS = ('course', 'university', 'ug_course', 'ug_college', 'status')
+
+
+def get_row_fields(header_fields):
+    """Return row fields of export rows with header_fields, 12 column university rows have a GRE split"""
+
+    return UNIVERSITY_ROW_FIELDS if 'GRE Quant' in header_fields else GENERAL_ROW_FIELDS
+
+
+def get_filter_conditions(university=None, course=None, minimum_gpa=None, minimum_gre=None, minimum_toefl=None):
+    """Return list of 3 tuple (field, operator, value) of records matching the given constraints, operator being '=' or '>='.
+    Decision store and columnar store translate these into their own queries"""
+
+    return [(field, operator, value) for field, operator, value in (('university', '=', university), ('course', '=', course),
+                                                                    ('gpa', '>=', minimum_gpa), ('gre', '>=', minimum_gre),
+                                                                    ('toefl', '>=', minimum_toefl)) if value is not None]
+
+
+def intern_text(text):
+    """Return interned copy of text, lxml text results are a str subclass which cannot be interned as is"""
+
+    return sys.intern(str(text)) if text is not None else None
+
+
+def to_int(value):
+    """Return int of a score given as int or text, None if it is not a whole number"""
+
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+
+def to_float(value):
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+class DecisionRecord(object):
+    """Decision of one applicant for one course with typed scores.
+
+    Records of both extractors share the fields of the decision store:
+    scores are ints and floats, None where a record has no such score, and
+    university, course, UG course and college and status are interned, so
+    records of a run share one string of every university and college.
+    Slots leave out the per instance dictionary."""
+
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, course, university, gpa, gre=None, gre_quant=None, gre_verbal=None, toefl=None, workex=None, ug_course='',
+                 ug_college='', status='', papers=None, profile_path=''):
+        # Split of university and course on listing pages leaves a space at the end of the university
+        self.course = intern_text(course.strip())
+        self.university = intern_text(university.strip())
+        self.gpa = to_float(gpa)
+        self.gre_quant = to_int(gre_quant)
+        self.gre_verbal = to_int(gre_verbal)
+        # Total GRE of university records is the sum of quant and verbal
+        self.gre = to_int(gre) if gre is not None or self.gre_quant is None or self.gre_verbal is None else self.gre_quant + self.gre_verbal
+        self.toefl = to_int(toefl)
+        self.workex = to_int(workex)
+        self.ug_course = intern_text(ug_course)
+        self.ug_college = intern_text(ug_college)
+        self.status = intern_text(status)
+        self.papers = to_int(papers)
+        self.profile_path = profile_path
+
+    @classmethod
+    def from_row(cls, row, row_fields):
+        """Return record of an export row whose values are in order of row_fields"""
+
+        return cls(**dict(zip(row_fields, row)))
+
+    def to_row(self, row_fields):
+        return [getattr(self, field) for field in row_fields]
+
+
+class RecordBatch(object):
+    """Decision records of a page or a course held column wise.
+
+    GPA is a float64 array and the other scores int32 arrays, text columns are
+    lists of interned strings, so a record takes less than a quarter of the
+    memory of a row list of strings. Rows and records are created again
+    only while the batch is read."""
+
+    def __init__(self):
+        self.columns = dict()
+        for field in RECORD_FIELDS:
+            if field == 'gpa':
+                self.columns[field] = array.array('d')
+            elif field in INTEGER_FIELDS:
+                self.columns[field] = array.array('i')
+            else:
+                self.columns[field] = []
+
+    def append(self, record):
+        for field in RECORD_FIELDS:
+            value = getattr(record, field)
+            if value is None and field == 'gpa':
+                value = math.nan
+            elif value is None and field in INTEGER_FIELDS:
+                value = MISSING_INTEGER
+            self.columns[field].append(value)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self.columns['profile_path'])
+
+    def get_column(self, field):
+        """Return list of values of field, None where a record has no such score"""
+
+        if field == 'gpa':
+            # NaN is the only value not equal to itself
+            return [value if value == value else None for value in self.columns[field].tolist()]
+        if field in INTEGER_FIELDS:
+            # Arrays are searched and converted in C when no score is missing
+            if MISSING_INTEGER not in self.columns[field]:
+                return self.columns[field].tolist()
+            return [None if value == MISSING_INTEGER else value for value in self.columns[field].tolist()]
+        return self.columns[field]
+
+    def iterate_rows(self, row_fields):
+        """Yield export rows of records in order of row_fields"""
+
+        for row in zip(*[self.get_column(field) for field in row_fields]):
+            yield list(row)
+
+    def iterate_columns(self):
+        """Yield lists of column values of records as taken by the decision store"""
+
+        return self.iterate_rows(RECORD_FIELDS)
+
+    def iterate_records(self):
+        for row in self.iterate_rows(RECORD_FIELDS):
+            yield DecisionRecord(*row)
+
+    @classmethod
+    def from_rows(cls, rows, row_fields):
+        """Return batch of records of export rows whose values are in order of row_fields"""
+
+        record_batch = cls()
+        record_batch.extend(DecisionRecord.from_row(row, row_fields) for row in rows)
+        return record_batch
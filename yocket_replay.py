@@ -0,0 +1,196 @@
+import http.client
+import json
+import threading
+import zipfile
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+import yocket_session_factory as ysf
+
+ARCHIVE_INDEX_NAME = 'index.json'
+ARCHIVE_VERSION = 1
+# Response headers kept in archive, Location lets the session follow recorded redirects
+RECORDED_HEADERS = ('Content-Type', 'Location')
+RECORDED_CONTENT_TYPE = {'Content-Type': 'text/html; charset=utf-8'}
+
+
+def get_request_key(url):
+    """Return path and query of url as archive key.
+    Host is left out so that responses recorded from yocket.in replay against a local fixture server and the other way round"""
+
+    split_url = urlsplit(url)
+    request_key = '/' + split_url.path.lstrip('/')
+    if split_url.query:
+        request_key += '?' + split_url.query
+    return request_key
+
+
+class FixtureArchiveWriter(object):
+    """Record HTTP responses into a deflate compressed zip archive.
+
+    Every response body is an entry of its own and index.json, written on
+    close, maps request keys to entry, status code and headers. A request
+    recorded again replaces the earlier response unless that one was a 200,
+    304 responses are not recorded."""
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.zip_file = zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.index = dict()
+        # Responses arrive from the worker threads of the fetcher
+        self.lock = threading.Lock()
+        self.counters = dict(recorded=0, skipped=0, bytes_recorded=0)
+
+    def record(self, url, status_code, content, headers):
+        request_key = get_request_key(url)
+        with self.lock:
+            # Not modified responses have no body to replay and a recorded page is not replaced by another one
+            if status_code == 304 or (request_key in self.index and self.index[request_key]['status'] == 200):
+                self.counters['skipped'] += 1
+                return
+            entry_name = 'responses/%06d' % self.counters['recorded']
+            self.zip_file.writestr(entry_name, content)
+            self.index[request_key] = dict(entry=entry_name, status=status_code, url=url,
+                                           headers=dict((name, headers[name]) for name in RECORDED_HEADERS if name in headers))
+            self.counters['recorded'] += 1
+            self.counters['bytes_recorded'] += len(content)
+
+    def create_adapter(self, **adapter_arguments):
+        """Return adapter recording into archive, arguments are those of SessionAdapter"""
+
+        return RecordingAdapter(self, **adapter_arguments)
+
+    def get_summary(self):
+        return dict(self.counters, responses=len(self.index))
+
+    def close(self):
+        """Write index and finish archive"""
+
+        with self.lock:
+            self.zip_file.writestr(ARCHIVE_INDEX_NAME, json.dumps(dict(version=ARCHIVE_VERSION, responses=self.index), indent=1))
+            self.zip_file.close()
+
+
+class FixtureArchive(object):
+    """Read responses recorded by FixtureArchiveWriter"""
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.zip_file = zipfile.ZipFile(archive_path, 'r')
+        archive_index = json.loads(self.zip_file.read(ARCHIVE_INDEX_NAME))
+        if archive_index['version'] != ARCHIVE_VERSION:
+            raise ValueError("unsupported fixture archive version " + str(archive_index['version']) + ": " + archive_path)
+        self.index = archive_index['responses']
+        self.lock = threading.Lock()
+        self.counters = dict(replayed=0, missing=0)
+
+    def get(self, url):
+        """Return 3 tuple (status code, body bytes, headers) recorded for url, None if it was not recorded"""
+
+        recorded_response = self.index.get(get_request_key(url))
+        with self.lock:
+            if recorded_response is None:
+                self.counters['missing'] += 1
+                return None
+            self.counters['replayed'] += 1
+            content = self.zip_file.read(recorded_response['entry'])
+        return recorded_response['status'], content, recorded_response['headers']
+
+    def iterate_responses(self, path_filter=None):
+        """Yield 3 tuple (request key, status code, body bytes) of recorded responses whose key contains path_filter"""
+
+        for request_key, recorded_response in sorted(self.index.items()):
+            if path_filter is None or path_filter in request_key:
+                with self.lock:
+                    content = self.zip_file.read(recorded_response['entry'])
+                yield request_key, recorded_response['status'], content
+
+    def create_adapter(self, **adapter_arguments):
+        """Return adapter replaying from archive, it opens no connections so SessionAdapter arguments are ignored"""
+
+        return ReplayAdapter(self)
+
+    def get_summary(self):
+        return dict(self.counters, responses=len(self.index))
+
+    def close(self):
+        self.zip_file.close()
+
+
+class RecordingAdapter(ysf.SessionAdapter):
+    """Session adapter sending requests over the network and recording every response"""
+
+    def __init__(self, archive_writer, **kwargs):
+        super(RecordingAdapter, self).__init__(**kwargs)
+        self.archive_writer = archive_writer
+
+    def send(self, request, **kwargs):
+        response = super(RecordingAdapter, self).send(request, **kwargs)
+        self.archive_writer.record(request.url, response.status_code, response.content, response.headers)
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter answering requests from a fixture archive without touching the network.
+    Requests which were not recorded are answered with an empty page and status 404"""
+
+    def __init__(self, archive, **kwargs):
+        super(ReplayAdapter, self).__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        recorded_response = self.archive.get(request.url)
+        status_code, content, headers = recorded_response if recorded_response is not None else (404, b'<html><body></body></html>', dict(RECORDED_CONTENT_TYPE))
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = http.client.responses.get(status_code, '')
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+
+class ArchivePageSource(object):
+    """Page source of fixture server serving recorded responses, so that
+    replay also goes through sockets like a live run"""
+
+    def __init__(self, archive):
+        self.archive = archive
+
+    def get_page(self, request_path):
+        """Return 2 tuple (status code, html) for request path including query string"""
+
+        recorded_response = self.archive.get(request_path)
+        if recorded_response is None:
+            return 404, ''
+        status_code, content, _ = recorded_response
+        return status_code, content.decode('utf-8', errors='replace')
+
+
+def open_http_archive(constants):
+    """Return archive writer if HTTP_ARCHIVE_MODE is 'record', archive reader if it is 'replay', None if it is None"""
+
+    archive_mode = constants['HTTP_ARCHIVE_MODE']
+    if archive_mode is None:
+        return None
+    if archive_mode == 'record':
+        return FixtureArchiveWriter(constants['HTTP_ARCHIVE_PATH'])
+    if archive_mode == 'replay':
+        return FixtureArchive(constants['HTTP_ARCHIVE_PATH'])
+    raise ValueError("HTTP_ARCHIVE_MODE must be one of None, 'record', 'replay': " + str(archive_mode))
+
+
+def mount_http_archive(current_session, http_archive):
+    """Route http and https requests of session through adapter of archive, session is left alone if archive is None"""
+
+    if http_archive is None:
+        return current_session
+    archive_adapter = http_archive.create_adapter()
+    current_session.mount('http://', archive_adapter)
+    current_session.mount('https://', archive_adapter)
+    return current_session
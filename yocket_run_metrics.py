@@ -0,0 +1,169 @@
+import collections
+import contextlib
+import cProfile
+import json
+import pstats
+import time
+import tracemalloc
+import numpy as np
+import yocket_session_factory as ysf
+
+# Percentiles reported for latency of every stage
+LATENCY_PERCENTILES = (50, 95, 99)
+# Functions or allocation sites listed in profiler summary
+PROFILER_TOP_ENTRIES = 15
+
+
+def get_latency_summary(samples):
+    """Return dictionary of count, total, mean, percentiles and max of latency samples in seconds"""
+
+    if len(samples) == 0:
+        return dict(count=0, total_seconds=0.0)
+    sample_array = np.array(samples, dtype=np.float64)
+    summary = dict(count=len(samples), total_seconds=round(float(sample_array.sum()), 6), mean_seconds=round(float(sample_array.mean()), 6))
+    for percentile, value in zip(LATENCY_PERCENTILES, np.percentile(sample_array, LATENCY_PERCENTILES)):
+        summary['p%d_seconds' % percentile] = round(float(value), 6)
+    summary['max_seconds'] = round(float(sample_array.max()), 6)
+    return summary
+
+
+class RunMetrics(object):
+    """Counters and latency samples of the stages of a scrape run.
+
+    Work stages (network, parse, extract, export) keep a sample per call so
+    that percentiles can be reported. Deliberate waits (rate limiting, backoff
+    after blocked responses and captcha pages) are summed separately so they
+    are not mistaken for real work. Samples of concurrent requests overlap, so
+    stage totals can add up to more than the wall time of the run."""
+
+    def __init__(self):
+        self.stage_samples = collections.defaultdict(list)
+        self.sleep_seconds = collections.defaultdict(float)
+        self.counters = collections.defaultdict(int)
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        """Context manager recording wall time of its block as a sample of stage"""
+
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_samples[stage].append(time.perf_counter() - start_time)
+
+    def record(self, stage, seconds):
+        self.stage_samples[stage].append(seconds)
+
+    def record_sleep(self, reason, seconds):
+        self.sleep_seconds[reason] += seconds
+
+    def count(self, counter, amount=1):
+        self.counters[counter] += amount
+
+    def stop(self):
+        """Fix end of run, summaries taken later report the same elapsed time"""
+
+        if self.end_time is None:
+            self.end_time = time.perf_counter()
+
+    def get_elapsed(self):
+        return (self.end_time if self.end_time is not None else time.perf_counter()) - self.start_time
+
+    def get_summary(self, **extra_summaries):
+        """Return JSON serializable dictionary of stages, waits, counters and throughput of run.
+        Extra summaries, such as those of profile cache or fetch planner, are added under their keyword"""
+
+        elapsed = self.get_elapsed()
+        summary = dict(elapsed_seconds=round(elapsed, 3))
+        summary['stages'] = dict((stage, get_latency_summary(samples)) for stage, samples in sorted(self.stage_samples.items()))
+        summary['sleep_seconds'] = dict((reason, round(seconds, 3)) for reason, seconds in sorted(self.sleep_seconds.items()))
+        summary['counters'] = dict(sorted(self.counters.items()))
+        summary['throughput'] = dict(requests_per_second=round(self.counters['requests'] / elapsed, 3) if elapsed > 0 else 0.0,
+                                     bytes_per_second=round(self.counters['bytes_downloaded'] / elapsed, 1) if elapsed > 0 else 0.0,
+                                     records_per_second=round(self.counters['records_exported'] / elapsed, 3) if elapsed > 0 else 0.0)
+        summary.update(extra_summaries)
+        return summary
+
+
+class RunProfiler(object):
+    """Optional cProfile or tracemalloc hook around a scrape run.
+
+    cProfile only sees the thread which started it, so time spent inside
+    requests calls of the fetcher thread pool shows up as waiting on the event
+    loop. Profiler name None turns the hook into a no-op."""
+
+    def __init__(self, profiler_name, output_path=None):
+        if profiler_name not in (None, 'cprofile', 'tracemalloc'):
+            raise ValueError("profiler must be one of None, 'cprofile', 'tracemalloc': " + str(profiler_name))
+        self.profiler_name = profiler_name
+        self.output_path = output_path
+        self.profiler = None
+
+    def start(self):
+        if self.profiler_name == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profiler_name == 'tracemalloc':
+            tracemalloc.start()
+
+    def stop(self):
+        """Stop profiling and return JSON serializable summary, None if no profiler was configured"""
+
+        if self.profiler_name == 'cprofile':
+            self.profiler.disable()
+            if self.output_path is not None:
+                self.profiler.dump_stats(self.output_path)
+            profile_stats = pstats.Stats(self.profiler).sort_stats('cumulative')
+            top_functions = []
+            for function_key in profile_stats.fcn_list[:PROFILER_TOP_ENTRIES]:
+                primitive_calls, total_calls, own_seconds, cumulative_seconds, _ = profile_stats.stats[function_key]
+                top_functions.append(dict(function='%s:%d(%s)' % function_key, calls=total_calls, own_seconds=round(own_seconds, 6),
+                                          cumulative_seconds=round(cumulative_seconds, 6)))
+            return dict(profiler='cprofile', output_path=self.output_path, top_functions=top_functions)
+        if self.profiler_name == 'tracemalloc':
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            allocation_statistics = tracemalloc.take_snapshot().statistics('lineno')[:PROFILER_TOP_ENTRIES]
+            tracemalloc.stop()
+            top_allocations = [dict(location=str(statistic.traceback), size_bytes=statistic.size, blocks=statistic.count)
+                               for statistic in allocation_statistics]
+            return dict(profiler='tracemalloc', current_bytes=current_bytes, peak_bytes=peak_bytes, top_allocations=top_allocations)
+        return None
+
+
+def create_profiler(constants, output_suffix=''):
+    """Return RunProfiler configured from scraping constants"""
+
+    output_path = constants['PROFILER_OUTPUT'] + output_suffix if constants['PROFILER_OUTPUT'] is not None else None
+    return RunProfiler(constants['PROFILER'], output_path)
+
+
+def get_run_summary(run_metrics, profile_cache, fetch_planner, fetcher, current_session, profiler):
+    """Return run summary with summaries of profile cache, fetch planner, backoff controller
+    and transfers of session added, profiler is stopped and its summary added as well"""
+
+    return run_metrics.get_summary(profile_cache=profile_cache.get_summary(), fetch_plan=fetch_planner.get_summary(),
+                                   backoff=fetcher.controller.get_summary(), transfer=ysf.get_transfer_summary(current_session),
+                                   profiler=profiler.stop())
+
+
+def report_run(run_metrics, profile_cache, fetch_planner, fetcher, current_session, profiler, metrics_path):
+    """Print summaries of profile cache, fetch plan, backoff and transfer of a scrape run and write run summary to metrics_path"""
+
+    run_summary = get_run_summary(run_metrics, profile_cache, fetch_planner, fetcher, current_session, profiler)
+    print("Profile cache:", run_summary['profile_cache'])
+    print("Fetch plan:", run_summary['fetch_plan'])
+    print("Backoff:", run_summary['backoff'])
+    print("Transfer:", run_summary['transfer'])
+    write_summary(run_summary, metrics_path)
+
+
+def write_summary(summary, metrics_path):
+    """Write run summary as JSON to metrics_path, nothing is written if path is None"""
+
+    if metrics_path is None:
+        return
+    with open(metrics_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print("Run metrics written to", metrics_path)
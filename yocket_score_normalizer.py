@@ -0,0 +1,92 @@
+import re
+import numpy as np
+
+# Scalar helpers find the first number of a single text
+NUMBER_PATTERN = re.compile(r"\d+[.]?\d*")
+INTEGER_PATTERN = re.compile(r"\d+")
+# Every pattern matches exactly once per line so that matches stay aligned with the cells of a batch
+FIRST_NUMBER_PATTERN = re.compile(r"^(?:[^\d\n]*(\d+[.]?\d*))?.*$", re.MULTILINE)
+FIRST_INTEGER_PATTERN = re.compile(r"^(?:[^\d\n]*(\d+))?.*$", re.MULTILINE)
+
+
+def get_gpa(gpa_text):
+    """Return GPA of score text on a 10 point scale, percentages(any value above 10) divided by 10, 0.0 if there is no number"""
+
+    computed_grade = NUMBER_PATTERN.search(gpa_text or '')
+    if computed_grade is None:
+        return 0.0
+    computed_grade = float(computed_grade.group())
+    if computed_grade > 10:
+        computed_grade = computed_grade / 10.0
+    return round(computed_grade, 2)
+
+
+def get_gre_or_toefl(marks_text):
+    """Return marks of score text if they are a whole number, 0 otherwise(IELTS bands, empty cells)"""
+
+    computed_marks = (marks_text or '').replace("\n", "").strip()
+    return int(computed_marks) if computed_marks.isdecimal() else 0
+
+
+def get_first_integer(text):
+    """Return first integer of text such as months of work experience, 0 if there is none"""
+
+    computed_integer = INTEGER_PATTERN.search(text or '')
+    return int(computed_integer.group()) if computed_integer is not None else 0
+
+
+def meets_criteria(gre, gpa, toefl, constants):
+    """Return True if GRE, GPA and TOEFL all meet their minimum in constants"""
+
+    return gre >= constants['MINIMUM_GRE'] and gpa >= constants['MINIMUM_GPA'] and toefl >= constants['MINIMUM_TOEFL']
+
+
+def find_first_matches(pattern, texts):
+    """Return numpy array of first number in every text, empty string where there is none.
+    Texts of the batch are joined into one string so that compiled pattern is applied once"""
+
+    joined_texts = '\n'.join(str(text).replace('\n', ' ') for text in texts)
+    return np.array(pattern.findall(joined_texts)[:len(texts)] if len(texts) > 0 else [], dtype=str)
+
+
+def to_numbers(matches, dtype):
+    """Return array of matched numbers converted to dtype, zero where nothing matched"""
+
+    return np.where(matches == '', '0', matches).astype(dtype)
+
+
+def normalize_gpa(gpa_texts):
+    """Return float array of GPA on a 10 point scale.
+    Percentages, any value above 10, are converted by a factor of 10"""
+
+    gpa = to_numbers(find_first_matches(FIRST_NUMBER_PATTERN, gpa_texts), np.float64)
+    return np.round(np.where(gpa > 10, gpa / 10.0, gpa), 2)
+
+
+def normalize_gre_or_toefl(marks_texts):
+    """Return int array of marks which are a whole number, zero otherwise(IELTS bands, empty cells)"""
+
+    marks = np.char.strip(np.char.replace(np.array(marks_texts, dtype=str), '\n', ''))
+    return np.where(np.char.isdecimal(marks), marks, '0').astype(np.int32)
+
+
+def normalize_first_integer(texts):
+    """Return int array of first integer in every text such as months of work experience or
+    a GRE section score, zero where there is none"""
+
+    return to_numbers(find_first_matches(FIRST_INTEGER_PATTERN, texts), np.int32)
+
+
+def normalize_scores(gre_texts, toefl_texts, gpa_texts, workex_texts):
+    """Return dictionary of numpy arrays with scores of a batch of decisions, same values as the scalar helpers.
+    Scalar helpers measure faster at every batch size(benchmark normalize), so listing pages use those"""
+
+    return dict(gre=normalize_gre_or_toefl(gre_texts), toefl=normalize_gre_or_toefl(toefl_texts), gpa=normalize_gpa(gpa_texts),
+                workex=normalize_first_integer(workex_texts))
+
+
+def get_criteria_mask(scores, constants):
+    """Return boolean array, True where GRE, GPA and TOEFL all meet their minimum in constants"""
+
+    return ((scores['gre'] >= constants['MINIMUM_GRE']) & (scores['gpa'] >= constants['MINIMUM_GPA']) &
+            (scores['toefl'] >= constants['MINIMUM_TOEFL']))
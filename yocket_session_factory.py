@@ -0,0 +1,108 @@
+import threading
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class TransferStats(object):
+    """Bytes on the wire against bytes of decoded content of responses sent through an adapter"""
+
+    def __init__(self):
+        self.counters = dict(responses=0, wire_bytes=0, content_bytes=0, compressed_responses=0, not_modified=0)
+        # Responses arrive from the worker threads of the fetcher
+        self.lock = threading.Lock()
+
+    def record(self, response):
+        content_bytes = len(response.content)
+        # Once body is read raw response tells how many bytes came from the socket before decoding
+        wire_bytes = response.raw.tell() if response.raw is not None else content_bytes
+        with self.lock:
+            self.counters['responses'] += 1
+            self.counters['wire_bytes'] += wire_bytes
+            self.counters['content_bytes'] += content_bytes
+            if response.headers.get('Content-Encoding') not in (None, 'identity'):
+                self.counters['compressed_responses'] += 1
+            if response.status_code == 304:
+                self.counters['not_modified'] += 1
+
+    def get_summary(self):
+        summary = dict(self.counters)
+        summary['compression_ratio'] = round(summary['content_bytes'] / summary['wire_bytes'], 3) if summary['wire_bytes'] > 0 else 0.0
+        return summary
+
+
+class SessionAdapter(HTTPAdapter):
+    """Transport adapter applying default connect and read timeouts and counting transferred bytes.
+
+    Requests without an explicit timeout get `timeout`, so that a hung
+    connection fails the request instead of stalling the run. Keep-alive
+    connections are pooled per host by the underlying urllib3 pool manager."""
+
+    def __init__(self, timeout=None, **kwargs):
+        super(SessionAdapter, self).__init__(**kwargs)
+        self.timeout = timeout
+        self.transfer_stats = TransferStats()
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        response = super(SessionAdapter, self).send(request, **kwargs)
+        # Streamed bodies are read by the caller, their size is not known here
+        if not kwargs.get('stream'):
+            self.transfer_stats.record(response)
+        return response
+
+
+def get_accept_encoding():
+    """Return Accept-Encoding of every encoding urllib3 can decode here, br only if a brotli package is installed"""
+
+    return urllib3.util.make_headers(accept_encoding=True)['accept-encoding']
+
+
+def get_adapter_arguments(constants):
+    """Return keyword arguments of SessionAdapter configured from scraping constants.
+    Pool of every host holds as many keep-alive connections as requests may be in flight"""
+
+    # Only connection failures are retried here, blocked statuses are left to the backoff controller
+    retries = Retry(total=constants['CONNECTION_RETRIES'], connect=constants['CONNECTION_RETRIES'], read=constants['CONNECTION_RETRIES'],
+                    status=0, other=0, backoff_factor=0.5, raise_on_status=False)
+    return dict(timeout=(constants['CONNECT_TIMEOUT_SECONDS'], constants['READ_TIMEOUT_SECONDS']), pool_connections=constants['POOL_HOSTS'],
+                pool_maxsize=constants['MAX_CONCURRENT_REQUESTS'], max_retries=retries)
+
+
+def create_session(constants, http_archive=None):
+    """Return requests session with pooled keep-alive connections, compressed transfer, timeouts and connection retries.
+    Requests are recorded into or replayed from http_archive if given"""
+
+    current_session = requests.session()
+    current_session.headers['Accept-Encoding'] = get_accept_encoding()
+    current_session.headers['Connection'] = 'keep-alive'
+    adapter_arguments = get_adapter_arguments(constants)
+    session_adapter = SessionAdapter(**adapter_arguments) if http_archive is None else http_archive.create_adapter(**adapter_arguments)
+    current_session.mount('http://', session_adapter)
+    current_session.mount('https://', session_adapter)
+    return current_session
+
+
+def count_opened_connections(session_adapter):
+    """Return number of connections opened by pools of adapter, keep-alive keeps it close to the pool sizes"""
+
+    connection_pools = session_adapter.poolmanager.pools
+    opened_connections = 0
+    for pool_key in connection_pools.keys():
+        try:
+            opened_connections += connection_pools[pool_key].num_connections
+        except KeyError:
+            # Pool was evicted meanwhile
+            continue
+    return opened_connections
+
+
+def get_transfer_summary(current_session, url='https://'):
+    """Return dictionary of transferred bytes and opened connections of adapter of session serving url"""
+
+    session_adapter = current_session.get_adapter(url)
+    summary = session_adapter.transfer_stats.get_summary() if hasattr(session_adapter, 'transfer_stats') else dict()
+    summary['connections_opened'] = count_opened_connections(session_adapter)
+    return summary
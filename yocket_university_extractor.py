@@ -1,227 +1,441 @@
-import requests
-import browser_cookie3
-import yocket_general_extractor as yge
-import time
-from lxml import html as lxml_html
-import random
-import pickle
-import xlsxwriter
-import re
-
-global_constants = None
-
-
-def get_constants():
-    """Return a dictionary containing all input constraints for scraping.
-    Courses can be added based on yocket URLs"""
-
-    dict_constants = dict()
-    dict_university_course_url = dict()
-    dict_university_course_url['USC_General'] = 'https://yocket.in/applications-admits-rejects/168-university-of-southern-california/'
-    dict_university_course_url['USC_DataScience'] = 'https://yocket.in/applications-admits-rejects/51720-university-of-southern-california/'
-    dict_university_course_url['UCLA_General'] = 'https://yocket.in/applications-admits-rejects/53-university-of-california-los-angeles/'
-    dict_university_course_url['UMass_General'] = 'https://yocket.in/applications-admits-rejects/232-university-of-massachusetts-amherst/'
-    dict_university_course_url['Georgia_General'] = 'https://yocket.in/applications-admits-rejects/18-georgia-institute-of-technology/'
-    dict_university_course_url['CMU_General'] = 'https://yocket.in/applications-admits-rejects/9-carnegie-mellon-university/'
-    dict_university_course_url['CMU_ML'] = 'https://yocket.in/applications-admits-rejects/835-carnegie-mellon-university/'
-    dict_university_course_url['CMU_MCDS'] = 'https://yocket.in/applications-admits-rejects/55949-carnegie-mellon-university/'
-    dict_university_course_url['UCSD_General'] = 'https://yocket.in/applications-admits-rejects/219-university-of-california-san-diego/'
-    dict_university_course_url['CalTech_GeneralPhD'] = 'https://yocket.in/applications-admits-rejects/226-california-institute-of-technology/'
-    dict_university_course_url['UTA_General'] = 'https://yocket.in/applications-admits-rejects/46152-university-of-texas-austin/'
-    dict_university_course_url['SBU_General'] = 'https://yocket.in/applications-admits-rejects/129-state-university-of-new-york-at-stony-brook/'
-    dict_university_course_url['NYU_General'] = 'https://yocket.in/applications-admits-rejects/588-new-york-university/'
-    dict_university_course_url['UIUC_General'] = 'https://yocket.in/applications-admits-rejects/81-university-of-illinois-at-urbana-champaign/'
-    dict_university_course_url['Cornell_General'] = 'https://yocket.in/applications-admits-rejects/239-cornell-university/'
-    dict_university_course_url['UMCP_General'] = 'https://yocket.in/applications-admits-rejects/31922-university-of-maryland-college-park/'
-
-    dict_constants['LOGIN_URL'] = "https://yocket.in/account/login"
-    dict_constants['HOME_PAGE'] = 'https://yocket.in/'
-    dict_constants['admit_url_code'] = '2'
-    dict_constants['reject_url_code'] = '3'
-    dict_constants['pagination_suffix'] = '?page='
-    dict_constants['course_url'] = dict_university_course_url
-    dict_constants['MINIMUM_GPA'] = 7.5
-    dict_constants['MINIMUM_GRE'] = 315
-    dict_constants['MINIMUM_TOEFL'] = 100
-
-    return dict_constants
-
-
-def filter_criteria_met(current_gre, current_gpa, current_toefl):
-    """Return a boolean value.
-    If either of minimum constraints not met then False returned."""
-
-    if int(current_gre) < global_constants['MINIMUM_GRE']:
-        return False
-    if float(current_gpa) < global_constants['MINIMUM_GPA']:
-        return False
-    if int(current_toefl) < global_constants['MINIMUM_TOEFL']:
-        return False
-    return True
-
-
-def export_to_file(final_data_fetch, university_course):
-    """Export decision data to local files corresponding to university and course.
-
-    First file created is excel file in readable format
-    Second file is binary file which can be used for analytics."""
-
-    # Column names for data
-    header_fields = ['Course', 'University', 'GPA', 'GRE Quant', 'GRE Verbal', 'TOEFL', 'Work Experience', 'UG Course', 'UG College', 'Admit Status',
-                     'Papers', 'Profile']
-    with xlsxwriter.Workbook('C:/Users/i349223/Downloads/YocketCode/ResultDocuments/' + university_course + '.xlsx') as workbook:
-        worksheet = workbook.add_worksheet()
-
-        # Write Header Fields
-        worksheet.write_row(0, 0, header_fields)
-        # Write data fields
-        for row_num, data in enumerate(final_data_fetch):
-            worksheet.write_row(row_num + 1, 0, data)
-
-    # Store as binary data
-    with open('C:/Users/i349223/Downloads/YocketCode/ResultDocuments/' + university_course + '.data', 'wb') as f:
-        pickle.dump(final_data_fetch, f)
-
-
-def extract_gre_partial_score(input_text):
-    """Input is text containing numeric component containing GRE Quant or Verbal Score
-    Output is the value if existing"""
-    computed_partial_gre_score = re.findall(r"\d+", input_text)
-    if computed_partial_gre_score is not None:
-        return computed_partial_gre_score[0]
-    return 0
-
-
-def perform_scraping(current_session):
-    """Trigger relevant HTTP calls to get requisite data
-    and perform actual scraping"""
-
-    for course_value in global_constants['course_url'].values():
-
-        # List Array storing all relevant decision information for university anc course
-        final_data_fetch = []
-
-        # Get records for admit and reject
-        for decision_code in ['admit_url_code', 'reject_url_code']:
-
-            # Get all pages for decision
-            pagination_index = 1
-            while pagination_index < 300:
-                print("Page:", course_value + global_constants[decision_code] + global_constants['pagination_suffix'] + str(pagination_index),
-                      " Collected records:", len(final_data_fetch))
-                # Get relevant admit-reject page based on pagination value
-                result = current_session.get(course_value + global_constants[decision_code] + global_constants['pagination_suffix'] +
-                                             str(pagination_index), headers=dict(referer=course_value))
-                tree = lxml_html.fromstring(result.content)
-
-                # Get Nodes containing individual decisions for each page(approx 20 per page)
-                decision_buckets = tree.xpath('//*[@class="row"]/div[@class="col-sm-6"]/div[@class="panel panel-warning"]/div[@class="panel-body"]')
-
-                # If decision buckets are empty, captcha page has been encountered or no limit has been reached
-                if len(decision_buckets) == 0:
-                    # No decision in further pages where status code 403
-                    if result.status_code != 200:
-                        break
-                    # No decision in further pages if status code 200 and no results returned
-                    no_results_page = (tree.xpath('//p[@class="lead"]/i'))
-                    if len(no_results_page) > 0 and str(no_results_page[0].tail).strip().lower() == 'no matching profiles found!':
-                        break
-                    # Captcha Page
-                    print("Captcha Time")
-                    time.sleep(120)
-                    continue
-
-                for individual_decision_bucket in decision_buckets:
-
-                    current_admit_status = ((individual_decision_bucket.xpath('./div[1]/div[2]/label'))[0]).text.strip()
-
-                    # Fetch results only if ADMIT or REJECT
-                    if current_admit_status.lower() == 'admit' or current_admit_status.lower() == 'reject':
-
-                        # Get relevant information from html page returned in response
-                        current_bucket_university_course = ((individual_decision_bucket.xpath('./div[1]/div[1]/h4/small'))[0]).text.replace("\n",
-                                                                                                                                            "").strip()
-                        current_gre = yge.get_gre_or_toefl(((((individual_decision_bucket.xpath('./div[2]/div[1]'))[0]).getchildren())[1]).tail)
-                        current_toefl = yge.get_gre_or_toefl(((((individual_decision_bucket.xpath('./div[2]/div[2]'))[0]).getchildren())[1]).tail)
-                        current_gpa = yge.get_gpa(((((individual_decision_bucket.xpath('./div[2]/div[3]'))[0]).getchildren())[1]).tail)
-                        current_workex = yge.get_workex_months(((((individual_decision_bucket.xpath('./div[2]/div[4]'))[0]).getchildren())[1]).tail)
-
-                        current_university, current_course = yge.split_bucket_university_course(current_bucket_university_course.lower())
-                        # Append decision information to final bucket only if minimum criteria met
-                        if current_university is not None and filter_criteria_met(current_gre, current_gpa, current_toefl):
-
-                            # Add sleep time to allow for web scraping in undetected manner
-                            sleep_delay = random.choice([1, 2, 3])
-                            time.sleep(sleep_delay)
-
-                            # Get UG College from profile of user
-                            profile_page_path = ((individual_decision_bucket.xpath('./div[1]/div[1]/h4/a'))[0]).attrib['href']
-                            profile_result = current_session.get(global_constants['HOME_PAGE'] + profile_page_path,
-                                                                 headers=dict(referer=global_constants['HOME_PAGE']))
-                            profile_tree = lxml_html.fromstring(profile_result.content)
-                            ug_details_bucket = (profile_tree.xpath('//div[@class="col-sm-12 card"][1]'))
-
-                            # Check if profile page exists
-                            if len(ug_details_bucket) >= 1:
-                                ug_details_bucket = ug_details_bucket[0]
-
-                                # Get data if supplied
-                                current_ug_course = ((ug_details_bucket.xpath('./div[1]/div[7]/p[1]/b[1]'))[0]).text
-                                if current_ug_course is None:
-                                    current_ug_course = ""
-                                else:
-                                    current_ug_course = current_ug_course.replace("\n", "").strip()
-
-                                current_ug_college = ((ug_details_bucket.xpath('./div[1]/div[7]/p[2]'))[0]).text
-                                if current_ug_college is None:
-                                    current_ug_college = ""
-                                else:
-                                    current_ug_college = current_ug_college.replace("\n", "").strip()
-
-                                current_papers = ((profile_tree.xpath('//div[@class="row text-center"]/div[4]/h4[1]/br'))[0]).tail
-                                if current_papers is None:
-                                    current_papers = ""
-                                else:
-                                    current_papers = current_papers.replace("\n", "").strip()
-
-                                profile_gre_details_bucket = (profile_tree.xpath('//div[@id="yocket_app"]/div[@class="col-sm-6"]/div['
-                                                                                 '@class="col-sm-12"]/div[@class="row text-center"]'))[0]
-                                current_gre_quant = profile_gre_details_bucket.xpath('./div[1]/h4[1]/span[1]')
-                                if len(current_gre_quant) > 0:
-                                    current_gre_quant = extract_gre_partial_score(current_gre_quant[0].text)
-                                    current_gre_verbal = extract_gre_partial_score(((profile_gre_details_bucket.xpath('./div[1]/h4[1]/span[1]/br[1]'))
-                                                    [0]).tail)
-                                    final_data_fetch.append([current_course, current_university, current_gpa, current_gre_quant, current_gre_verbal,
-                                                         current_toefl, current_workex, current_ug_course, current_ug_college, current_admit_status,
-                                                         current_papers, profile_page_path])
-
-                pagination_index += 1
-
-                # Add sleep time to allow for web scraping in undetected manner
-                sleep_delay = random.choice([1, 2, 3])
-                time.sleep(sleep_delay)
-
-        # Export final_data to excel sheet
-        export_to_file(final_data_fetch, str(current_university) + str(current_course))
-
-
-def main():
-    # Get cookie from Chrome Browser
-    cookiejar = browser_cookie3.chrome()
-
-    # Load all scraping constants
-    global global_constants
-    global_constants = get_constants()
-
-    # Start session
-    current_session = requests.session()
-
-    # Get login page and set cookie of current session as the browser session to bypass authentication
-    current_session.get(global_constants['LOGIN_URL'], cookies=cookiejar, headers=dict([('referer', global_constants['HOME_PAGE'])]))
-
-    # Do actual scraping
-    perform_scraping(current_session)
-
-
-if __name__ == "__main__":
-    main()
+import requests
+import yocket_async_fetcher as yaf
+import yocket_backoff as ybo
+import yocket_profile_cache as ypc
+import yocket_fetch_planner as yfp
+import yocket_run_metrics as yrm
+import yocket_replay as yrp
+import yocket_session_factory as ysf
+import yocket_checkpoint as ycp
+import yocket_listing_parser as ylp
+import yocket_export_sinks as yse
+import yocket_records as yrc
+import yocket_columnar_store as ycs
+import yocket_decision_store as yds
+import yocket_admit_tables as yat
+import yocket_config as yco
+import yocket_cookie_cache as yck
+import asyncio
+import os
+import multiprocessing
+import queue
+import traceback
+from lxml import html as lxml_html
+import re
+
+global_constants = None
+profile_cache = None
+fetch_planner = None
+run_metrics = None
+
+DECISION_CODES = ['admit_url_code', 'reject_url_code']
+# Column names for data
+HEADER_FIELDS = ['Course', 'University', 'GPA', 'GRE Quant', 'GRE Verbal', 'TOEFL', 'Work Experience', 'UG Course', 'UG College', 'Admit Status',
+                 'Papers', 'Profile']
+# Position of profile path in a decision record
+PROFILE_PATH_INDEX = 11
+# Collected records of a course are exported in batches of this many records
+EXPORT_BATCH_ROWS = 1000
+
+
+def get_constants():
+    """Return a dictionary containing all input constraints for scraping.
+    Courses can be added based on yocket URLs"""
+
+    return yco.get_university_constants()
+
+
+def export_to_file(final_data_fetch, university_course, combined_sink=None):
+    """Export decision data to local files corresponding to university and course.
+
+    Rows are streamed into a file for every format in EXPORT_FORMATS, by default
+    an excel file in readable format and a binary file which can be used for analytics.
+    Rows are also forwarded to combined_sink if given. They are passed on in chunks of
+    EXPORT_BATCH_ROWS rows, which stores take in as typed record batches."""
+
+    with yse.open_sinks(global_constants['OUTPUT_DIRECTORY'] + university_course, HEADER_FIELDS,
+                        global_constants['EXPORT_FORMATS']) as export_sink, run_metrics.measure('export'):
+        # Write data fields
+        for rows in yse.iterate_chunks(final_data_fetch, EXPORT_BATCH_ROWS):
+            export_sink.write_rows(rows, yrc.UNIVERSITY_ROW_FIELDS)
+            if combined_sink is not None:
+                combined_sink.write_rows(rows, yrc.UNIVERSITY_ROW_FIELDS)
+        run_metrics.count('records_exported', export_sink.rows_written)
+
+
+def extract_gre_partial_score(input_text):
+    """Input is text containing numeric component containing GRE Quant or Verbal Score
+    Output is the value if existing"""
+    computed_partial_gre_score = re.findall(r"\d+", input_text)
+    if len(computed_partial_gre_score) > 0:
+        return int(computed_partial_gre_score[0])
+    return 0
+
+
+async def scrape_profile(fetcher, profile_page_path, decision_fields):
+    """Return decision record completed with details from profile of user.
+    None returned if profile page does not exist or has no GRE scores"""
+
+    # Get UG College from profile of user
+    # Profile pages are requested only once across pages, courses and runs
+    profile_content = await profile_cache.fetch(fetcher, profile_page_path, global_constants['HOME_PAGE'] + profile_page_path,
+                                                referer=global_constants['HOME_PAGE'])
+    with run_metrics.measure('parse_profile'):
+        profile_tree = lxml_html.fromstring(profile_content)
+    with run_metrics.measure('extract_profile'):
+        ug_details_bucket = (profile_tree.xpath('//div[@class="col-sm-12 card"][1]'))
+
+        # Check if profile page exists
+        if len(ug_details_bucket) >= 1:
+            ug_details_bucket = ug_details_bucket[0]
+
+            # Get data if supplied
+            current_ug_course = ((ug_details_bucket.xpath('./div[1]/div[7]/p[1]/b[1]'))[0]).text
+            if current_ug_course is None:
+                current_ug_course = ""
+            else:
+                current_ug_course = current_ug_course.replace("\n", "").strip()
+
+            current_ug_college = ((ug_details_bucket.xpath('./div[1]/div[7]/p[2]'))[0]).text
+            if current_ug_college is None:
+                current_ug_college = ""
+            else:
+                current_ug_college = current_ug_college.replace("\n", "").strip()
+
+            # Papers missing from profile are kept as None
+            current_papers = ((profile_tree.xpath('//div[@class="row text-center"]/div[4]/h4[1]/br'))[0]).tail
+
+            profile_gre_details_bucket = (profile_tree.xpath('//div[@id="yocket_app"]/div[@class="col-sm-6"]/div['
+                                                             '@class="col-sm-12"]/div[@class="row text-center"]'))[0]
+            current_gre_quant = profile_gre_details_bucket.xpath('./div[1]/h4[1]/span[1]')
+            if len(current_gre_quant) > 0:
+                current_gre_quant = extract_gre_partial_score(current_gre_quant[0].text)
+                current_gre_verbal = extract_gre_partial_score(((profile_gre_details_bucket.xpath('./div[1]/h4[1]/span[1]/br[1]'))
+                                                                [0]).tail)
+                current_course, current_university, current_gpa, current_toefl, current_workex, current_admit_status = decision_fields
+                return yrc.DecisionRecord(current_course, current_university, current_gpa, gre_quant=current_gre_quant,
+                                          gre_verbal=current_gre_verbal, toefl=current_toefl, workex=current_workex,
+                                          ug_course=current_ug_course, ug_college=current_ug_college, status=current_admit_status,
+                                          papers=current_papers, profile_path=profile_page_path)
+    return None
+
+
+async def scrape_listing_page(fetcher, course_value, decision_code, pagination_index, exported_profile_paths):
+    """Return 2 tuple (record batch, profile paths of all decisions) of a single admit or reject page of course.
+    Decisions of profiles in exported_profile_paths are carried over from last run and not scraped again.
+    None returned once pagination has gone past the last page"""
+
+    page_url = yco.get_course_page_url(global_constants, course_value, decision_code, pagination_index)
+    attempt = 0
+    while True:
+        # Get relevant admit-reject page based on pagination value, 403 with the no results message is also how end of pagination is served
+        result = await fetcher.fetch_with_backoff(page_url, referer=course_value, forbidden_retries=global_constants['FORBIDDEN_RETRIES'])
+        # 429 and 5xx do not end pagination, pages left would be skipped until the next full run
+        if result.status_code != 403 and fetcher.controller.is_blocked_status(result.status_code):
+            raise ybo.BlockedError(page_url + " still answered with status " + str(result.status_code))
+        with run_metrics.measure('parse_listing'):
+            tree = lxml_html.fromstring(result.content)
+
+        # Get decisions of page in a single pass over decision buckets(approx 20 per page)
+        with run_metrics.measure('extract_listing'):
+            page_decisions = ylp.parse_listing_page(tree, global_constants)
+
+        # If decision buckets are empty, captcha page has been encountered or no limit has been reached
+        if len(page_decisions) == 0:
+            # No decision in further pages if no results are returned, whether with status code 200 or 403
+            if ylp.is_no_results_page(tree):
+                return None
+            # 403 persisting after retries without the no results message is a block, not the end of pagination
+            if result.status_code != 200:
+                raise ybo.BlockedError(page_url + " still answered with status " + str(result.status_code))
+            # Captcha Page
+            print("Captcha Time")
+            if not await fetcher.controller.back_off(attempt, 'captcha'):
+                raise ybo.BlockedError("Captcha still served for " + page_url)
+            attempt += 1
+            continue
+        break
+
+    # Every decision on page is remembered so that later runs know where they have been before
+    page_profile_paths = [decision.profile_page_path for decision in page_decisions]
+
+    # Only profiles of decisions which can become a record and were not exported before are requested
+    profile_requests = []
+    for decision, current_university, current_course in fetch_planner.plan_page(page_decisions, exported_profile_paths):
+        decision_fields = (current_course, current_university, decision.gpa, decision.toefl, decision.workex, decision.admit_status)
+        profile_requests.append(scrape_profile(fetcher, decision.profile_page_path, decision_fields))
+
+    page_batch = yrc.RecordBatch()
+    page_batch.extend(record for record in await asyncio.gather(*profile_requests) if record is not None)
+    print("Page:", page_url, " Collected records:", len(page_batch))
+    return page_batch, page_profile_paths
+
+
+async def scrape_decision_pages(fetcher, course_name, course_value, decision_code):
+    """Collect decision records of all pages of course for decision code into its records file.
+    Pages are requested in windows of PAGE_WINDOW concurrent pages until last page is reached.
+    Progress is checkpointed after every window so that an interrupted run resumes where it stopped"""
+
+    checkpoint_name = course_name + '_' + decision_code
+    checkpoint = ycp.load_checkpoint(global_constants['CHECKPOINT_DIRECTORY'], checkpoint_name)
+
+    # Pages were collected by an earlier run which stopped before export
+    if checkpoint['status'] == ycp.STATUS_COMPLETE:
+        return
+
+    checkpoint, previous_profile_paths = ycp.start_run(global_constants['CHECKPOINT_DIRECTORY'], checkpoint_name, checkpoint,
+                                                       global_constants['SINCE_LAST_RUN'])
+    decision_records = ycp.open_records(global_constants['CHECKPOINT_DIRECTORY'], checkpoint_name, checkpoint)
+    try:
+        last_page_reached = False
+        while checkpoint['last_completed_page'] + 1 < global_constants['LAST_PAGE_LIMIT'] and not last_page_reached:
+            pagination_index = checkpoint['last_completed_page'] + 1
+            page_range = range(pagination_index, min(pagination_index + global_constants['PAGE_WINDOW'], global_constants['LAST_PAGE_LIMIT']))
+            window_results = await asyncio.gather(*[scrape_listing_page(fetcher, course_value, decision_code, page_index, previous_profile_paths)
+                                                    for page_index in page_range])
+            for page_result in window_results:
+                # Pages after the last page are discarded
+                if page_result is None:
+                    last_page_reached = True
+                    break
+                page_batch, page_profile_paths = page_result
+                for record in page_batch.iterate_rows(yrc.UNIVERSITY_ROW_FIELDS):
+                    decision_records.write_row(record)
+                checkpoint['seen_profile_paths'].extend(page_profile_paths)
+                checkpoint['last_completed_page'] += 1
+
+                # Newer decisions come first, pages beyond a decision seen in last run were already collected
+                if not previous_profile_paths.isdisjoint(page_profile_paths):
+                    last_page_reached = True
+                    break
+            # Records of the window are on disk before the checkpoint pointing past them is saved
+            decision_records.sync()
+            checkpoint['records_offset'] = decision_records.tell()
+            ycp.save_checkpoint(global_constants['CHECKPOINT_DIRECTORY'], checkpoint_name, checkpoint)
+    finally:
+        decision_records.close()
+
+    ycp.complete_run(global_constants['CHECKPOINT_DIRECTORY'], checkpoint_name, checkpoint, PROFILE_PATH_INDEX)
+
+
+async def scrape_course(fetcher, course_name, course_value):
+    """Collect decision records of course, admit and reject pages fetched concurrently"""
+
+    await asyncio.gather(*[scrape_decision_pages(fetcher, course_name, course_value, decision_code) for decision_code in DECISION_CODES])
+
+
+def iterate_course_records(course_name):
+    """Yield collected admit records of course followed by its reject records"""
+
+    for decision_code in DECISION_CODES:
+        for record in ycp.iterate_records(global_constants['CHECKPOINT_DIRECTORY'], course_name + '_' + decision_code):
+            yield record
+
+
+def export_course(course_name, combined_sink):
+    """Export records of a single course and mark its checkpoints as exported"""
+
+    # Export final_data to excel sheet
+    export_to_file(iterate_course_records(course_name), course_name, combined_sink)
+    for decision_code in DECISION_CODES:
+        ycp.mark_exported(global_constants['CHECKPOINT_DIRECTORY'], course_name + '_' + decision_code)
+
+
+async def scrape_all_courses(fetcher, combined_sink):
+    """Scrape every configured course in turn and export its records"""
+
+    for course_name, course_value in global_constants['course_url'].items():
+        await scrape_course(fetcher, course_name, course_value)
+        export_course(course_name, combined_sink)
+
+
+def open_combined_sink():
+    """Return sink of dataset holding records of all courses together.
+    Records are also appended to the columnar store if COLUMNAR_STORE_DIRECTORY is set
+    and upserted into the decision store if DECISION_STORE_PATH is set"""
+
+    return yse.open_sinks(global_constants['OUTPUT_DIRECTORY'] + global_constants['COMBINED_EXPORT_NAME'], HEADER_FIELDS,
+                          global_constants['EXPORT_FORMATS'],
+                          ycs.open_columnar_sinks(global_constants['COLUMNAR_STORE_DIRECTORY'], HEADER_FIELDS) +
+                          yds.open_decision_store_sinks(global_constants['DECISION_STORE_PATH'], HEADER_FIELDS))
+
+
+def start_session(cookies, http_archive=None):
+    """Return requests session logged in with browser cookies.
+    Requests of session are recorded into or replayed from http_archive if given"""
+
+    # Start session with pooled connections
+    current_session = ysf.create_session(global_constants, http_archive)
+
+    # Get login page and set cookie of current session as the browser session to bypass authentication
+    current_session.get(global_constants['LOGIN_URL'], cookies=cookies, headers=dict([('referer', global_constants['HOME_PAGE'])]))
+    return current_session
+
+
+def perform_scraping(current_session):
+    """Trigger relevant HTTP calls to get requisite data
+    and perform actual scraping"""
+
+    # Requests are rate limited per host instead of sleeping between them
+    global profile_cache, fetch_planner, run_metrics
+    run_metrics = yrm.RunMetrics()
+    profiler = yrm.create_profiler(global_constants)
+    profiler.start()
+    profile_cache = ypc.create_profile_cache(global_constants)
+    fetch_planner = yfp.FetchPlanner(ylp.split_bucket_university_course, profile_cache)
+    fetcher = yaf.create_fetcher(current_session, global_constants, run_metrics)
+    try:
+        # Records of all courses are exported together as well
+        with open_combined_sink() as combined_sink:
+            asyncio.run(scrape_all_courses(fetcher, combined_sink))
+    finally:
+        fetcher.close()
+        run_metrics.stop()
+        yrm.report_run(run_metrics, profile_cache, fetch_planner, fetcher, current_session, profiler, global_constants['METRICS_FILE'])
+        profile_cache.close()
+
+
+async def scrape_courses_to_queue(fetcher, course_items, result_queue):
+    """Scrape courses in turn and tell the writer once records of a course are complete"""
+
+    for course_name, course_value in course_items:
+        await scrape_course(fetcher, course_name, course_value)
+        result_queue.put(('course', course_name, None))
+
+
+def scrape_courses_in_worker(worker_index, worker_constants, course_items, cookies, result_queue):
+    """Entry point of worker process scraping its shard of courses.
+    Worker has its own session, fetcher rate budget and profile cache connection"""
+
+    global global_constants, profile_cache, fetch_planner, run_metrics
+    global_constants = worker_constants
+    try:
+        run_metrics = yrm.RunMetrics()
+        # Every worker dumps its own cProfile stats
+        profiler = yrm.create_profiler(global_constants, '.' + str(worker_index))
+        profiler.start()
+        # Every worker reads the replay archive on its own
+        http_archive = yrp.open_http_archive(global_constants)
+        current_session = start_session(cookies, http_archive)
+        profile_cache = ypc.create_profile_cache(global_constants)
+        fetch_planner = yfp.FetchPlanner(ylp.split_bucket_university_course, profile_cache)
+        fetcher = yaf.create_fetcher(current_session, global_constants, run_metrics)
+        try:
+            asyncio.run(scrape_courses_to_queue(fetcher, course_items, result_queue))
+        finally:
+            fetcher.close()
+            profile_cache.close()
+            run_metrics.stop()
+            if http_archive is not None:
+                http_archive.close()
+        result_queue.put(('done', worker_index, yrm.get_run_summary(run_metrics, profile_cache, fetch_planner, fetcher, current_session,
+                                                                    profiler)))
+    except Exception:
+        result_queue.put(('failed', worker_index, traceback.format_exc()))
+
+
+def write_worker_results(result_queue, workers, combined_sink):
+    """Export course records as workers complete them until every worker has finished.
+    Records are read back from checkpoint records files of the course.
+    Return 2 tuple (dictionary of worker index -> run summary of workers which completed,
+    dictionary of worker index -> failure of workers which failed)"""
+
+    finished_workers = set()
+    worker_summaries = dict()
+    worker_failures = dict()
+    while len(finished_workers) < len(workers):
+        try:
+            message_type, message_key, message_value = result_queue.get(timeout=1)
+        except queue.Empty:
+            # Worker which died without reporting back is treated as failed
+            for worker_index, worker in enumerate(workers):
+                if not worker.is_alive() and worker.exitcode != 0 and worker_index not in finished_workers:
+                    print("Worker", worker_index, "exited with code", worker.exitcode)
+                    worker_failures[worker_index] = "exited with code " + str(worker.exitcode)
+                    finished_workers.add(worker_index)
+            continue
+
+        if message_type == 'course':
+            export_course(message_key, combined_sink)
+        elif message_type == 'done':
+            print("Worker", message_key, "profile cache:", message_value['profile_cache'], "fetch plan:", message_value['fetch_plan'],
+                  "backoff:", message_value['backoff'])
+            worker_summaries[message_key] = message_value
+            finished_workers.add(message_key)
+        else:
+            print("Worker", message_key, "failed:", message_value)
+            worker_failures[message_key] = message_value.strip().splitlines()[-1]
+            finished_workers.add(message_key)
+    return worker_summaries, worker_failures
+
+
+def perform_scraping_with_workers(cookies):
+    """Shard courses across COURSE_WORKERS processes and
+    write per course files and combined dataset from main process"""
+
+    # Main process only exports, scraping stages are measured by every worker
+    global run_metrics
+    run_metrics = yrm.RunMetrics()
+    # Workers cannot write into one archive together
+    if global_constants['HTTP_ARCHIVE_MODE'] == 'record':
+        raise ValueError("HTTP_ARCHIVE_MODE 'record' requires COURSE_WORKERS of 1")
+
+    course_items = list(global_constants['course_url'].items())
+    worker_count = min(global_constants['COURSE_WORKERS'], len(course_items))
+    result_queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=scrape_courses_in_worker,
+                                       args=(worker_index, global_constants, course_items[worker_index::worker_count], cookies, result_queue))
+               for worker_index in range(worker_count)]
+    for worker in workers:
+        worker.start()
+    try:
+        # Records of all courses are exported together as well
+        with open_combined_sink() as combined_sink:
+            worker_summaries, worker_failures = write_worker_results(result_queue, workers, combined_sink)
+    finally:
+        for worker in workers:
+            worker.join()
+        run_metrics.stop()
+    yrm.write_summary(run_metrics.get_summary(workers=worker_summaries), global_constants['METRICS_FILE'])
+    # Courses of other workers were exported, failed courses resume from their checkpoints in the next run
+    if len(worker_failures) > 0:
+        raise RuntimeError("%d of %d workers failed: %s" % (len(worker_failures), len(workers), '; '.join(
+            'worker %d %s' % (worker_index, failure) for worker_index, failure in sorted(worker_failures.items()))))
+
+
+def refresh_admit_tables():
+    """Count decisions stored by this run into admit rate tables"""
+
+    admit_tables = yat.refresh_admit_tables(global_constants)
+    if admit_tables is not None:
+        print("Admit tables:", admit_tables.get_summary())
+
+
+def main(constants=None):
+    # Load all scraping constants, command line passes its configured constants
+    global global_constants
+    global_constants = constants if constants is not None else get_constants()
+    if global_constants['OUTPUT_DIRECTORY']:
+        os.makedirs(global_constants['OUTPUT_DIRECTORY'], exist_ok=True)
+
+    # Get cookie from cache or Chrome Browser, replayed responses need no login
+    cookiejar = yck.load_cookies(global_constants)
+
+    if global_constants['COURSE_WORKERS'] > 1:
+        # Cookies are handed to workers as a plain dictionary since cookie jar cannot be pickled
+        perform_scraping_with_workers(requests.utils.dict_from_cookiejar(cookiejar))
+    else:
+        # Requests are recorded or replayed if HTTP_ARCHIVE_MODE is set
+        http_archive = yrp.open_http_archive(global_constants)
+        try:
+            # Do actual scraping
+            perform_scraping(start_session(cookiejar, http_archive))
+        finally:
+            if http_archive is not None:
+                print("HTTP archive:", http_archive.get_summary())
+                http_archive.close()
+    refresh_admit_tables()
+
+
+if __name__ == "__main__":
+    main()